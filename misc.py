@@ -1,6 +1,6 @@
 import numpy
 from rexfw import Parcel
-from rexfw.proposers import LMDRENSProposer, AMDRENSProposer, ParamInterpolationPDF, HMCStepRENSProposer
+from rexfw.proposers.rens import LMDRENSProposer, AMDRENSProposer, ParamInterpolationPDF, HMCStepRENSProposer
 from rexfw.replicas import Replica
 from csb.statistics.samplers import State
 
@@ -21,11 +21,13 @@ class TrajDumpLMDRENSProposer(LMDRENSProposer):
 
     def propose(self, local_replica, partner_state, partner_energy, params):
 
-        pdf = self._pdf_factory(local_replica, params)
+        pdf = self._pdf_factory(local_replica.pdf, params)
         propagator = self._propagator_factory(pdf, params)
+        propagator.snapshot_interval = max(params.n_steps // 2, 1)
 
         ps_pos = partner_state.position
-        traj = propagator.generate(State(ps_pos, numpy.random.normal(size=ps_pos.shape)), params.n_steps, True)
+        traj = propagator.generate(State(ps_pos, numpy.random.normal(size=ps_pos.shape)), params.n_steps)
+        middle = traj.snapshots[0] if traj.snapshots else traj.final
         traj.work = self._calculate_work(local_replica, partner_energy, traj)
 
         E_remote = partner_energy
@@ -33,7 +35,7 @@ class TrajDumpLMDRENSProposer(LMDRENSProposer):
         
         deltaE = (E_local - E_remote) + 0.5 * numpy.sum(traj.final.momentum ** 2) - 0.5 * numpy.sum(traj.initial.momentum ** 2)
 
-        traj = GeneralTrajectory([traj.initial, traj[len(traj)/2], traj.final], 
+        traj = GeneralTrajectory([traj.initial, middle, traj.final], 
                                  work=traj.work, heat=traj.heat,
                                  delta_Epot=E_local - E_remote, 
                                  delta_Ekin=.5*numpy.sum(traj.final.momentum**2)-.5*numpy.sum(traj.initial.momentum**2))
@@ -45,11 +47,13 @@ class TrajDumpAMDRENSProposer(AMDRENSProposer):
 
     def propose(self, local_replica, partner_state, partner_energy, params):
 
-        pdf = self._pdf_factory(local_replica, params)
+        pdf = self._pdf_factory(local_replica.pdf, params)
         propagator = self._propagator_factory(pdf, params)
+        propagator.snapshot_interval = max(params.n_steps // 2, 1)
 
         ps_pos = partner_state.position
-        traj = propagator.generate(State(ps_pos, numpy.random.normal(size=ps_pos.shape)), params.n_steps, True)
+        traj = propagator.generate(State(ps_pos, numpy.random.normal(size=ps_pos.shape)), params.n_steps)
+        middle = traj.snapshots[0] if traj.snapshots else traj.final
         traj.work = self._calculate_work(local_replica, partner_energy, traj)
 
         E_remote = partner_energy
@@ -57,7 +61,7 @@ class TrajDumpAMDRENSProposer(AMDRENSProposer):
         
         deltaE = (E_local - E_remote) + 0.5 * numpy.sum(traj.final.momentum ** 2) - 0.5 * numpy.sum(traj.initial.momentum ** 2)
 
-        traj = GeneralTrajectory([traj.initial, traj[len(traj)/2], traj.final], 
+        traj = GeneralTrajectory([traj.initial, middle, traj.final], 
                                  work=traj.work, heat=traj.heat,
                                  delta_Epot=E_local - E_remote, delta_Ekin=0.5 * numpy.sum(traj.final.momentum ** 2) - 0.5 * numpy.sum(traj.initial.momentum ** 2))
 
@@ -68,19 +72,26 @@ class TrajDumpHMCStepRENSProposer(HMCStepRENSProposer):
 
     def propose(self, local_replica, partner_state, partner_energy, params):
 
-        pdf = self._pdf_factory(local_replica, params)
         n_steps = params.n_steps
-        propagator = self._propagator_factory(local_replica.pdf, params)
+        propagator, interp_pdf = self._get_protocol(local_replica.pdf, params)
+        ## the propagator is cached and used by later swaps, too
+        snapshot_interval = propagator.snapshot_interval
+        propagator.snapshot_interval = max(n_steps // 2, 1)
 
         ps_pos = partner_state.position
-        traj = propagator.generate(State(ps_pos), return_trajectory=True)
+        try:
+            traj = propagator.generate(State(ps_pos), n_steps)
+        finally:
+            propagator.snapshot_interval = snapshot_interval
+            interp_pdf.restore()
+        middle = traj.snapshots[0] if traj.snapshots else traj.final
 
         E_remote = partner_energy
         E_local = -local_replica.pdf.log_prob(traj.final.position)
 
         deltaE = (E_local - E_remote)
         
-        traj = GeneralTrajectory([traj.initial, traj[len(traj)/2], traj.final], work=traj.work, heat=traj.heat, delta_Epot=deltaE)
+        traj = GeneralTrajectory([traj.initial, middle, traj.final], work=traj.work, heat=traj.heat, delta_Epot=deltaE)
         
         return traj        
     
@@ -27,5 +27,35 @@ class AbstractCommunicator(object):
         :rtype: depends
         '''
         pass
+
+    def sendrecv(self, obj, dest):
+        '''
+        Sends an object to a replica or master object and receives an object
+        from it. Communicators whose send does not wait for the destination
+        to receive can rely on this default implementation
+
+        :param obj: object to send
+        :type obj: depends
+
+        :param str dest: name of destination object
+
+        :return: the received object
+        :rtype: depends
+        '''
+        self.send(obj, dest)
+
+        return self.recv(dest)
+
+    def is_local(self, name):
+        '''
+        Returns whether objects sent to a replica or master object are delivered
+        within this process, in which case waiting for an answer from the
+        destination before it could process the object would block forever
+
+        :param str name: name of a replica or master object
+
+        :rtype: bool
+        '''
+        return False
     
     
@@ -1,16 +1,40 @@
 '''
 '''
 
+import numpy
+from collections import namedtuple
+
+from rexfw import Parcel
 from rexfw.communicators import AbstractCommunicator
 from mpi4py import MPI
 
 
+## placeholder for a numpy array in a pickled message header
+ArrayHeader = namedtuple('ArrayHeader', 'shape dtype')
+
+
 class MPICommunicator(AbstractCommunicator):
 
     comm = MPI.COMM_WORLD
+    placement = None
+
+    def __init__(self, placement=None):
+        '''
+        Communicator which uses MPI to move objects between processes
+
+        :param placement: maps replica and master object names to the ranks of the
+                          processes they live in. If not given or if a name is
+                          missing, the rank is derived from the name
+                          ('master0', 'replica1', 'replica2', ...)
+        :type placement: dict
+        '''
+
+        self.placement = placement
 
     def _dest_to_rank(self, dest):
 
+        if self.placement is not None and dest in self.placement:
+            return self.placement[dest]
         if type(dest) == str:
             if 'replica' in dest:
                 return int(dest[len('replica'):])
@@ -34,5 +58,140 @@ class MPICommunicator(AbstractCommunicator):
 
         rank = self._dest_to_rank(dest)
 
-        return self.comm.sendrecv(obj, dest=rank)
-        
+        return self.comm.sendrecv(obj, dest=rank, source=rank)
+
+
+class BufferMPICommunicator(MPICommunicator):
+
+    _header_tag = 0
+    _buffer_tag = 1
+
+    def __init__(self, min_buffer_size=1024, placement=None):
+        '''
+        MPI communicator which sends numpy arrays in a :class:`.Parcel` (either
+        as the parcel data or as fields of a request object such as
+        :class:`.StoreStateEnergyRequest`) using the buffer interface of mpi4py.
+        Only a small header with the array shapes and data types is pickled;
+        the arrays themselves are received into arrays allocated from that
+        header without any serialization.
+
+        :param int min_buffer_size: arrays with fewer elements than this are
+                                    pickled along with the header
+
+        :param placement: maps replica and master object names to the ranks of the
+                          processes they live in
+        :type placement: dict
+        '''
+
+        super(BufferMPICommunicator, self).__init__(placement)
+
+        self.min_buffer_size = min_buffer_size
+
+    def _is_bufferable(self, obj):
+
+        return isinstance(obj, numpy.ndarray) and not obj.dtype.hasobject \
+               and obj.size >= self.min_buffer_size
+
+    def _split_arrays(self, parcel):
+        '''
+        Replaces numpy arrays in a parcel by :class:`.ArrayHeader` placeholders
+
+        :param parcel: the parcel to send
+        :type parcel: :class:`.Parcel`
+
+        :return: the parcel with placeholders and a list of the removed arrays
+        :rtype: tuple
+        '''
+
+        data = parcel.data
+        if self._is_bufferable(data):
+            array = numpy.ascontiguousarray(data)
+            return parcel._replace(data=ArrayHeader(array.shape, array.dtype.str)), [array]
+
+        if isinstance(data, tuple) and hasattr(data, '_fields'):
+            arrays = []
+            fields = {}
+            for name, value in zip(data._fields, data):
+                if self._is_bufferable(value):
+                    array = numpy.ascontiguousarray(value)
+                    fields[name] = ArrayHeader(array.shape, array.dtype.str)
+                    arrays.append(array)
+            if len(arrays) > 0:
+                return parcel._replace(data=data._replace(**fields)), arrays
+
+        return parcel, []
+
+    def _fill_arrays(self, parcel, recv_array):
+        '''
+        Replaces :class:`.ArrayHeader` placeholders in a parcel by arrays received
+        with recv_array
+
+        :param parcel: a received parcel possibly containing placeholders
+        :type parcel: :class:`.Parcel`
+
+        :param recv_array: a callable receiving an array into the empty array
+                           passed to it
+        :type recv_array: callable
+
+        :return: the parcel with the placeholders replaced
+        :rtype: :class:`.Parcel`
+        '''
+
+        def make_array(header):
+            array = numpy.empty(header.shape, dtype=numpy.dtype(header.dtype))
+            recv_array(array)
+            return array
+
+        data = parcel.data
+        if isinstance(data, ArrayHeader):
+            return parcel._replace(data=make_array(data))
+
+        if isinstance(data, tuple) and hasattr(data, '_fields'):
+            fields = {name: make_array(value) for name, value in zip(data._fields, data)
+                      if isinstance(value, ArrayHeader)}
+            if len(fields) > 0:
+                return parcel._replace(data=data._replace(**fields))
+
+        return parcel
+
+    def send(self, obj, dest):
+
+        rank = self._dest_to_rank(dest)
+        if not isinstance(obj, Parcel):
+            self.comm.send(obj, dest=rank, tag=self._header_tag)
+            return
+
+        parcel, arrays = self._split_arrays(obj)
+        self.comm.send(parcel, dest=rank, tag=self._header_tag)
+        for array in arrays:
+            self.comm.Send(array, dest=rank, tag=self._buffer_tag)
+
+    def recv(self, source):
+
+        rank = self._dest_to_rank(source)
+        status = MPI.Status()
+        obj = self.comm.recv(source=rank, tag=self._header_tag, status=status)
+        if not isinstance(obj, Parcel):
+            return obj
+
+        ## messages with equal source and tag arrive in order, so the next
+        ## buffer messages from this source belong to this parcel
+        sender_rank = status.Get_source()
+        recv_array = lambda array: self.comm.Recv(array, source=sender_rank,
+                                                  tag=self._buffer_tag)
+
+        return self._fill_arrays(obj, recv_array)
+
+    def sendrecv(self, obj, dest):
+
+        ## non-blocking sends so that both partners can post their
+        ## (possibly large) buffer messages before receiving
+        rank = self._dest_to_rank(dest)
+        parcel, arrays = self._split_arrays(obj) if isinstance(obj, Parcel) else (obj, [])
+        requests = [self.comm.isend(parcel, dest=rank, tag=self._header_tag)]
+        requests += [self.comm.Isend(array, dest=rank, tag=self._buffer_tag)
+                     for array in arrays]
+        result = self.recv(dest)
+        MPI.Request.Waitall(requests)
+
+        return result
@@ -0,0 +1,91 @@
+'''
+A communicator allowing several replicas to live in a single process
+'''
+
+from collections import deque
+
+from rexfw import Parcel
+from rexfw.communicators import AbstractCommunicator
+
+
+class MultiplexingCommunicator(AbstractCommunicator):
+
+    def __init__(self, comm, local_names=()):
+        '''
+        Wraps another communicator, whose placement map assigns several
+        replicas to the same process, in two ways:
+
+        - objects sent to replicas living in this process (the local names) are
+          not passed to the wrapped communicator, but delivered directly: the
+          receiver gets a reference to the sent object, which thus must not be
+          modified in place by either side
+        - as the wrapped communicator only knows processes, but not which replica
+          in a process sent an object, received :class:`.Parcel` objects are
+          matched with the requested source by their sender name. Parcels from
+          other sources are kept until they are asked for
+
+        The master object, too, needs such a communicator (without local names)
+        to tell apart parcels from replicas living in the same process.
+
+        :param comm: the communicator used for objects to other processes
+        :type comm: :class:`.AbstractCommunicator`
+
+        :param local_names: the names of the replicas living in this process
+        :type local_names: list of str
+        '''
+
+        self._comm = comm
+        self.local_names = set(local_names)
+        ## parcels delivered locally or received, but not yet asked for
+        self._pending = deque()
+
+    def is_local(self, name):
+
+        return name in self.local_names
+
+    def _from_source(self, obj, source):
+
+        return source == 'all' or not isinstance(obj, Parcel) or obj.sender == source
+
+    def _pop_pending(self, source):
+
+        for i, obj in enumerate(self._pending):
+            if self._from_source(obj, source):
+                del self._pending[i]
+                return obj
+
+    def send(self, obj, dest):
+
+        if dest in self.local_names:
+            self._pending.append(obj)
+        else:
+            self._comm.send(obj, dest)
+
+    def recv(self, source):
+
+        obj = self._pop_pending(source)
+        if obj is not None:
+            return obj
+        if source in self.local_names:
+            raise RuntimeError("Waiting for an object from replica '{}', which lives in "
+                               "the same process, would block forever".format(source))
+
+        obj = self._comm.recv(source)
+        while not self._from_source(obj, source):
+            self._pending.append(obj)
+            obj = self._comm.recv(source)
+
+        return obj
+
+    def sendrecv(self, obj, dest):
+
+        if dest in self.local_names:
+            raise RuntimeError("Can't send an object to replica '{}', which lives in the "
+                               "same process, and wait for its answer".format(dest))
+
+        obj = self._comm.sendrecv(obj, dest)
+        if self._from_source(obj, dest):
+            return obj
+        self._pending.append(obj)
+
+        return self.recv(dest)
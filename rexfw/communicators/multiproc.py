@@ -0,0 +1,95 @@
+'''
+A communicator using the multiprocessing module to run the master and
+the replicas as local processes on a single machine, without MPI
+'''
+
+from collections import deque
+from cPickle import dumps, loads, HIGHEST_PROTOCOL
+from multiprocessing import Queue
+
+from rexfw.communicators import AbstractCommunicator
+
+
+class MultiprocessingCommunicator(AbstractCommunicator):
+
+    def __init__(self, rank, queues, placement=None):
+        '''
+        Communicator which moves objects between local processes through
+        pipe-backed :class:`multiprocessing.Queue` objects. Every process
+        owns exactly one inbox queue; like with the :class:`.MPICommunicator`,
+        the process index (rank) of an object is derived from its name
+        ('master0', 'replica1', 'replica2', ...).
+
+        Objects are pickled when being sent, so later modifications to them
+        in the sending process do not affect what the receiving process gets.
+
+        :param int rank: the index of the process this communicator lives in
+
+        :param queues: a list of inbox queues, one for each process, shared
+                       between all processes
+        :type queues: list of :class:`multiprocessing.Queue`
+
+        :param placement: maps replica and master object names to the indices of the
+                          processes they live in, if they deviate from the names
+        :type placement: dict
+        '''
+
+        self.rank = rank
+        self.placement = placement
+        self._queues = queues
+        self._inbox = queues[rank]
+        ## objects received while waiting for objects from a certain source
+        self._pending = deque()
+
+    def _dest_to_rank(self, dest):
+
+        if self.placement is not None and dest in self.placement:
+            return self.placement[dest]
+        if type(dest) == str:
+            if 'replica' in dest:
+                return int(dest[len('replica'):])
+            if 'master' in dest:
+                return int(dest[len('master'):])
+            if dest == 'all':
+                return None
+
+    def send(self, obj, dest):
+
+        rank = self._dest_to_rank(dest)
+        self._queues[rank].put((self.rank, dumps(obj, HIGHEST_PROTOCOL)))
+
+    def recv(self, source):
+
+        rank = self._dest_to_rank(source)
+
+        for i, (sender, obj) in enumerate(self._pending):
+            if rank is None or sender == rank:
+                del self._pending[i]
+                return loads(obj)
+
+        while True:
+            sender, obj = self._inbox.get()
+            if rank is None or sender == rank:
+                return loads(obj)
+            self._pending.append((sender, obj))
+
+
+def create_multiprocessing_communicators(n_processes, placement=None):
+    '''
+    Creates a set of connected communicators, one for each process. The
+    communicator for the master object (rank 0) is the first list element,
+    the communicator for replica<i> the i-th element.
+
+    :param int n_processes: the number of processes (master + replicas)
+
+    :param placement: maps replica and master object names to process indices
+    :type placement: dict
+
+    :return: a list of communicators to hand to the processes
+    :rtype: list of :class:`.MultiprocessingCommunicator`
+    '''
+
+    queues = [Queue() for _ in range(n_processes)]
+
+    return [MultiprocessingCommunicator(rank, queues, placement)
+            for rank in range(n_processes)]
@@ -191,7 +191,8 @@ def setup_default_re_master(n_replicas, sim_path, comm):
     return master
 
 def setup_default_replica(init_state, pdf, sampler_class, sampler_params, 
-                          output_folder, comm, rank):
+                          output_folder, comm, rank, sample_writer=None,
+                          background_writer=None, aggregate_stats=False):
     '''
     Creates a default :class:`.Replica` object for replica exchange. This should suffice
     for most applications.
@@ -217,6 +218,17 @@ def setup_default_replica(init_state, pdf, sampler_class, sampler_params,
     :type comm: :class:`.AbstractCommunicator`
 
     :param int rank: the index of this replica, usually 1, 2, ...
+
+    :param sample_writer: an object writing samples to files; by default, samples
+                          are written to a new pickle file for each dump
+    :type sample_writer: :class:`.AbstractSampleWriter`
+
+    :param background_writer: if given, output is written on this object's
+                              background thread
+    :type background_writer: :class:`.BackgroundWriter`
+
+    :param bool aggregate_stats: whether to send summaries of sampler statistics
+                                 instead of the statistics of every sampling step
     
     :return: a for all practical purposes sufficient :class:`.Replica` object
     :rtype: :class:`.Replica`
@@ -246,10 +258,35 @@ def setup_default_replica(init_state, pdf, sampler_class, sampler_params,
                       sampler_params=sampler_params,
                       proposers=proposers,
                       output_folder=output_folder,
-                      comm=comm)
+                      comm=comm,
+                      sample_writer=sample_writer,
+                      background_writer=background_writer,
+                      aggregate_stats=aggregate_stats)
 
     return replica
 
+def create_default_placement(n_replicas, n_processes):
+    '''
+    Distributes replicas over processes for running several replicas per process.
+    The master object lives in the first process (rank 0), the replicas are split into
+    contiguous blocks of (nearly) equal size, one for each of the remaining processes,
+    so that most exchange partners live in the same process
+
+    :param int n_replicas: the number of replicas
+    :param int n_processes: the number of processes (master + replica processes)
+
+    :return: a placement map with replica and master object names as keys
+             and process ranks as values
+    :rtype: dict
+    '''
+
+    n_replica_processes = n_processes - 1
+    placement = {'master0': 0}
+    for i in range(n_replicas):
+        placement['replica{}'.format(i + 1)] = 1 + i * n_replica_processes // n_replicas
+
+    return placement
+
 def create_directories(sim_folder):
     '''
     Creates simulation output folders
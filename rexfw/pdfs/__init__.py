@@ -11,3 +11,34 @@ class AbstractPDF(object):
     @abstractmethod
     def log_prob(self, x):
         pass
+
+    def __getitem__(self, name):
+        '''
+        Returns the value of a parameter, by default the attribute of the same name
+        '''
+        return getattr(self, name)
+
+    def __setitem__(self, name, value):
+        '''
+        Sets the value of a parameter, by default the attribute of the same name
+        '''
+        setattr(self, name, value)
+
+    def log_prob_batch(self, X):
+        '''
+        Evaluates the log-probability for many states at once. This default
+        implementation loops over the states; override it with a vectorized
+        version if possible
+
+        :param X: states stacked along the first axis
+        :type X: numpy.ndarray or list
+
+        :return: the log-probabilities of all states, one value per state
+                 (shape (len(X),)). If log_prob returns several values for a
+                 single state, e.g., because it works element-wise, their
+                 sum is the log-probability of the state
+        :rtype: numpy.ndarray
+        '''
+        import numpy
+
+        return numpy.array([numpy.sum(self.log_prob(x)) for x in X])
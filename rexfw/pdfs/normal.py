@@ -14,3 +14,12 @@ class Normal(AbstractPDF):
     def log_prob(self, x):
         
         return -0.5 * (x - self.mu) ** 2 / self.sigma / self.sigma
+
+    def log_prob_batch(self, X):
+
+        import numpy
+
+        ## log_prob works element-wise, so it can be applied to all states at once
+        log_probs = self.log_prob(numpy.asarray(X, dtype=float))
+
+        return log_probs.reshape(len(log_probs), -1).sum(1)
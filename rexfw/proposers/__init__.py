@@ -31,7 +31,21 @@ class GeneralTrajectory(list):
 
         self.work = work
         self.heat = heat
-        
+
+    @property
+    def initial(self):
+        '''
+        The first state of the trajectory
+        '''
+        return self[0]
+
+    @property
+    def final(self):
+        '''
+        The last state of the trajectory
+        '''
+        return self[-1]
+
         
 class AbstractProposer(object):
 
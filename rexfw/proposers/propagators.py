@@ -0,0 +1,396 @@
+'''
+Propagators which generate RENS trajectories step by step, keeping only the
+initial and the final state (and, optionally, thinned snapshots) while
+accumulating work and heat. They don't depend on csb integrators: all inner
+loops update preallocated numpy arrays in place. Masses and temperatures are
+unity, as assumed by the RENS proposers
+'''
+
+import numpy
+
+from abc import abstractmethod
+
+from csb.statistics.samplers import State
+
+from rexfw.proposers import GeneralTrajectory
+
+
+class _RandomBlocks(object):
+
+    max_block_size = 128
+
+    def __init__(self, sample, shape, n_samples):
+        '''
+        Draws random arrays of a fixed shape in blocks to avoid calling
+        numpy.random for each single array
+
+        :param sample: a numpy.random function taking a size argument
+        :type sample: callable
+
+        :param tuple shape: the shape of a single array
+
+        :param int n_samples: the number of arrays which will be needed
+        '''
+
+        self._sample = sample
+        self._shape = shape
+        self._block_size = max(1, min(n_samples, self.max_block_size))
+        self._block = None
+        self._index = self._block_size
+
+    def next(self):
+
+        if self._index == self._block_size:
+            self._block = self._sample((self._block_size,) + self._shape)
+            self._index = 0
+        self._index += 1
+
+        return self._block[self._index - 1]
+
+
+class AbstractStreamingPropagator(object):
+
+    def __init__(self, snapshot_interval=None):
+        '''
+        Base class for propagators which don't materialize intermediate states.
+        Subclasses implement single steps which update position and momentum
+        arrays in place; :class:`csb.statistics.samplers.State` objects, which
+        copy their arrays on each access, are only created for the initial and
+        final states and for snapshots.
+
+        :param int snapshot_interval: if given, the state after every
+                                      snapshot_interval-th step (except for the
+                                      last one) is stored in the snapshots
+                                      attribute of generated trajectories for
+                                      diagnostic purposes
+        '''
+
+        self.snapshot_interval = snapshot_interval
+
+    def _start(self, position, momentum, length):
+        '''
+        Prepares the generation of a trajectory of the given length starting
+        from the given position and momentum, e.g., by allocating buffers
+        '''
+        pass
+
+    @abstractmethod
+    def _step(self, position, momentum, i):
+        '''
+        Performs the i-th step by updating position and momentum in place
+
+        :param position: the current position
+        :type position: numpy.ndarray
+
+        :param momentum: the current momentum or None
+        :type momentum: numpy.ndarray
+
+        :param int i: the index of the step
+
+        :return: the work and the heat of the step
+        :rtype: tuple of float
+        '''
+        pass
+
+    def generate(self, init_state, length, return_trajectory=False):
+        '''
+        Generates a trajectory
+
+        :param init_state: the initial state, which is not modified
+        :type init_state: :class:`csb.statistics.samplers.State`
+
+        :param int length: the number of steps
+
+        :param bool return_trajectory: accepted for compatibility with csb
+                                       propagators; full trajectories aren't
+                                       supported, use snapshots instead
+
+        :return: a trajectory consisting of the initial and the final state
+                 with the accumulated work and heat, and a (possibly empty) list
+                 of snapshots and their step numbers as attributes snapshots
+                 and snapshot_steps
+        :rtype: :class:`.GeneralTrajectory`
+        '''
+
+        if return_trajectory:
+            raise ValueError('streaming propagators only keep the initial and final '
+                             'states; set snapshot_interval to keep intermediate states')
+
+        ## the State properties return copies, which are updated in place
+        position = init_state.position
+        momentum = init_state.momentum
+        work = 0.0
+        heat = 0.0
+        snapshots = []
+        snapshot_steps = []
+        interval = self.snapshot_interval
+
+        self._start(position, momentum, length)
+        for i in range(length):
+            step_work, step_heat = self._step(position, momentum, i)
+            work += step_work
+            heat += step_heat
+            if interval is not None and (i + 1) % interval == 0 and i + 1 < length:
+                snapshots.append(State(position, momentum))
+                snapshot_steps.append(i + 1)
+
+        traj = GeneralTrajectory([init_state, State(position, momentum)],
+                                 work=work, heat=heat)
+        traj.snapshots = snapshots
+        traj.snapshot_steps = snapshot_steps
+
+        return traj
+
+
+class StreamingMDPropagator(AbstractStreamingPropagator):
+
+    def __init__(self, gradient, timestep, snapshot_interval=None):
+        '''
+        Integrates Hamiltonian equations of motion with unit masses using the
+        leapfrog (velocity Verlet) scheme. Positions and momenta are given at
+        equal times after each step, so snapshots are physical states. The
+        gradient of the last step is reused, so each step requires a single
+        gradient evaluation.
+
+        :param gradient: the gradient of the potential energy, called with a
+                         position and the current time. It must return a new
+                         array, as positions are updated in place
+        :type gradient: callable
+
+        :param float timestep: the integration timestep
+        '''
+
+        super(StreamingMDPropagator, self).__init__(snapshot_interval)
+
+        self.gradient = gradient
+        self.timestep = float(timestep)
+        self._gradient_value = None
+        self._buffer = None
+
+    def _start(self, position, momentum, length):
+
+        self._gradient_value = self.gradient(position, 0.0)
+        self._buffer = numpy.empty_like(momentum)
+
+    def _kick(self, momentum, timestep):
+
+        numpy.multiply(self._gradient_value, timestep, out=self._buffer)
+        momentum -= self._buffer
+
+    def _drift(self, position, momentum, timestep):
+
+        numpy.multiply(momentum, timestep, out=self._buffer)
+        position += self._buffer
+
+    def _step(self, position, momentum, i):
+
+        dt = self.timestep
+        self._kick(momentum, 0.5 * dt)
+        self._drift(position, momentum, dt)
+        self._gradient_value = self.gradient(position, (i + 1) * dt)
+        self._kick(momentum, 0.5 * dt)
+
+        return 0.0, 0.0
+
+
+class LangevinPropagator(StreamingMDPropagator):
+
+    def __init__(self, gradient, timestep, gamma, snapshot_interval=None):
+        '''
+        Integrates Langevin dynamics using the BAOAB splitting: half a momentum
+        kick, half a drift, an Ornstein-Uhlenbeck update of the momenta, half a
+        drift and another half kick. The heat is the change in kinetic energy
+        caused by the Ornstein-Uhlenbeck updates.
+
+        :param gradient: the gradient of the potential energy, c.f.
+                         :class:`.StreamingMDPropagator`
+        :type gradient: callable
+
+        :param float timestep: the integration timestep
+
+        :param float gamma: the friction coefficient
+        '''
+
+        super(LangevinPropagator, self).__init__(gradient, timestep, snapshot_interval)
+
+        self.gamma = float(gamma)
+        self._noise = None
+
+    def _start(self, position, momentum, length):
+
+        super(LangevinPropagator, self)._start(position, momentum, length)
+
+        self._noise = _RandomBlocks(numpy.random.standard_normal, momentum.shape, length)
+
+    def _step(self, position, momentum, i):
+
+        dt = self.timestep
+        c1 = numpy.exp(-self.gamma * dt)
+        c2 = numpy.sqrt(1.0 - c1 * c1)
+
+        self._kick(momentum, 0.5 * dt)
+        self._drift(position, momentum, 0.5 * dt)
+
+        kinetic_energy = 0.5 * numpy.vdot(momentum, momentum)
+        momentum *= c1
+        numpy.multiply(self._noise.next(), c2, out=self._buffer)
+        momentum += self._buffer
+        heat = 0.5 * numpy.vdot(momentum, momentum) - kinetic_energy
+
+        self._drift(position, momentum, 0.5 * dt)
+        self._gradient_value = self.gradient(position, (i + 1) * dt)
+        self._kick(momentum, 0.5 * dt)
+
+        return 0.0, heat
+
+
+class AndersenPropagator(StreamingMDPropagator):
+
+    def __init__(self, gradient, timestep, collision_probability=0.1, update_interval=1,
+                 snapshot_interval=None):
+        '''
+        Integrates Hamiltonian equations of motion like
+        :class:`.StreamingMDPropagator` and couples the system to an Andersen
+        thermostat: after every update_interval-th step, starting with the
+        first one, each momentum component is redrawn with probability
+        collision_probability. The heat is the resulting change in kinetic
+        energy.
+
+        :param gradient: the gradient of the potential energy, c.f.
+                         :class:`.StreamingMDPropagator`
+        :type gradient: callable
+
+        :param float timestep: the integration timestep
+
+        :param float collision_probability: the probability for a momentum
+                                            component to be redrawn
+
+        :param int update_interval: the number of steps between
+                                    thermostat updates
+        '''
+
+        super(AndersenPropagator, self).__init__(gradient, timestep, snapshot_interval)
+
+        self.collision_probability = collision_probability
+        self.update_interval = update_interval
+        self._uniforms = None
+        self._noise = None
+        self._mask = None
+
+    def _start(self, position, momentum, length):
+
+        super(AndersenPropagator, self)._start(position, momentum, length)
+
+        n_updates = (length + self.update_interval - 1) // self.update_interval
+        self._uniforms = _RandomBlocks(numpy.random.random_sample, momentum.shape, n_updates)
+        self._noise = _RandomBlocks(numpy.random.standard_normal, momentum.shape, n_updates)
+        self._mask = numpy.empty(momentum.shape, dtype=bool)
+
+    def _step(self, position, momentum, i):
+
+        super(AndersenPropagator, self)._step(position, momentum, i)
+
+        heat = 0.0
+        if i % self.update_interval == 0:
+            numpy.less(self._uniforms.next(), self.collision_probability, out=self._mask)
+            noise = self._noise.next()
+            if self._mask.any():
+                kinetic_energy = 0.5 * numpy.vdot(momentum, momentum)
+                numpy.copyto(momentum, noise, where=self._mask)
+                heat = 0.5 * numpy.vdot(momentum, momentum) - kinetic_energy
+
+        return 0.0, heat
+
+
+class HMCStepPropagator(AbstractStreamingPropagator):
+
+    def __init__(self, log_prob, gradient, timestep, hmc_traj_length, n_hmc_iterations,
+                 snapshot_interval=None):
+        '''
+        Generates trajectories alternating between perturbations, which switch
+        the PDF from one interpolation step to the next one, and propagations
+        consisting of HMC iterations which leave the PDF of the current
+        interpolation step invariant. To make the protocol symmetric under time
+        reversal, there is no propagation after the last perturbation. The work
+        is the sum of the energy changes of the perturbations, and the heat is
+        the sum of the energy changes of the propagations. States don't carry
+        momenta.
+
+        :param log_prob: the log-probability of a position at an interpolation
+                         step, e.g., :meth:`.ParamInterpolationPDF.log_prob`
+        :type log_prob: callable
+
+        :param gradient: the gradient of the potential energy (the negative
+                         log-probability) of a position at an interpolation
+                         step. It must return a new array
+        :type gradient: callable
+
+        :param float timestep: the leapfrog timestep
+
+        :param int hmc_traj_length: the number of leapfrog steps per HMC iteration
+
+        :param int n_hmc_iterations: the number of HMC iterations per propagation
+        '''
+
+        super(HMCStepPropagator, self).__init__(snapshot_interval)
+
+        self.log_prob = log_prob
+        self.gradient = gradient
+        self.timestep = float(timestep)
+        self.hmc_traj_length = hmc_traj_length
+        self.n_hmc_iterations = n_hmc_iterations
+        self._energy = None
+        self._length = None
+        self._position = None
+        self._momentum = None
+        self._buffer = None
+        self._noise = None
+
+    def _start(self, position, momentum, length):
+
+        self._energy = -self.log_prob(position, 0)
+        self._length = length
+        self._position = numpy.empty_like(position)
+        self._momentum = numpy.empty_like(position)
+        self._buffer = numpy.empty_like(position)
+        self._noise = _RandomBlocks(numpy.random.standard_normal, position.shape,
+                                    max(length - 1, 0) * self.n_hmc_iterations)
+
+    def _leapfrog(self, position, momentum, step):
+
+        dt = self.timestep
+        numpy.multiply(self.gradient(position, step), 0.5 * dt, out=self._buffer)
+        momentum -= self._buffer
+        for l in range(self.hmc_traj_length):
+            numpy.multiply(momentum, dt, out=self._buffer)
+            position += self._buffer
+            scale = dt if l < self.hmc_traj_length - 1 else 0.5 * dt
+            numpy.multiply(self.gradient(position, step), scale, out=self._buffer)
+            momentum -= self._buffer
+
+    def _hmc_iteration(self, position, step):
+
+        numpy.copyto(self._position, position)
+        numpy.copyto(self._momentum, self._noise.next())
+        H_old = self._energy + 0.5 * numpy.vdot(self._momentum, self._momentum)
+        self._leapfrog(self._position, self._momentum, step)
+        energy = -self.log_prob(self._position, step)
+        H_new = energy + 0.5 * numpy.vdot(self._momentum, self._momentum)
+
+        if numpy.log(numpy.random.random()) < H_old - H_new:
+            numpy.copyto(position, self._position)
+            self._energy = energy
+
+    def _step(self, position, momentum, i):
+
+        energy = -self.log_prob(position, i + 1)
+        work = energy - self._energy
+        self._energy = energy
+
+        heat = 0.0
+        if i + 1 < self._length:
+            for _ in range(self.n_hmc_iterations):
+                self._hmc_iteration(position, i + 1)
+            heat = self._energy - energy
+
+        return work, heat
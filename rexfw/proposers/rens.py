@@ -1,9 +1,9 @@
+import os
 import numpy
 
 from abc import ABCMeta, abstractmethod
 
 from csb.statistics.samplers import State
-import csb.statistics.samplers.mc.neqsteppropagator as noneqprops
 
 from rexfw.proposers import AbstractProposer, GeneralTrajectory
 
@@ -46,6 +46,55 @@ class ParamInterpolationPDF(object):
         self._reset_pdf_params()
         
         return res
+
+    def restore(self):
+
+        pass
+
+
+class TabulatedParamInterpolationPDF(ParamInterpolationPDF):
+
+    def __init__(self, pdf, pdf_params, n_steps):
+        '''
+        Interpolates PDF parameters like :class:`.ParamInterpolationPDF`, but
+        calculates the parameters of all n_steps + 1 steps once. Parameters are
+        set only when the step changes, and the original parameters are restored
+        only by :meth:`restore`, which has to be called once the PDF is not
+        used anymore
+        '''
+
+        super(TabulatedParamInterpolationPDF, self).__init__(pdf, pdf_params, n_steps)
+
+        self.param_table = [self.interp_params(i) for i in range(n_steps + 1)]
+        self._current_step = None
+        self._old_param_values = None
+
+    def _change_pdf_params(self, i):
+
+        if i == self._current_step:
+            return
+        if self._old_param_values is None:
+            self._old_param_values = {name: self.pdf[name] for name in self.param_table[0]}
+        ## only integral steps are tabulated; e.g., MD propagators pass times
+        if 0 <= i <= self.n_steps and int(i) == i:
+            params = self.param_table[int(i)]
+        else:
+            params = self.interp_params(i)
+        for name, value in params.iteritems():
+            self.pdf[name] = value
+        self._current_step = i
+
+    def _reset_pdf_params(self):
+
+        pass
+
+    def restore(self):
+
+        if self._old_param_values is not None:
+            for name, value in self._old_param_values.iteritems():
+                self.pdf[name] = value
+        self._old_param_values = None
+        self._current_step = None
     
 
 class MDParamInterpolationPDF(ParamInterpolationPDF):
@@ -58,7 +107,7 @@ class MDParamInterpolationPDF(ParamInterpolationPDF):
 
     def _map_time_to_step(self, t):
 
-        return int(t / (float(self.n_steps) * self.timestep))
+        return int(round(t / self.timestep))
         
     def log_prob(self, x, t):
 
@@ -68,46 +117,205 @@ class MDParamInterpolationPDF(ParamInterpolationPDF):
 
     def gradient(self, x, t):
 
-        i = int(t / (float(self.n_steps) * self.timestep))
+        i = self._map_time_to_step(t)
         
         return super(MDParamInterpolationPDF, self).gradient(x, i)
 
 
+class TabulatedMDParamInterpolationPDF(MDParamInterpolationPDF,
+                                       TabulatedParamInterpolationPDF):
+    pass
+
+
+def _generate_trial(args):
+    '''
+    Generates a trajectory for :meth:`AbstractRENSProposer._generate_trials`.
+    This is a module-level function so that process pools can pickle it. In
+    processes other than the one submitting the trial, the random number
+    generator is seeded, because forked worker processes share its state
+    '''
+
+    proposer, pdf, start_state, params, parent_pid, seed = args
+    if os.getpid() != parent_pid:
+        numpy.random.seed(seed)
+
+    return proposer._generate_trajectory(pdf, start_state, params)
+
+
+def multiple_try_work(trial_works, reference_works, partner_work):
+    '''
+    Calculates the effective work of one direction of a multiple-try RENS swap.
+    A trial is selected with probability proportional to exp(-work / 2); the
+    reference trajectories start from the state the exchange partner proposes
+    and, together with the reversed trajectory of the partner, make up the set
+    of trials of the reverse move. The swap is accepted with probability
+    min(1, exp(-(effective work 1 + effective work 2))), which for a single
+    trial is the usual RENS criterion
+
+    :param trial_works: the works of all trials, including the selected one
+    :type trial_works: numpy.ndarray
+
+    :param reference_works: the works of the reference trajectories
+    :type reference_works: numpy.ndarray
+
+    :param float partner_work: the work of the trial the exchange partner selected
+
+    :rtype: float
+    '''
+
+    reverse_log_weights = numpy.concatenate(([0.5 * partner_work],
+                                             -0.5 * numpy.asarray(reference_works)))
+    log_weights = -0.5 * numpy.asarray(trial_works)
+
+    return numpy.logaddexp.reduce(reverse_log_weights) - numpy.logaddexp.reduce(log_weights)
+
+
 class AbstractRENSProposer(AbstractProposer):
 
-    def __init__(self, name, interpolating_pdf=ParamInterpolationPDF):
+    def __init__(self, name, interpolating_pdf=ParamInterpolationPDF, n_trials=1, pool=None,
+                 snapshot_interval=None):
+        '''
+        Base class for RENS proposers
+
+        :param int n_trials: the number of independent trajectories (trials) per
+                             proposal. If larger than one, one of them is selected
+                             as the proposal, and a
+                             :class:`.MultipleTryExchangeMaster` is needed to
+                             perform the swaps
+
+        :param pool: if given, the trials are generated in parallel using the
+                     map method of this object, e.g., a
+                     multiprocessing.pool.ThreadPool or, if the PDF, the
+                     proposer and states can be pickled, a multiprocessing.Pool.
+                     Each trial then uses a copy of the replica's PDF
+
+        :param int snapshot_interval: if given and supported by the propagator
+                                      (c.f. :class:`.AbstractStreamingPropagator`),
+                                      proposals carry a snapshot of every
+                                      snapshot_interval-th intermediate state in
+                                      their snapshots attribute
+        '''
 
         super(AbstractRENSProposer, self).__init__(name)
 
         self._interpolating_pdf = interpolating_pdf
-        
-    def _pdf_factory(self, local_replica, params):
+        self.n_trials = n_trials
+        self.pool = pool
+        self.snapshot_interval = snapshot_interval
+
+    def __getstate__(self):
 
-        if self._interpolating_pdf.__name__ ==  'OldISDInterpolatingPDF':
-            pdf = self._interpolating_pdf(local_replica.pdf, params, self.posterior)
+        ## pools can't be pickled and aren't needed to generate single trials
+        state = self.__dict__.copy()
+        state['pool'] = None
+
+        return state
+        
+    def _pdf_factory(self, pdf, params):
+        '''
+        Creates the interpolating PDF. Subclasses of
+        :class:`.ParamInterpolationPDF` are instantiated with the PDF parameters,
+        the number of steps and, for :class:`.MDParamInterpolationPDF`, the
+        timestep; other callables are called with the PDF and params
+        '''
+
+        factory = self._interpolating_pdf
+        is_class = isinstance(factory, type)
+        if factory.__name__ ==  'OldISDInterpolatingPDF':
+            pdf = factory(pdf, params, self.posterior)
+        elif is_class and issubclass(factory, MDParamInterpolationPDF):
+            pdf = factory(pdf, params.pdf_params, params.n_steps, params.timestep)
+        elif is_class and issubclass(factory, ParamInterpolationPDF):
+            pdf = factory(pdf, params.pdf_params, params.n_steps)
         else:
-            pdf = self._interpolating_pdf(local_replica.pdf, params)
+            pdf = factory(pdf, params)
 
         return pdf
 
     @abstractmethod
-    def _calculate_work(self, local_replica, partner_energy, traj):
+    def _calculate_work(self, local_replica, partner_energy, traj, local_energy=None):
+        '''
+        Calculates the work of a trajectory
 
+        :param float local_energy: the energy of the final state of the
+                                   trajectory; calculated if not given
+        '''
         pass
 
-    def propose(self, local_replica, partner_state, partner_energy, params):
+    def _generate_trajectory(self, pdf, start_state, params):
+
+        interp_pdf = self._pdf_factory(pdf, params)
+        propagator = self._propagator_factory(interp_pdf, params)
+
+        try:
+            ## only the initial and final states are needed
+            traj = propagator.generate(start_state, params.n_steps, False)
+        finally:
+            if hasattr(interp_pdf, 'restore'):
+                interp_pdf.restore()
+
+        result = GeneralTrajectory([traj.initial, traj.final], heat=traj.heat)
+        result.snapshots = getattr(traj, 'snapshots', [])
 
-        pdf = self._pdf_factory(local_replica, params)
-        propagator = self._propagator_factory(pdf, params)
+        return result
 
-        start_state = self._augment_state(partner_state)
-        traj = propagator.generate(start_state, params.n_steps)
-        traj.work = self._calculate_work(local_replica, partner_energy, traj)
+    def _generate_trials(self, local_replica, partner_state, partner_energy, params, n_trials):
+        '''
+        Generates n_trials trajectories starting from the partner state, each with
+        a new augmentation (e.g., momenta) of it, and calculates their works
+        '''
+
+        from copy import deepcopy
+
+        start_states = [self._augment_state(partner_state) for _ in range(n_trials)]
+        if self.pool is None:
+            trajs = [self._generate_trajectory(local_replica.pdf, start_state, params)
+                     for start_state in start_states]
+        else:
+            seeds = numpy.random.randint(2 ** 31 - 1, size=n_trials)
+            ## the interpolating PDFs change the PDF parameters, so parallel
+            ## trials each need a PDF of their own
+            tasks = [(self, deepcopy(local_replica.pdf), start_state, params,
+                      os.getpid(), seed)
+                     for start_state, seed in zip(start_states, seeds)]
+            trajs = self.pool.map(_generate_trial, tasks)
 
-        traj = GeneralTrajectory([traj.initial, traj.final], work=traj.work, heat=traj.heat)
+        ## a single, possibly vectorized evaluation for all trials
+        local_energies = local_replica.get_energies([traj.final.position for traj in trajs])
+        for traj, local_energy in zip(trajs, local_energies):
+            traj.work = self._calculate_work(local_replica, partner_energy, traj, local_energy)
+
+        return trajs
+
+    def propose(self, local_replica, partner_state, partner_energy, params):
+
+        trajs = self._generate_trials(local_replica, partner_state, partner_energy,
+                                      params, self.n_trials)
+        works = numpy.array([float(traj.work) for traj in trajs])
+        if len(trajs) == 1:
+            traj = trajs[0]
+        else:
+            log_weights = -0.5 * works
+            probs = numpy.exp(log_weights - log_weights.max())
+            traj = trajs[numpy.random.choice(len(trajs), p=probs / probs.sum())]
+        traj.trial_works = works
 
         return traj
 
+    def propose_references(self, local_replica, partner_state, partner_energy, params):
+        '''
+        Generates the n_trials - 1 reference trajectories of a multiple-try swap,
+        which start from the state proposed by the exchange partner
+
+        :return: the works of the reference trajectories
+        :rtype: numpy.ndarray
+        '''
+
+        trajs = self._generate_trials(local_replica, partner_state, partner_energy,
+                                      params, self.n_trials - 1)
+
+        return numpy.array([float(traj.work) for traj in trajs])
+
     @abstractmethod
     def _augment_state(self, state):
         pass
@@ -115,16 +323,31 @@ class AbstractRENSProposer(AbstractProposer):
     
 class AbstractMDRENSProposer(AbstractRENSProposer):
 
+    def __init__(self, name, interpolating_pdf=MDParamInterpolationPDF, n_trials=1, pool=None,
+                 snapshot_interval=None):
+        '''
+        Base class for RENS proposers propagating states with molecular dynamics,
+        which evaluate the interpolating PDF at times rather than at steps.
+        For the parameters, c.f. :class:`.AbstractRENSProposer`
+        '''
+
+        super(AbstractMDRENSProposer, self).__init__(name, interpolating_pdf, n_trials,
+                                                     pool, snapshot_interval)
+
     def _augment_state(self, state):
 
+        ## a copy, because replicas in the same process share
+        ## states instead of sending copies
+        state = state.clone()
         state.momentum = numpy.random.normal(size=state.position.shape)
 
         return state
 
-    def _calculate_work(self, local_replica, partner_energy, traj):
+    def _calculate_work(self, local_replica, partner_energy, traj, local_energy=None):
 
         E_remote = partner_energy
-        E_local = -local_replica.pdf.log_prob(traj.final.position)
+        E_local = -local_replica.pdf.log_prob(traj.final.position) \
+                  if local_energy is None else local_energy
         H_local = E_local + 0.5 * numpy.sum(traj.final.momentum ** 2)
         H_remote = E_remote + 0.5 * numpy.sum(traj.initial.momentum ** 2)
         
@@ -137,10 +360,11 @@ class AbstractMCRENSProposer(AbstractRENSProposer):
 
         return state
 
-    def _calculate_work(self, local_replica, partner_energy, traj):
+    def _calculate_work(self, local_replica, partner_energy, traj, local_energy=None):
 
         E_remote = partner_energy
-        E_local = -local_replica.pdf.log_prob(traj.final.position)
+        E_local = -local_replica.pdf.log_prob(traj.final.position) \
+                  if local_energy is None else local_energy
         
         return E_local - E_remote - traj.heat        
 
@@ -149,217 +373,122 @@ class MicrocanonicalMDRENSProposer(AbstractMDRENSProposer):
 
     def _propagator_factory(self, pdf, params):
 
-        from csb.statistics.samplers.mc.propagators import MDPropagator
+        from rexfw.proposers.propagators import StreamingMDPropagator
 
-        return MDPropagator(pdf.gradient, params.timestep)
+        return StreamingMDPropagator(pdf.gradient, params.timestep, self.snapshot_interval)
     
     
 class LMDRENSProposer(AbstractMDRENSProposer):
 
     def _propagator_factory(self, pdf, params):
 
-        from langevin import LangevinPropagator
+        from rexfw.proposers.propagators import LangevinPropagator
 
-        return LangevinPropagator(pdf.gradient, params.timestep, gamma=params.gamma)
+        return LangevinPropagator(pdf.gradient, params.timestep, params.gamma,
+                                  self.snapshot_interval)
 
 
 class AMDRENSProposer(AbstractMDRENSProposer):
 
     def _propagator_factory(self, pdf, params):
 
-        from csb.statistics.samplers.mc.propagators import ThermostattedMDPropagator
-
-        return ThermostattedMDPropagator(pdf.gradient, params.timestep, 
-                                         collision_probability=params.collision_probability,
-                                         update_interval=params.update_interval)
+        from rexfw.proposers.propagators import AndersenPropagator
 
+        return AndersenPropagator(pdf.gradient, params.timestep,
+                                  params.collision_probability, params.update_interval,
+                                  self.snapshot_interval)
 
-class AbstractStepRENSProposer(AbstractRENSProposer):
 
-    def _setup_sys_infos(self, interp_pdf, n_steps):
+class HMCStepRENSProposer(AbstractRENSProposer):
 
-        im_log_probs = [lambda x, i=i: interp_pdf.log_prob(x, i) 
-                        for i in range(n_steps + 1)]
+    def __init__(self, name, interpolating_pdf=ParamInterpolationPDF,
+                 max_cached_protocols=4, snapshot_interval=None):
+        '''
+        RENS proposer using HMC steps between perturbations, c.f.
+        :class:`.HMCStepPropagator`. Protocols (interpolating PDFs and the
+        propagators using them) only depend on the PDF and the exchange
+        parameters, so they are built once for each PDF, parameter set and
+        direction and reused for later swaps. Multiple-try swaps are not
+        supported, so proposals always consist of a single trajectory
 
-        im_reduced_hamiltonians = [noneqprops.ReducedHamiltonian(im_log_probs[i],
-                                                                 temperature=1.0) 
-                                   for i in range(n_steps + 1)]
-        im_sys_infos = [noneqprops.HamiltonianSysInfo(im_reduced_hamiltonians[i])
-                        for i in range(n_steps + 1)]
+        :param int max_cached_protocols: the maximum number of cached protocols;
+                                         if more are needed, the least recently
+                                         used one is discarded
 
-        return im_sys_infos
+        :param int snapshot_interval: c.f. :class:`.AbstractRENSProposer`
+        '''
 
-    def _setup_interp_pdf(self, n_steps, pdf_params):
+        from collections import OrderedDict
 
-        pdf = self._interpolating_pdf(pdf, pdf_params, n_steps)
+        super(HMCStepRENSProposer, self).__init__(name, interpolating_pdf,
+                                                  snapshot_interval=snapshot_interval)
 
-        return pdf
-        
-    def _setup_protocol(self, pdf, params):
+        self.max_cached_protocols = max_cached_protocols
+        self._protocols = OrderedDict()
 
-        from collections import namedtuple
-        from csb.statistics.samplers.mc.neqsteppropagator import Step, Protocol
-        
-        fields = 'timestep gradient hmc_traj_length hmc_iterations intermediate_steps mass_matrix integrator'
-        FakeParams = namedtuple('FakeParams', fields)
-        
-        fake_timestep = params.timestep
-        n_steps = params.n_steps
+    def _protocol_key(self, pdf, params):
 
-        interp_pdf = self._setup_interp_pdf(n_steps, params.pdf_params)
-                
-        im_sys_infos = self._setup_sys_infos(interp_pdf, n_steps)
+        ## parameter values may be arrays, which can't be hashed
+        pdf_params = tuple(sorted((name, tuple((numpy.shape(value),
+                                                tuple(numpy.ravel(value).tolist()))
+                                               for value in values))
+                                  for name, values in params.pdf_params.iteritems()))
 
-        perturbations = [noneqprops.ReducedHamiltonianPerturbation(im_sys_infos[i], im_sys_infos[i+1])
-                        for i in range(n_steps)]
+        return (id(pdf), pdf_params, params.n_steps, params.timestep,
+                params.hmc_traj_length, params.n_hmc_iterations)
 
-        fake_params = FakeParams(timestep=params.timestep, 
-                                 gradient=interp_pdf.gradient,
-                                 hmc_traj_length=params.hmc_traj_length,
-                                 hmc_iterations=params.n_hmc_iterations,
-                                 intermediate_steps=params.n_steps,
-                                 mass_matrix=None,
-                                 integrator=FastLeapFrog)
+    def _get_protocol(self, pdf, params):
+        '''
+        Returns a cached protocol for the given PDF and exchange parameters
+        or sets up and caches a new one. The cache holds references to the PDFs,
+        so their ids are unique keys
 
-        im_sys_infos = self._add_gradients(im_sys_infos, fake_params)
-        propagations = self._setup_propagations(im_sys_infos, fake_params)
-        steps = [Step(perturbations[i], propagations[i]) for i in range(n_steps)]
-        
-        return Protocol(steps)
+        :return: the propagator and the interpolating PDF it uses
+        :rtype: tuple
+        '''
 
-    def _setup_propagations(self, *params):
+        from copy import deepcopy
 
-        if True:
-            from fastcode import FastHMCStepRENS
-
-            return FastHMCStepRENS._setup_propagations(*params)
+        key = self._protocol_key(pdf, params)
+        if key in self._protocols:
+            protocol, interp_pdf, _ = self._protocols.pop(key)
         else:
-            ## leaks A LOT of memory, gotta fix this in CSB.
-            from csb.statistics.samplers.mc.multichain import HMCStepRENS
-
-            return HMCStepRENS._setup_propagations(*params)
-
-    def _add_gradients(self, im_sys_infos, param_info):
-
-        im_gradients = [lambda x, t, i=i: param_info.gradient(x, i)
-                        for i in range(param_info.intermediate_steps + 1)]
+            ## the protocol must not change if params are changed later on
+            protocol, interp_pdf = self._setup_protocol(pdf, deepcopy(params))
+            if len(self._protocols) >= self.max_cached_protocols:
+                self._protocols.popitem(last=False)
+        self._protocols[key] = protocol, interp_pdf, pdf
 
-        for i, s in enumerate(im_sys_infos):
-            s.hamiltonian.gradient = im_gradients[i]
-
-        return im_sys_infos
-    
-    def _propagator_factory(self, pdf, params):
-
-        protocol = self._setup_protocol(pdf, params)
-        
-        return noneqprops.NonequilibriumStepPropagator(protocol)
-
-    def propose(self, local_replica, partner_state, partner_energy, params):
-
-        n_steps = params.n_steps
-        propagator = self._propagator_factory(local_replica.pdf, params)
-
-        ps_pos = partner_state.position
-        traj = propagator.generate(State(ps_pos))
-        traj = GeneralTrajectory([traj.initial, traj.final], work=traj.work)
-        
-        return traj        
-
-    def _augment_state(self, state):
-        pass
-
-    def _calculate_work(self, local_replica, partner_energy, traj):
-        pass
-
-
-class HMCStepRENSProposer(AbstractRENSProposer):
+        return protocol, interp_pdf
 
     def _setup_protocol(self, pdf, params):
 
-        from collections import namedtuple
-        from csb.numeric.integrators import FastLeapFrog
-        from csb.statistics.samplers.mc.neqsteppropagator import Step, Protocol
-        
-        fields = 'timestep gradient hmc_traj_length hmc_iterations intermediate_steps mass_matrix integrator'
-        FakeParams = namedtuple('FakeParams', fields)
-        
-        fake_timestep = params.timestep
-        n_steps = params.n_steps
-
-        Bla = namedtuple('Bla', 'n_steps timestep pdf_params')
-        p = Bla(n_steps, 1.0, params.pdf_params)
-        
-        if self._interpolating_pdf.__name__ ==  'OldISDInterpolatingPDF':
-            pdf = self._interpolating_pdf(pdf, p, self.posterior)
-            print "loaded proprietary posterior"
-        else:
-            pdf = self._interpolating_pdf(pdf, pdf_params, n_steps)
-
-        interp_pdf = pdf
-                
-        im_log_probs = [lambda x, i=i: interp_pdf.log_prob(x, i) 
-                        for i in range(n_steps + 1)]
-
-        im_reduced_hamiltonians = [noneqprops.ReducedHamiltonian(im_log_probs[i],
-                                                                 temperature=1.0) 
-                                   for i in range(n_steps + 1)]
-        im_sys_infos = [noneqprops.HamiltonianSysInfo(im_reduced_hamiltonians[i])
-                        for i in range(n_steps + 1)]
-        perturbations = [noneqprops.ReducedHamiltonianPerturbation(im_sys_infos[i], im_sys_infos[i+1])
-                        for i in range(n_steps)]
-
-
-        ## before I mixed up hmc_traj_length and hmc_iterations, check whether this was acutally a good idea
-        fake_params = FakeParams(timestep=params.timestep, 
-                                 gradient=interp_pdf.gradient,
-                                 hmc_traj_length=params.hmc_traj_length,
-                                 hmc_iterations=params.n_hmc_iterations,
-                                 intermediate_steps=params.n_steps,
-                                 mass_matrix=None,
-                                 integrator=FastLeapFrog)
-
-        im_sys_infos = self._add_gradients(im_sys_infos, fake_params)
-        propagations = self._setup_propagations(im_sys_infos, fake_params)
-        steps = [Step(perturbations[i], propagations[i]) for i in range(n_steps)]
-        
-        return Protocol(steps)
-
-    def _setup_propagations(self, *params):
+        from rexfw.proposers.propagators import HMCStepPropagator
 
-        if True:
-            from fastcode import FastHMCStepRENS
+        interp_pdf = self._pdf_factory(pdf, params)
+        propagator = HMCStepPropagator(interp_pdf.log_prob, interp_pdf.gradient,
+                                       params.timestep, params.hmc_traj_length,
+                                       params.n_hmc_iterations, self.snapshot_interval)
 
-            return FastHMCStepRENS._setup_propagations(*params)
-        else:
-            ## leaks A LOT of memory, gotta fix this in CSB.
-            from csb.statistics.samplers.mc.multichain import HMCStepRENS
+        return propagator, interp_pdf
 
-            return HMCStepRENS._setup_propagations(*params)
-
-    def _add_gradients(self, im_sys_infos, param_info):
-
-        im_gradients = [lambda x, t, i=i: param_info.gradient(x, i)
-                        for i in range(param_info.intermediate_steps + 1)]
-
-        for i, s in enumerate(im_sys_infos):
-            s.hamiltonian.gradient = im_gradients[i]
-
-        return im_sys_infos
-    
     def _propagator_factory(self, pdf, params):
 
-        protocol = self._setup_protocol(pdf, params)
-        
-        return noneqprops.NonequilibriumStepPropagator(protocol)
+        return self._get_protocol(pdf, params)[0]
 
     def propose(self, local_replica, partner_state, partner_energy, params):
 
         n_steps = params.n_steps
-        propagator = self._propagator_factory(local_replica.pdf, params)
+        propagator, interp_pdf = self._get_protocol(local_replica.pdf, params)
 
         ps_pos = partner_state.position
-        traj = propagator.generate(State(ps_pos))
-        traj = GeneralTrajectory([traj.initial, traj.final], work=traj.work)
+        try:
+            traj = propagator.generate(State(ps_pos), n_steps)
+        finally:
+            if hasattr(interp_pdf, 'restore'):
+                interp_pdf.restore()
+        result = GeneralTrajectory([traj.initial, traj.final],
+                                   work=traj.work, heat=traj.heat)
+        result.snapshots = traj.snapshots
         
-        return traj        
+        return result        
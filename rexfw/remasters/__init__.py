@@ -6,8 +6,14 @@ import numpy as np
 
 from rexfw import Parcel
 from rexfw.remasters.requests import SampleRequest, DieRequest, ProposeRequest, AcceptBufferedProposalRequest
+from rexfw.remasters.requests import SampleNRequest
 from rexfw.remasters.requests import GetStateAndEnergyRequest_master, SendGetStateAndEnergyRequest
-from rexfw.remasters.requests import DumpSamplesRequest, SendStatsRequest
+from rexfw.remasters.requests import ExchangeStatesProposeRequest, AcceptDirectSwapRequest
+from rexfw.remasters.requests import DumpSamplesRequest, SendStatsRequest, SetupSampleStoreRequest
+from rexfw.remasters.requests import SetPDFParamsRequest, CalculatePDFParamsWorkRequest
+from rexfw.remasters.requests import SwapPDFParamsRequest, AcceptPartnerStateRequest
+from rexfw.remasters.requests import SendProposalRequest, ProposeReferencesRequest
+from rexfw.replicas.requests import DoNothingRequest
 
 from abc import abstractmethod
 
@@ -158,7 +164,7 @@ class ExchangeMaster(object):
             
         return works, heats
 
-    def _calculate_acceptance(self, works):
+    def _calculate_acceptance(self, works, uniforms=None):
         '''
         Determines whether swaps are being accepted or rejected
 
@@ -167,6 +173,10 @@ class ExchangeMaster(object):
                       trajectory
         :type works: numpy.ndarray
 
+        :param uniforms: uniform random numbers to compare acceptance probabilities
+                         with; drawn if not given
+        :type uniforms: numpy.ndarray
+
         :return: array of Boolean (0 / 1) values indicating whether swaps have
                  been accepted (1) or rejected (0)              
         :rtype: numpy.ndarray
@@ -175,7 +185,10 @@ class ExchangeMaster(object):
         exponent = -np.sum(works,1)
         exponent = np.clip(exponent, a_min=None, a_max=np.log(np.finfo(float).max))
         
-        return np.exp(exponent) > np.random.uniform(size=len(works))
+        if uniforms is None:
+            uniforms = np.random.uniform(size=len(works))
+        
+        return np.exp(exponent) > uniforms
 
     def _send_accept_exchange_request(self, dest):
         '''
@@ -315,15 +328,25 @@ class ExchangeMaster(object):
         :type statistics_update_interval: int
         '''
 
-        for step in xrange(n_iterations):
+        self._send_setup_sample_store_requests(dump_interval, dump_step)
+
+        intervals = (dump_interval, status_interval, statistics_update_interval)
+        step = 0
+        while step < n_iterations:
             if step % swap_interval == 0 and step > 0:
                 swap_list = self._calculate_swap_list(step)
                 results = self._perform_exchanges(swap_list)
                 self._update_swap_stats(swap_list, results, step)
                 no_ex_replicas = self._get_no_ex_replicas(swap_list)
                 self._send_sample_requests(no_ex_replicas)
+                n_steps = 1
             else:
-                self._send_sample_requests(self.replica_names)
+                ## replicas perform all steps up to the next swap or the
+                ## next step after which the master has to do something
+                n_steps = self._count_sampling_steps(step, n_iterations,
+                                                     swap_interval, intervals)
+                self._send_sample_n_requests(self.replica_names, n_steps)
+                step += n_steps - 1
                 
             if step % dump_interval == 0 and step > 0:
                 self._send_dump_samples_request(step - dump_interval,
@@ -335,7 +358,36 @@ class ExchangeMaster(object):
             if step % statistics_update_interval == 0 and step > 0:
                 self._update_sampling_statistics()
 
-            self.step += 1
+            self.step += n_steps
+            step += 1
+
+    def _count_sampling_steps(self, step, n_iterations, swap_interval, intervals):
+        '''
+        Counts the sampling steps, starting with step, which the replicas can
+        perform without interruption. These end before the next swap, at the
+        first step after which samples have to be dumped or statistics have to
+        be updated or written, or at the last step.
+
+        :param int step: the first sampling step
+
+        :param int n_iterations: total number of sampling steps
+
+        :param int swap_interval: the interval with which to perform swaps
+
+        :param intervals: the intervals with which to dump samples, write and
+                          update statistics
+        :type intervals: tuple of int
+
+        :return: the number of sampling steps
+        :rtype: int
+        '''
+
+        last = step
+        while last < n_iterations - 1 and (last + 1) % swap_interval != 0 \
+              and not any(last % i == 0 and last > 0 for i in intervals):
+            last += 1
+
+        return last - step + 1
 
     def _send_send_stats_requests(self, replicas):
         '''
@@ -399,6 +451,37 @@ class ExchangeMaster(object):
             parcel = Parcel(self.name, replica_name, SampleRequest(self.name))
             self._comm.send(parcel, dest=replica_name)
 
+    def _send_sample_n_requests(self, replicas, n_steps):
+        '''
+        Send requests to replicas to perform several sampling steps
+        from their respective PDFs
+
+        :param replicas: replicas which are supposed to perform the sampling steps
+        :type replicas: list  
+
+        :param int n_steps: the number of sampling steps to perform
+        '''
+
+        for replica_name in replicas:
+            parcel = Parcel(self.name, replica_name, SampleNRequest(self.name, n_steps))
+            self._comm.send(parcel, dest=replica_name)
+
+    def _send_setup_sample_store_requests(self, dump_interval, dump_step):
+        '''
+        Send requests to set up sample stores keeping only samples which will
+        be written to files
+
+        :param dump_interval: the interval with which samples will be written
+        :type dump_interval: int
+
+        :param dump_step: sub-sampling step; write only every dump_step-th sample
+        :type dump_step: int
+        '''
+
+        for r in self.replica_names:
+            request = SetupSampleStoreRequest(self.name, dump_interval, dump_step)
+            self._comm.send(Parcel(self.name, r, request), dest=r)
+
     def _send_dump_samples_request(self, smin, smax, offset, dump_step):
         '''
         Send requests to write samples to files
@@ -429,3 +512,615 @@ class ExchangeMaster(object):
             parcel = Parcel(self.name, r, DieRequest(self.name))
             self._comm.send(parcel, dest=r)
 
+
+class AsyncExchangeMaster(ExchangeMaster):
+    '''
+    Master object which overlaps the swaps of all replica pairs instead of
+    performing them one after another: state exchanges are triggered for all
+    pairs at once, works are collected in the order in which they arrive and
+    a pair is sent its accept / reject requests as soon as both its works are in.
+    Takes the same arguments as :class:`.ExchangeMaster`.
+    '''
+
+    ## the number of DoNothingRequests replicas send per swap after
+    ## accepting / rejecting
+    _n_syncs_per_swap = 2
+
+    def _perform_exchanges(self, swap_list):
+        '''
+        Attempts exchanges defined in swap_list. 
+
+        :param swap_list: a list of list in which each list element contains two replica  
+                          names involved in a swap an an :class:`.ExchangeParams` object
+        :type swap_list: list
+
+        :return: three lists: acceptance statuses (0 / 1), works  and heats
+        :rtype: list
+        '''
+
+        self._trigger_proposal_calculation(swap_list)
+        acc, works, heats = self._receive_works_and_trigger_exchanges(swap_list)
+
+        return zip(acc, works, heats)
+
+    def _receive_sync_requests(self, n_requests):
+        '''
+        Receives a number of :class:`.DoNothingRequest` objects from any replica
+
+        :param int n_requests: the number of requests to receive
+        '''
+
+        for _ in range(n_requests):
+            self._comm.recv(source='all')
+
+    def _exchange_states(self, swap_list):
+        '''
+        Makes the replicas of all pairs exchange their states and energies. This
+        happens in two rounds, one per direction, so that no replica ever sends
+        and receives a state at the same time.
+
+        :param swap_list: a list of list in which each list element contains two replica  
+                          names involved in a swap an an :class:`.ExchangeParams` object
+        :type swap_list: list
+        '''
+
+        for replica1, replica2, _ in swap_list:
+            self._comm.send(Parcel(self.name, replica2,
+                                   SendGetStateAndEnergyRequest(self.name, replica1)),
+                            replica2)
+        self._receive_sync_requests(len(swap_list))
+
+        for replica1, replica2, _ in swap_list:
+            self._comm.send(Parcel(self.name, replica1,
+                                   SendGetStateAndEnergyRequest(self.name, replica2)),
+                            replica1)
+        self._receive_sync_requests(len(swap_list))
+
+    def _trigger_proposal_calculation(self, swap_list):
+        '''
+        Makes all involved replicas propose states.
+
+        :param swap_list: a list of list in which each list element contains two replica  
+                          names involved in a swap an an :class:`.ExchangeParams` object
+        :type swap_list: list
+        '''
+
+        self._exchange_states(swap_list)
+
+        for replica1, replica2, params in swap_list:
+            self._send_propose_request(replica1, replica2, params)
+            params.proposer_params.reverse()
+            self._send_propose_request(replica2, replica1, params)
+            params.proposer_params.reverse()
+
+    def _receive_works_and_trigger_exchanges(self, swap_list):
+        '''
+        Receives works from all swapping replicas in the order in which they
+        arrive and sends accept / reject requests to a pair of replicas as
+        soon as both works of that pair have been received
+
+        :param swap_list: a list of list in which each list element contains two replica  
+                          names involved in a swap an an :class:`.ExchangeParams` object
+        :type swap_list: list
+
+        :return: acceptance statuses, works and heats
+        :rtype: tuple of numpy.ndarray
+        '''
+
+        n_swaps = len(swap_list)
+        works = np.zeros((n_swaps, 2))
+        heats = np.zeros((n_swaps, 2))
+        acc = np.zeros(n_swaps, dtype=bool)
+        n_received = np.zeros(n_swaps, dtype=int)
+        ## random numbers are drawn beforehand so that the outcome does
+        ## not depend on the order in which the works arrive
+        uniforms = np.random.uniform(size=n_swaps)
+        positions = {}
+        for i, (replica1, replica2, _) in enumerate(swap_list):
+            positions[replica1] = (i, 0)
+            positions[replica2] = (i, 1)
+
+        n_works = 0
+        n_syncs = 0
+        while n_works < 2 * n_swaps:
+            parcel = self._comm.recv(source='all')
+            ## replicas which already accepted / rejected send DoNothingRequests
+            if isinstance(parcel.data, DoNothingRequest):
+                n_syncs += 1
+                continue
+            i, j = positions[parcel.sender]
+            works[i][j], heats[i][j] = parcel.data
+            n_received[i] += 1
+            n_works += 1
+            if n_received[i] == 2:
+                acc[i] = self._calculate_acceptance(works[i:i+1], uniforms[i:i+1])[0]
+                replica1, replica2, _ = swap_list[i]
+                if acc[i]:
+                    self._send_accept_exchange_request(replica1)
+                    self._send_accept_exchange_request(replica2)
+                else:
+                    self._send_reject_exchange_request(replica1)
+                    self._send_reject_exchange_request(replica2)
+
+        self._receive_sync_requests(self._n_syncs_per_swap * n_swaps - n_syncs)
+
+        return acc, works, heats
+
+
+class DirectExchangeMaster(AsyncExchangeMaster):
+    '''
+    Master object which sends a single request to each replica of a pair telling
+    it to exchange state and energy directly with its partner and to then
+    calculate its proposal. Replicas thus do not need the master to keep
+    their state exchange in sync. Works are collected like in
+    :class:`.AsyncExchangeMaster`, but replicas don't acknowledge accept / reject
+    requests: communication with each replica is ordered, so the next message
+    of a replica implies that it finished the swap.
+
+    The master sends and receives six messages per pair: two requests to exchange
+    states and propose, two works messages and two accept / reject requests.
+    The last four remain because the master decides on acceptance, which
+    requires both works, and draws the random numbers for it, so swap outcomes
+    don't depend on the timing of messages.
+
+    Takes the same arguments as :class:`.ExchangeMaster`.
+    '''
+
+    _n_syncs_per_swap = 0
+
+    def _send_accept_exchange_request(self, dest):
+        '''
+        Sends a request to accept a proposed swap state, which the replica
+        doesn't acknowledge.
+
+        :param dest: name of destination replica
+        :type dest: str
+        '''
+        parcel = Parcel(self.name, dest, AcceptDirectSwapRequest(self.name, True))
+        self._comm.send(parcel, dest)
+
+    def _send_reject_exchange_request(self, dest):
+        '''
+        Sends a request to reject a proposed swap state, which the replica
+        doesn't acknowledge.
+
+        :param dest: name of destination replica
+        :type dest: str
+        '''
+        parcel = Parcel(self.name, dest, AcceptDirectSwapRequest(self.name, False))
+        self._comm.send(parcel, dest)
+
+    def _send_exchange_states_propose_request(self, replica1, replica2, params):
+        '''
+        Sends a request to replica1 telling it to exchange states with replica2
+        and to then propose a state for replica2 using information in params
+
+        :param replica1: name of 1st replica involved in swap
+        :type replica1: str
+
+        :param replica2: name of 2nd replica involved in swap
+        :type replica2: str
+
+        :param params: an :class:`.ExchangeParams` object holding information required
+                       to perform the swap
+        :type params: :class:`.ExchangeParams`
+        '''
+
+        request = ExchangeStatesProposeRequest(self.name, replica2, params)
+        self._comm.send(Parcel(self.name, replica1, request), dest=replica1)
+
+    def _trigger_proposal_calculation(self, swap_list):
+        '''
+        Makes all involved replicas exchange states and propose states.
+
+        :param swap_list: a list of list in which each list element contains two replica  
+                          names involved in a swap an an :class:`.ExchangeParams` object
+        :type swap_list: list
+        '''
+
+        for replica1, replica2, params in swap_list:
+            self._send_exchange_states_propose_request(replica1, replica2, params)
+            params.proposer_params.reverse()
+            self._send_exchange_states_propose_request(replica2, replica1, params)
+            params.proposer_params.reverse()
+
+
+class ParameterExchangeMaster(ExchangeMaster):
+
+    def __init__(self, name, replica_names, swap_params, 
+                 sampling_statistics, swap_statistics, 
+                 comm, pdf_params, swap_list_generator=None):
+        '''
+        Master object for RE which swaps the parameters of the replicas' PDFs
+        (for example, temperatures) instead of their states. Each replica
+        calculates the energy difference of its state under its partner's and
+        its own parameters; only these works and the parameters are sent, and
+        states never leave their replicas.
+
+        The parameter sets are labeled by the replica names: the i-th parameter
+        set belongs to replica_names[i], which is the replica holding it at the
+        beginning. Swap lists, swap statistics and sampling statistics refer to
+        these labels, so they are reported per parameter set, while a
+        permutation keeps track of which replica currently holds which parameter
+        set. Replicas record the index of their parameter set for each sampling
+        step, which allows to sort their samples and energies by parameter set.
+
+        Takes the same arguments as :class:`.ExchangeMaster` and additionally
+
+        :param pdf_params: a dictionary of PDF parameter names and values for each
+                           parameter set, which replicas set using item assignment
+                           on their PDFs
+        :type pdf_params: list of dict
+        '''
+
+        super(ParameterExchangeMaster, self).__init__(name, replica_names, swap_params,
+                                                      sampling_statistics, swap_statistics,
+                                                      comm, swap_list_generator)
+
+        self.pdf_params = pdf_params
+        self._param_indices = {label: i for i, label in enumerate(replica_names)}
+        ## the i-th element is the name of the replica holding the i-th parameter set
+        self._permutation = list(replica_names)
+        ## steps after which the permutation changed and the parameter set
+        ## indices of all replicas valid from the next step on
+        self._permutation_history = [(-1, self._replica_param_indices())]
+
+    def _replica_param_indices(self):
+        '''
+        Returns the indices of the parameter sets the replicas currently hold
+
+        :rtype: dict
+        '''
+
+        return {replica_name: i for i, replica_name in enumerate(self._permutation)}
+
+    def _holder(self, label):
+        '''
+        Returns the name of the replica currently holding a parameter set
+
+        :param str label: the label of the parameter set
+
+        :return: a replica name
+        :rtype: str
+        '''
+
+        return self._permutation[self._param_indices[label]]
+
+    def _send_set_pdf_params_requests(self):
+        '''
+        Sends each replica the parameter set it currently holds
+        '''
+
+        for i, replica_name in enumerate(self._permutation):
+            request = SetPDFParamsRequest(self.name, self.pdf_params[i], i)
+            self._comm.send(Parcel(self.name, replica_name, request), dest=replica_name)
+
+    def run(self, n_iterations, *args, **kwargs):
+
+        self._send_set_pdf_params_requests()
+
+        super(ParameterExchangeMaster, self).run(n_iterations, *args, **kwargs)
+
+    def _perform_exchanges(self, swap_list):
+        '''
+        Attempts exchanges of parameter sets defined in swap_list. 
+
+        :param swap_list: a list of list in which each list element contains the labels
+                          of two parameter sets and an :class:`.ExchangeParams` object
+        :type swap_list: list
+
+        :return: three lists: acceptance statuses (0 / 1), works  and heats
+        :rtype: list
+        '''
+
+        self._trigger_work_calculation(swap_list)
+        works, heats = self._receive_works(swap_list)
+        acc = self._calculate_acceptance(works)
+        self._trigger_exchanges(swap_list, acc)
+
+        return zip(acc, works, heats)
+
+    def _trigger_work_calculation(self, swap_list):
+        '''
+        Makes the holders of both parameter sets of each pair calculate the energy
+        difference of their states under the other parameter set
+
+        :param swap_list: a list of list in which each list element contains the labels
+                          of two parameter sets and an :class:`.ExchangeParams` object
+        :type swap_list: list
+        '''
+
+        for label1, label2, _ in swap_list:
+            for label, other in ((label1, label2), (label2, label1)):
+                replica_name = self._holder(label)
+                params = self.pdf_params[self._param_indices[other]]
+                request = CalculatePDFParamsWorkRequest(self.name, params)
+                self._comm.send(Parcel(self.name, replica_name, request), dest=replica_name)
+
+    def _receive_works(self, swap_list):
+        '''
+        Receives works from all replicas involved in swaps. The first work of
+        a pair is the one of the replica proposed to take over the first parameter set
+
+        :param swap_list: a list of list in which each list element contains the labels
+                          of two parameter sets and an :class:`.ExchangeParams` object
+        :type swap_list: list
+
+        :return: lists of works and heats
+        :rtype: list
+        '''
+
+        works = np.zeros((len(swap_list), 2))
+        heats = np.zeros((len(swap_list), 2))
+        for i, (label1, label2, _) in enumerate(swap_list):
+            works[i][0], heats[i][0] = self._comm.recv(source=self._holder(label2)).data
+            works[i][1], heats[i][1] = self._comm.recv(source=self._holder(label1)).data
+
+        return works, heats
+
+    def _trigger_exchanges(self, swap_list, acc):
+        '''
+        Makes the replicas of accepted pairs swap their parameter sets, updates the
+        permutation and makes all replicas involved in swaps store their states
+        as samples
+
+        :param swap_list: a list of list in which each list element contains the labels
+                          of two parameter sets and an :class:`.ExchangeParams` object
+        :type swap_list: list
+
+        :param acc: array containing boolean (0 / 1) values indicating which
+                    swaps have been accepted and which haven't
+        :type acc: numpy.ndarray
+        '''
+
+        for i, (label1, label2, _) in enumerate(swap_list):
+            index1 = self._param_indices[label1]
+            index2 = self._param_indices[label2]
+            replica1 = self._permutation[index1]
+            replica2 = self._permutation[index2]
+            for replica_name, index in ((replica1, index2), (replica2, index1)):
+                request = SwapPDFParamsRequest(self.name, bool(acc[i]),
+                                               self.pdf_params[index], index)
+                self._comm.send(Parcel(self.name, replica_name, request), dest=replica_name)
+            if acc[i]:
+                self._permutation[index1] = replica2
+                self._permutation[index2] = replica1
+            ## receives DoNothingRequests to achieve synchronisation
+            self._comm.recv(replica1)
+            self._comm.recv(replica2)
+
+        if any(acc):
+            self._permutation_history.append((self.step, self._replica_param_indices()))
+
+    def _get_no_ex_replicas(self, swap_list):
+        '''
+        For a given swap list, calculate which replicas do NOT perform swaps
+        and thus will continue normal sampling.
+
+        :param swap_list: a list of list in which each list element contains the labels
+                          of two parameter sets and an :class:`.ExchangeParams` object
+        :type swap_list: list
+
+        :return: a list of replica names
+        :rtype: list
+        '''
+
+        labels = super(ParameterExchangeMaster, self)._get_no_ex_replicas(swap_list)
+
+        return [self._holder(label) for label in labels]
+
+    def _receive_and_update_stats(self, replicas):
+        '''
+        Receive sampling statistics from replicas and update the statistics of
+        the parameter sets the replicas held when the statistics were recorded
+
+        :param replicas: labels of parameter sets
+        :type replicas: list
+        '''
+
+        from bisect import bisect_left
+        from rexfw.statistics.summaries import SamplerStatsSummary
+
+        history_steps = [step for step, _ in self._permutation_history]
+        for replica_name in [self._holder(label) for label in replicas]:
+            sampler_stats_list = self._comm.recv(source=replica_name).data
+            for item in sampler_stats_list:
+                if isinstance(item, SamplerStatsSummary):
+                    ## replicas summarize statistics per parameter set
+                    label = self.replica_names[item.param_index]
+                    self.sampling_statistics.update([label], [item])
+                    continue
+                step, sampling_stats = item
+                param_indices = self._permutation_history[bisect_left(history_steps, step) - 1][1]
+                label = self.replica_names[param_indices[replica_name]]
+                self.sampling_statistics.update_single_step([label], step, sampling_stats)
+
+        if len(replicas) == self._n_replicas:
+            ## earlier permutations are not needed anymore
+            self._permutation_history = self._permutation_history[-1:]
+
+    def _update_sampling_statistics(self, which_replicas=None):
+        '''
+        Update sampling statistics
+
+        :params which_replicas: labels of parameter sets for which to update statistics
+        :type which_replicas: list
+        '''
+        
+        if which_replicas is None:
+            which_replicas = self.replica_names
+
+        self._send_send_stats_requests([self._holder(label) for label in which_replicas])
+        self._receive_and_update_stats(which_replicas)
+
+
+class EnergyExchangeMaster(ParameterExchangeMaster):
+
+    def __init__(self, name, replica_names, swap_params, 
+                 sampling_statistics, swap_statistics, 
+                 comm, pdf_params, swap_list_generator=None):
+        '''
+        Master object for RE which, like :class:`.ParameterExchangeMaster`, decides
+        on swaps based only on the energy differences of the replicas' states under
+        their partners' and their own PDF parameters. Other than that, replicas
+        keep their parameters and states are swapped, but only those of accepted
+        pairs are sent. With low acceptance rates, most state transfers are thus
+        avoided, while the output of each replica still belongs to a single
+        parameter set.
+
+        Takes the same arguments as :class:`.ParameterExchangeMaster`; the i-th
+        parameter set is the one of replica_names[i].
+        '''
+
+        super(EnergyExchangeMaster, self).__init__(name, replica_names, swap_params,
+                                                   sampling_statistics, swap_statistics,
+                                                   comm, pdf_params, swap_list_generator)
+
+    def _send_accept_partner_state_request(self, dest, accept):
+        '''
+        Sends a request to take over the buffered state of the exchange partner
+        or to keep the current state
+
+        :param dest: name of destination replica
+        :type dest: str
+
+        :param bool accept: whether to take over the partner's state
+        '''
+
+        parcel = Parcel(self.name, dest, AcceptPartnerStateRequest(self.name, bool(accept)))
+        self._comm.send(parcel, dest)
+
+    def _trigger_exchanges(self, swap_list, acc):
+        '''
+        Makes the replicas of accepted pairs exchange their states and take over
+        their partners' states. Replicas of rejected pairs only store their
+        current states as samples
+
+        :param swap_list: a list of list in which each list element contains two replica  
+                          names involved in a swap an an :class:`.ExchangeParams` object
+        :type swap_list: list
+
+        :param acc: array containing boolean (0 / 1) values indicating which
+                    swaps have been accepted and which haven't
+        :type acc: numpy.ndarray
+        '''
+
+        for i, (replica1, replica2, _) in enumerate(swap_list):
+            if acc[i]:
+                self._send_get_state_and_energy_request(replica1, replica2)
+                self._send_get_state_and_energy_request(replica2, replica1)
+            self._send_accept_partner_state_request(replica1, acc[i])
+            self._send_accept_partner_state_request(replica2, acc[i])
+            ## receives DoNothingRequests to achieve synchronisation
+            self._comm.recv(replica1)
+            self._comm.recv(replica2)
+
+
+class MultipleTryExchangeMaster(ExchangeMaster):
+
+    def __init__(self, name, replica_names, swap_params, 
+                 sampling_statistics, swap_statistics, 
+                 comm, swap_list_generator=None):
+        '''
+        Master object for multiple-try RENS, in which the proposers of both replicas
+        generate several independent trajectories (c.f. the n_trials argument of
+        :class:`.AbstractRENSProposer`) and each select one of them as the proposal.
+        To accept or reject a swap, both replicas then exchange their proposals and
+        generate reference trajectories starting from their partner's proposal.
+        Each replica sends an effective work (c.f. :func:`.multiple_try_work`),
+        which is used in the acceptance criterion and is logged in the swap
+        statistics instead of the work of the selected trajectory.
+
+        With a single trial per proposal, this results in the same swaps as
+        :class:`.ExchangeMaster`, but with an additional exchange of proposals.
+
+        Takes the same arguments as :class:`.ExchangeMaster`.
+        '''
+
+        super(MultipleTryExchangeMaster, self).__init__(name, replica_names, swap_params,
+                                                        sampling_statistics,
+                                                        swap_statistics, comm,
+                                                        swap_list_generator)
+
+    def _perform_exchanges(self, swap_list):
+        '''
+        Attempts exchanges defined in swap_list. 
+
+        :param swap_list: a list of list in which each list element contains two replica  
+                          names involved in a swap an an :class:`.ExchangeParams` object
+        :type swap_list: list
+
+        :return: three lists: acceptance statuses (0 / 1), effective works and
+                 heats of the selected trajectories
+        :rtype: list
+        '''
+
+        self._trigger_proposal_calculation(swap_list)
+        works, heats = self._receive_works(swap_list)
+        self._trigger_reference_calculation(swap_list, works)
+        works, _ = self._receive_works(swap_list)
+        acc = self._calculate_acceptance(works)
+        self._trigger_exchanges(swap_list, acc)
+
+        return zip(acc, works, heats)
+
+    def _send_send_proposal_request(self, replica1, replica2):
+        '''
+        Makes replica1 send its buffered proposal and its energy to replica2.
+        Receives a :class:`.DoNothingRequest` from replica2 once it stored them
+
+        :param replica1: name of 1st replica involved in swap
+        :type replica1: str
+
+        :param replica2: name of 2nd replica involved in swap
+        :type replica2: str
+        '''
+
+        self._comm.send(Parcel(self.name, replica1,
+                               SendProposalRequest(self.name, replica2)),
+                        replica1)
+        self._comm.recv(source=replica2)
+
+    def _send_propose_references_request(self, replica1, replica2, partner_work, params):
+        '''
+        Sends a request to replica1 telling it to generate reference trajectories
+        starting from the proposal of replica2
+
+        :param replica1: name of 1st replica involved in swap
+        :type replica1: str
+
+        :param replica2: name of 2nd replica involved in swap
+        :type replica2: str
+
+        :param float partner_work: the work of the trajectory replica2 selected
+
+        :param params: an :class:`.ExchangeParams` object holding information required
+                       to perform the swap
+        :type params: :class:`.ExchangeParams`
+        '''
+
+        request = ProposeReferencesRequest(self.name, replica2, partner_work, params)
+        self._comm.send(Parcel(self.name, replica1, request), dest=replica1)
+
+    def _trigger_reference_calculation(self, swap_list, works):
+        '''
+        Makes the replicas of all swapping pairs exchange their proposals and
+        generate reference trajectories
+
+        :param swap_list: a list of list in which each list element contains two replica  
+                          names involved in a swap an an :class:`.ExchangeParams` object
+        :type swap_list: list
+
+        :param works: the works of the selected trajectories as returned by
+                      :meth:`_receive_works`
+        :type works: numpy.ndarray
+        '''
+
+        for i, (replica1, replica2, params) in enumerate(swap_list):
+
+            self._send_send_proposal_request(replica1, replica2)
+            self._send_send_proposal_request(replica2, replica1)
+            self._send_propose_references_request(replica1, replica2, works[i][1], params)
+            params.proposer_params.reverse()
+            self._send_propose_references_request(replica2, replica1, works[i][0], params)
+            params.proposer_params.reverse()
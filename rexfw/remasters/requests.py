@@ -6,10 +6,21 @@ from collections import namedtuple
 
 
 SampleRequest = namedtuple('SampleRequest', 'sender')
+SampleNRequest = namedtuple('SampleNRequest', 'sender n_steps')
 DieRequest = namedtuple('DieRequest', 'sender')
 ProposeRequest = namedtuple('ProposeRequest', 'sender partner params')
 AcceptBufferedProposalRequest = namedtuple('AcceptBufferedProposalRequest', 'sender accept')
 GetStateAndEnergyRequest_master = namedtuple('GetStateAndEnergyRequest_master', 'sender partner')
 SendGetStateAndEnergyRequest = namedtuple('SendGetStateAndEnergyRequest', 'sender partner')
+ExchangeStatesProposeRequest = namedtuple('ExchangeStatesProposeRequest', 'sender partner params')
 DumpSamplesRequest = namedtuple('DumpSamplesRequest', 'sender s_min s_max offset dump_step')
+SetupSampleStoreRequest = namedtuple('SetupSampleStoreRequest', 'sender dump_interval dump_step')
 SendStatsRequest = namedtuple('SendStatsRequest', 'sender')
+SetPDFParamsRequest = namedtuple('SetPDFParamsRequest', 'sender params param_index')
+CalculatePDFParamsWorkRequest = namedtuple('CalculatePDFParamsWorkRequest', 'sender params')
+SwapPDFParamsRequest = namedtuple('SwapPDFParamsRequest', 'sender accept params param_index')
+AcceptPartnerStateRequest = namedtuple('AcceptPartnerStateRequest', 'sender accept')
+AcceptDirectSwapRequest = namedtuple('AcceptDirectSwapRequest', 'sender accept')
+SendProposalRequest = namedtuple('SendProposalRequest', 'sender partner')
+ProposeReferencesRequest = namedtuple('ProposeReferencesRequest',
+                                      'sender partner partner_work params')
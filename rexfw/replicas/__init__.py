@@ -6,13 +6,21 @@ from abc import abstractmethod, abstractproperty
 
 from rexfw import Parcel
 from rexfw.replicas.requests import GetStateAndEnergyRequest, StoreStateEnergyRequest
+from rexfw.replicas.requests import PartnerStateEnergyRequest
+from rexfw.replicas.sample_stores import SampleStore
+from rexfw.replicas.sample_writers import PickleSampleWriter
 
 class Replica(object):
 
     _current_master = None
+    _buffered_partner_name = None
+    _pending_exchange_request = None
+    _energy = None
+    param_index = None
     
     def __init__(self, name, state, pdf, sampler_class, sampler_params, 
-                 proposers, output_folder, comm):
+                 proposers, output_folder, comm, immutable_states=False,
+                 sample_writer=None, background_writer=None, aggregate_stats=False):
         '''
         Default replica class
 
@@ -44,9 +52,32 @@ class Replica(object):
         :param comm: a communicator object to communicate with the master object
                      and other replicas
         :type comm: :class:`.AbstractCommunicator`
+
+        :param immutable_states: if True, states are assumed to never be modified
+                                 in place once the sampler returned them. Then
+                                 each sample is copied only once and the same object
+                                 serves as the replica state and the stored sample
+        :type immutable_states: bool
+
+        :param sample_writer: an object writing samples to files; defaults to a
+                              :class:`.PickleSampleWriter` writing to the samples/
+                              subfolder of the output folder
+        :type sample_writer: :class:`.AbstractSampleWriter`
+
+        :param background_writer: if given, samples and energies are written by this
+                                  object on a background thread and dump requests
+                                  return immediately. All writes are finished
+                                  before the replica quits
+        :type background_writer: :class:`.BackgroundWriter`
+
+        :param bool aggregate_stats: if True, sampler statistics are summed up
+                                     in a :class:`.SamplerStatsSummary` instead of
+                                     being stored and sent to the master object
+                                     for every sampling step
         '''
 
         self.name = name
+        self.immutable_states = immutable_states
         self.samples = []
         self._sampler = None
         self._state = None
@@ -60,32 +91,66 @@ class Replica(object):
         self._comm = comm
         self._setup_sampler()
 
+        if sample_writer is None:
+            sample_writer = PickleSampleWriter(output_folder + 'samples/', name)
+        self._sample_writer = sample_writer
+        self._background_writer = background_writer
+
         self.energy_trace = []
+        self.param_index_trace = []
         self._n_samples_drawn = 0
 
         self.sampler_stats = []
+        self.aggregate_stats = aggregate_stats
 
         self._request_processing_table = {}
         self._setup_request_processing_table()
 
     def _setup_request_processing_table(self):
         '''
-        Sets up a dictionary containing possible incoming request objects as 
-        keys and string templates for the function calls to process the request
-        as values
+        Sets up a dictionary containing the class names of possible incoming
+        request objects as keys and the bound methods processing the requests
+        as values. Subclasses can add entries to handle additional requests
         '''
 
         self._request_processing_table = dict(
-            SampleRequest='self._sample({})',
-            SendStatsRequest='self._send_stats({})',
-            ProposeRequest='self._propose({})',
-            AcceptBufferedProposalRequest='self._accept_buffered_proposal({})',
-            SendGetStateAndEnergyRequest='self._send_get_state_and_energy_request({})',
-            StoreStateEnergyRequest='self._store_state_energy({})',
-            GetStateAndEnergyRequest='self._send_state_and_energy({})',
-            DumpSamplesRequest='self._dump_samples({})',
-            DoNothingRequest='self._do_nothing({})',
-            DieRequest='-1')
+            SampleRequest=self._sample,
+            SampleNRequest=self._sample_n,
+            SendStatsRequest=self._send_stats,
+            ProposeRequest=self._propose,
+            AcceptBufferedProposalRequest=self._accept_buffered_proposal,
+            SendGetStateAndEnergyRequest=self._send_get_state_and_energy_request,
+            ExchangeStatesProposeRequest=self._exchange_states_and_propose,
+            PartnerStateEnergyRequest=self._store_partner_state_energy,
+            StoreStateEnergyRequest=self._store_state_energy,
+            GetStateAndEnergyRequest=self._send_state_and_energy,
+            DumpSamplesRequest=self._dump_samples,
+            SetupSampleStoreRequest=self._setup_sample_store,
+            SetPDFParamsRequest=self._set_pdf_params_and_index,
+            CalculatePDFParamsWorkRequest=self._calculate_pdf_params_work,
+            SwapPDFParamsRequest=self._swap_pdf_params,
+            AcceptPartnerStateRequest=self._accept_partner_state,
+            AcceptDirectSwapRequest=self._accept_direct_swap,
+            SendProposalRequest=self._send_proposal,
+            ProposeReferencesRequest=self._propose_references,
+            DoNothingRequest=self._do_nothing,
+            DieRequest=self._die)
+
+    def _die(self, request):
+        '''
+        Makes the listening loop processing requests for this replica quit
+
+        :param request: a :class:`.DieRequest`
+        :type request: :class:`.DieRequest`
+
+        :return: -1, which signals the end of the listening loop
+        :rtype: int
+        '''
+        if self._background_writer is not None:
+            ## the process may end right after the replica died
+            self._background_writer.flush(fsync=True)
+
+        return -1
 
     def _do_nothing(self, request):
         '''
@@ -118,12 +183,13 @@ class Replica(object):
     @state.setter
     def state(self, value):
         '''
-        Sets the replica and sampler state
+        Sets the replica and sampler state and invalidates the cached replica energy
 
         :param value: value to set states to
         :type value: depends on your application
         '''
         self._state = value
+        self._energy = None
         if not self._sampler is None:
             self._sampler._state = value
 
@@ -169,6 +235,54 @@ class Replica(object):
         parcel = Parcel(self.name, self._current_master, DoNothingRequest(self.name))
         self._comm.send(parcel, dest=self._current_master)
     
+    def _store_partner_state_energy(self, request):
+        '''
+        Stores state and energy of an exchange partner given in request parameter.
+        Other than :meth:`_store_state_energy`, this does not sync with the master object.
+        If this replica is waiting for the state of this partner to calculate a swap
+        proposal, the proposal is calculated now
+
+        :param request: a request object containing current state and energy of a different
+                        replica
+        :type request: :class:`.PartnerStateEnergyRequest`
+        '''
+        self._buffered_partner_state = request.state
+        self._buffered_partner_energy = request.energy
+        self._buffered_partner_name = request.sender
+
+        pending = self._pending_exchange_request
+        if pending is not None and pending.partner == request.sender:
+            self._pending_exchange_request = None
+            self._buffered_partner_name = None
+            self._propose(pending)
+
+    def _exchange_states_and_propose(self, request):
+        '''
+        Exchanges state and energy directly with the exchange partner given in the
+        request parameter, then calculates a swap proposal and sends works and heats
+        to the master object. If the partner's state and energy already arrived
+        before the request, only this replica's state and energy are sent. If the
+        partner lives in the same process, it can't answer before this request is
+        processed, so the proposal is calculated once its state and energy arrive.
+
+        :param request: a request object containing the name of the exchange partner
+                        and information needed to calculate the proposal
+        :type request: :class:`.ExchangeStatesProposeRequest`
+        '''
+        self._current_master = request.sender
+        parcel = Parcel(self.name, request.partner,
+                        PartnerStateEnergyRequest(self.name, self.state, self.energy))
+        if self._buffered_partner_name == request.partner:
+            self._comm.send(parcel, request.partner)
+        elif self._comm.is_local(request.partner):
+            self._comm.send(parcel, request.partner)
+            self._pending_exchange_request = request
+            return
+        else:
+            self._store_partner_state_energy(self._comm.sendrecv(parcel, request.partner).data)
+        self._buffered_partner_name = None
+        self._propose(request)
+        
     def _sample(self, request):
         '''
         Makes the sampler draw a sample, stores it, stores sampling statistics,
@@ -178,13 +292,47 @@ class Replica(object):
         :type request: :class:`.SampleRequest`
         '''
         from copy import deepcopy
+        ## the copy protects against the sampler modifying its state in place
         res = deepcopy(self._sampler.sample())
-        self.state = res
-        self.samples.append(deepcopy(res))
-        self.sampler_stats.append([self._n_samples_drawn, self._sampler.last_draw_stats])
+        ## the sampler already is in this state, so it is not set again
+        self._state = res
+        self._energy = getattr(self._sampler, 'last_energy', None)
+        self._store_sample(res)
+        self._record_sampler_stats(self._n_samples_drawn, self._sampler.last_draw_stats)
         self._update_energy_trace()
         self._increase_sample_counter()
         
+    def _record_sampler_stats(self, step, stats):
+        '''
+        Stores the sampler statistics of a sampling step or adds them to the
+        summary of the current statistics update interval. A new summary is
+        started when the replica's PDF parameter set changed
+
+        :param int step: the sampling step
+
+        :param stats: the sampler statistics of that step
+        :type stats: dict
+        '''
+        from rexfw.statistics.summaries import SamplerStatsSummary
+
+        if not self.aggregate_stats:
+            self.sampler_stats.append([step, stats])
+            return
+        if len(self.sampler_stats) == 0 \
+           or self.sampler_stats[-1].param_index != self.param_index:
+            self.sampler_stats.append(SamplerStatsSummary(self.param_index))
+        self.sampler_stats[-1].add(step, stats)
+
+    def _sample_n(self, request):
+        '''
+        Performs several sampling steps, each as in :meth:`_sample`
+
+        :param request: a request object containing the number of sampling steps
+        :type request: :class:`.SampleNRequest`
+        '''
+        for _ in xrange(request.n_steps):
+            self._sample(request)
+
     def _send_stats(self, request):
         '''
         Sends sampling statistics to master object. Also empties sampling stats list
@@ -197,6 +345,34 @@ class Replica(object):
         self._comm.send(parcel, request.sender)
         self.sampler_stats = []
 
+    def _setup_sample_store(self, request):
+        '''
+        Replaces the list of stored samples by a :class:`.SampleStore` which
+        keeps only the samples which will be written to files
+
+        :param request: a request object containing the intervals with which
+                        samples will be written
+        :type request: :class:`.SetupSampleStoreRequest`
+        '''
+        self.samples = SampleStore.for_dumps(request.dump_interval, request.dump_step,
+                                             copy=not self.immutable_states)
+
+    def _store_sample(self, state):
+        '''
+        Appends a state to the stored samples. Unless states are immutable, 
+        the stored sample is a copy of the state
+
+        :param state: the state to store
+        :type state: depends on your application
+        '''
+        from copy import deepcopy
+
+        if isinstance(self.samples, SampleStore):
+            ## sample stores copy the samples they keep
+            self.samples.append(state)
+        else:
+            self.samples.append(state if self.immutable_states else deepcopy(state))
+
     def _dump_samples(self, request):
         '''
         Writes samples and energies to a file, then empties list of stored samples
@@ -205,42 +381,78 @@ class Replica(object):
         :param request: a request object containing information which samples to write
         :type request: :class:`.DumpSamplesRequest`
         '''
-        import numpy, os
+        import numpy
+
+        if isinstance(self.samples, SampleStore):
+            n_samples = self.samples.n_appended
+            indices = self.samples.sample_indices()
+            samples = self.samples.to_array() if self.samples.stores_arrays \
+                      else self.samples.to_list()
+            if self.samples.stride != request.dump_step:
+                ## the store keeps samples which are not to be written
+                dumped = indices % request.dump_step == 0
+                indices = indices[dumped]
+                samples = samples[dumped] if self.samples.stores_arrays \
+                          else [s for s, d in zip(samples, dumped) if d]
+        else:
+            n_samples = len(self.samples)
+            indices = numpy.arange(n_samples)[::request.dump_step]
+            samples = self.samples[::request.dump_step]
+        steps = self._n_samples_drawn - n_samples + indices + request.offset
+        if self._background_writer is not None and isinstance(samples, numpy.ndarray) \
+           and samples.base is not None:
+            ## the sample store's memory is reused before the samples are written
+            samples = samples.copy()
+        self._write(self._sample_writer.write, samples, steps,
+                    request.s_min + request.offset, request.s_max + request.offset)
+
+        if isinstance(self.samples, SampleStore):
+            self.samples.clear()
+        else:
+            self.samples = []
+        self._dump_energies()
 
-        filename = '{}samples/samples_{}_{}-{}.pickle'.format(self.output_folder, 
-                                                              self.name, 
-                                                              request.s_min + request.offset, 
-                                                              request.s_max + request.offset)
-        with open(filename, 'w') as opf:
-            from cPickle import dump
-            dump(self.samples[::request.dump_step], opf, 2)
+    def _write(self, function, *args):
+        '''
+        Calls a function writing data, either right away or, if this replica
+        has a background writer, on its background thread
 
-        self.samples = []
-        self._dump_energies()
+        :param function: a function writing data
+        :type function: callable
+        '''
+        if self._background_writer is None:
+            function(*args)
+        else:
+            self._background_writer.submit(function, *args)
 
     def _dump_energies(self):
         '''
-        Updates files with replica energies and empties list of stored energies
+        Appends stored replica energies to the replica's energy file and
+        empties list of stored energies
         '''
-        import numpy, os
-        
+        import numpy
+        from rexfw.replicas.sample_writers import append_to_npy
+
         Es_folder = self.output_folder + 'energies/'
         Es_filename = Es_folder + self.name + '.npy'
-        if os.path.exists(Es_filename):
-            self.energy_trace = list(numpy.load(Es_filename)) + self.energy_trace
-        numpy.save(Es_filename, numpy.array(self.energy_trace))
+        if len(self.energy_trace) > 0:
+            self._write(append_to_npy, Es_filename, numpy.array(self.energy_trace))
+        if len(self.param_index_trace) > 0:
+            self._write(append_to_npy, Es_folder + self.name + '_param_indices.npy',
+                        numpy.array(self.param_index_trace))
         self.energy_trace = []
+        self.param_index_trace = []
                 
     def process_request(self, request):
         '''
-        Processes a request by looking up the corresponding function in the
-        request processing table
+        Processes a request by looking up the corresponding method in the
+        request processing table and calling it
 
         :param request: request object to process
         :type request: depends
         '''
 
-        return eval(self._request_processing_table[request.__class__.__name__].format('request'))
+        return self._request_processing_table[request.__class__.__name__](request)
     
     def _propose(self, request):
         '''
@@ -254,6 +466,48 @@ class Replica(object):
         proposal = self._calculate_proposal(request)
         self._send_works_heats(proposal)
         self._buffered_proposal = proposal[-1]
+        self._buffered_trial_works = getattr(proposal, 'trial_works', [proposal.work])
+
+    def _send_proposal(self, request):
+        '''
+        Sends the buffered proposal and its energy to the exchange partner
+        given in the request and makes it store them as its partner's state and energy
+
+        :param request: a request object containing the name of the exchange partner
+        :type request: :class:`.SendProposalRequest`
+        '''
+
+        self._current_master = request.sender
+        proposal = self._buffered_proposal
+        new_request = StoreStateEnergyRequest(self.name, proposal, self.get_energy(proposal))
+        self._comm.send(Parcel(self.name, request.partner, new_request), request.partner)
+
+    def _propose_references(self, request):
+        '''
+        Generates the reference trajectories of a multiple-try swap starting from
+        the buffered proposal of the exchange partner and sends the effective work
+        (c.f. :func:`.multiple_try_work`) and a zero heat to the master object
+
+        :param request: a request object containing the work of the trajectory the
+                        partner selected and information needed to calculate the
+                        reference trajectories
+        :type request: :class:`.ProposeReferencesRequest`
+        '''
+
+        from rexfw.proposers.rens import multiple_try_work
+
+        self._current_master = request.sender
+        params = request.params
+        proposer = self.proposers[self._pick_proposer(params)]
+        proposer.partner_name = request.partner
+        reference_works = proposer.propose_references(self,
+                                                      self._buffered_partner_state,
+                                                      self._buffered_partner_energy,
+                                                      params.proposer_params)
+        work = multiple_try_work(self._buffered_trial_works, reference_works,
+                                 request.partner_work)
+        self._comm.send(Parcel(self.name, self._current_master, (float(work), 0.0)),
+                        self._current_master)
 
     def _send_works_heats(self, proposal):
         '''
@@ -320,17 +574,126 @@ class Replica(object):
         :type request: :class:`.AcceptBufferedProposalRequest`
         '''
 
-        from copy import deepcopy
-        
         if request.accept:
             self.state = self._buffered_proposal
-        self.samples.append(deepcopy(self.state))
-        from rexfw.replicas.requests import DoNothingRequest
-        self._comm.send(Parcel(self.name, self._current_master, DoNothingRequest(self.name)), 
-                        self._current_master)
+        self._finish_swap()
+
+    def _accept_partner_state(self, request):
+        '''
+        If the information in the request object says so, sets the replica state to
+        the buffered state of the exchange partner. In any case, finishes the swap
+        as in :meth:`_accept_buffered_proposal`
+
+        :param request: a request containing information whether the partner's
+                        state should be taken over or not
+        :type request: :class:`.AcceptPartnerStateRequest`
+        '''
+
+        self._current_master = request.sender
+        if request.accept:
+            self.state = self._buffered_partner_state
+        self._finish_swap()
+
+    def _accept_direct_swap(self, request):
+        '''
+        Accepts or rejects the buffered proposal of a swap with direct state
+        exchange like :meth:`_accept_buffered_proposal`, but doesn't sync with the
+        master object: the master knows the swap is finished once it receives
+        the next message of this replica
+
+        :param request: a request containing information whether the proposal
+                        should be accepted or not
+        :type request: :class:`.AcceptDirectSwapRequest`
+        '''
+
+        if request.accept:
+            self.state = self._buffered_proposal
+        self._finish_swap(sync=False)
+
+    def _finish_swap(self, sync=True):
+        '''
+        Appends the current replica state to the list of stored samples, syncs
+        communication with master object and updates stored replica energies 
+        and the sample counter
+
+        :param bool sync: whether to send a :class:`.DoNothingRequest` to the
+                          master object
+        '''
+
+        self._store_sample(self.state)
+        if sync:
+            from rexfw.replicas.requests import DoNothingRequest
+            self._comm.send(Parcel(self.name, self._current_master, DoNothingRequest(self.name)), 
+                            self._current_master)
         self._update_energy_trace()
         self._increase_sample_counter()
 
+    def _set_pdf_params(self, params):
+        '''
+        Sets parameters of the replica's PDF using item assignment
+
+        :param dict params: parameter names and values
+
+        :return: the previous values of the parameters
+        :rtype: dict
+        '''
+
+        old_params = {}
+        for name, value in params.iteritems():
+            old_params[name] = self.pdf[name]
+            self.pdf[name] = value
+
+        return old_params
+
+    def _set_pdf_params_and_index(self, request):
+        '''
+        Sets parameters of the replica's PDF and the index of the parameter set,
+        which is recorded along with the energies from then on
+
+        :param request: a request object containing the parameters and their index
+        :type request: :class:`.SetPDFParamsRequest`
+        '''
+
+        self._set_pdf_params(request.params)
+        self.param_index = request.param_index
+        self._energy = None
+        if hasattr(self._sampler, 'pdf_changed'):
+            self._sampler.pdf_changed()
+
+    def _calculate_pdf_params_work(self, request):
+        '''
+        Calculates the energy difference of the current state under other PDF
+        parameters and the current ones and sends it (and a zero heat) to the
+        master object
+
+        :param request: a request object containing the other parameters
+        :type request: :class:`.CalculatePDFParamsWorkRequest`
+        '''
+
+        self._current_master = request.sender
+        energy = self.energy
+        old_params = self._set_pdf_params(request.params)
+        work = self.get_energy(self.state) - energy
+        self._set_pdf_params(old_params)
+        self._comm.send(Parcel(self.name, self._current_master, (float(work), 0.0)),
+                        self._current_master)
+
+    def _swap_pdf_params(self, request):
+        '''
+        If the information in the request object says so, takes over the PDF
+        parameters of the exchange partner. In any case, finishes the swap as
+        in :meth:`_accept_buffered_proposal`
+
+        :param request: a request object containing whether the swap is accepted
+                        and the new parameters and their index
+        :type request: :class:`.SwapPDFParamsRequest`
+        '''
+
+        self._current_master = request.sender
+        if request.accept:
+            self._set_pdf_params_and_index(request)
+        self._finish_swap()
+
     def _increase_sample_counter(self):
         '''
         Guess what - increases the sample counter!
@@ -344,18 +707,25 @@ class Replica(object):
         '''
         
         self.energy_trace.append(self.energy)
+        if self.param_index is not None:
+            self.param_index_trace.append(self.param_index)
         
     @property
     def energy(self):
         '''
         Returns the replica energy, that is, the negative log-probability of the replica's
-        PDF evaluated at the current state
+        PDF evaluated at the current state. The energy is cached until the state is set
+        again; if the sampler reports the energy of the state it returned, the PDF is
+        not evaluated at all
 
         :return: the current replica energy
         :rtype: depends on your application
         '''
 
-        return self.get_energy(self.state)
+        if self._energy is None:
+            self._energy = self.get_energy(self.state)
+
+        return self._energy
         
     def get_energy(self, state):
         '''
@@ -366,3 +736,22 @@ class Replica(object):
         :type state: depends on your application
         '''
         return -self.pdf.log_prob(state)
+
+    def get_energies(self, states):
+        '''
+        Calculates replica energies for many states, using the vectorized
+        :meth:`.AbstractPDF.log_prob_batch` method of the replica's PDF if it has one
+
+        :param states: states for which to evaluate the negative log-probability of
+                       the replica's PDF, stacked along the first axis
+        :type states: numpy.ndarray or list
+
+        :return: the energies of all states
+        :rtype: numpy.ndarray
+        '''
+        import numpy
+
+        if hasattr(self.pdf, 'log_prob_batch'):
+            return -self.pdf.log_prob_batch(states)
+
+        return -numpy.array([self.pdf.log_prob(state) for state in states])
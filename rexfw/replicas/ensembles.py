@@ -0,0 +1,571 @@
+'''
+A replica ensemble which runs many tempered Metropolis-Hastings chains
+in a single process as one numpy array
+'''
+
+import numpy
+
+from rexfw import Parcel
+from rexfw.replicas.requests import DoNothingRequest
+from rexfw.replicas.sample_writers import PickleSampleWriter, append_to_npy
+from rexfw.statistics.summaries import SamplerStatsSummary
+from rexfw.samplers.rwmc import RWMCSampleStats
+
+
+class ColumnLog(object):
+
+    def __init__(self, n_chains, shape=(), dtype=float, capacity=16):
+        '''
+        Logs values for many chains in the columns of a single array, which
+        grows when a chain's column is full
+
+        :param int n_chains: the number of chains
+
+        :param tuple shape: the shape of a single value
+
+        :param dtype: the data type of the values
+        :type dtype: numpy.dtype
+
+        :param int capacity: the number of values which fit into a column initially
+        '''
+
+        self._data = numpy.empty((capacity, n_chains) + tuple(shape), dtype=dtype)
+        self.lengths = numpy.zeros(n_chains, dtype=int)
+
+    def append(self, chains, values):
+        '''
+        Appends one value to the columns of several chains
+
+        :param chains: the indices of the chains
+        :type chains: numpy.ndarray
+
+        :param values: the values, one for each chain
+        :type values: numpy.ndarray
+        '''
+
+        if len(chains) == 0:
+            return
+        positions = self.lengths[chains]
+        if positions.max() >= len(self._data):
+            self._data = numpy.concatenate((self._data, numpy.empty_like(self._data)))
+        self._data[positions, chains] = values
+        self.lengths[chains] += 1
+
+    def get(self, chain):
+        '''
+        Returns the values logged for a chain
+
+        :param int chain: the index of the chain
+
+        :return: the logged values, oldest first
+        :rtype: numpy.ndarray
+        '''
+
+        return self._data[:self.lengths[chain], chain]
+
+    def clear(self, chain):
+        '''
+        Removes the values logged for a chain
+
+        :param int chain: the index of the chain
+        '''
+
+        self.lengths[chain] = 0
+
+
+class EnsembleMember(object):
+
+    def __init__(self, ensemble, index):
+        '''
+        Represents a single chain of a :class:`.ReplicaEnsemble` towards a
+        :class:`.Slave` and thus the master object
+
+        :param ensemble: the ensemble this member belongs to
+        :type ensemble: :class:`.ReplicaEnsemble`
+
+        :param int index: the index of the chain in the ensemble
+        '''
+
+        self.ensemble = ensemble
+        self.index = index
+        self.name = ensemble.names[index]
+
+    def process_request(self, request):
+        '''
+        Makes the ensemble process a request sent to this member
+
+        :param request: a request object
+        :type request: :class:`collections.namedtuple`
+        '''
+
+        return self.ensemble.process_request(self.index, request)
+
+
+class ReplicaEnsemble(object):
+
+    def __init__(self, names, states, pdf, betas, stepsizes, output_folder, comm,
+                 variable_name='x', sample_writers=None, background_writer=None,
+                 aggregate_stats=False):
+        '''
+        Runs many replicas, each sampling from pdf ** beta with a different
+        inverse temperature beta using a random walk Metropolis-Hastings sampler,
+        as one numpy array of shape (number of replicas, ...). All chains
+        perform their sampling steps at once, evaluating the energies of all
+        proposals with a single call to the (ideally vectorized) log_prob_batch
+        method of the PDF. Sampling requests are collected until every chain
+        has to perform a step.
+
+        The ensemble takes part in a simulation run by an :class:`.ExchangeMaster`
+        (or a subclass) through its :attr:`members`, which have to be handed
+        to a :class:`.Slave` instead of replicas. Only RE swaps between members
+        of the same ensemble are supported. As the energies of all states are
+        known, the works are calculated without evaluating the PDF, and accepted
+        swaps only permute the assignment of states to inverse temperatures.
+
+        :param names: the names of the replicas in the ensemble
+        :type names: list of str
+
+        :param states: the initial states of all replicas
+        :type states: numpy.ndarray
+
+        :param pdf: the PDF to be sampled at different inverse temperatures
+        :type pdf: :class:`.AbstractPDF`
+
+        :param betas: the inverse temperatures of all replicas
+        :type betas: numpy.ndarray
+
+        :param stepsizes: the maximum perturbation of each dimension for each
+                          replica, or for all of them
+        :type stepsizes: float or numpy.ndarray
+
+        :param str output_folder: the folder where simulation output will be stored
+
+        :param comm: a communicator object to communicate with the master object
+        :type comm: :class:`.AbstractCommunicator`
+
+        :param str variable_name: the name of the sampled variable in sampling statistics
+
+        :param sample_writers: objects writing the samples of each replica to files;
+                               default to :class:`.PickleSampleWriter` objects
+        :type sample_writers: list of :class:`.AbstractSampleWriter`
+
+        :param background_writer: if given, samples and energies are written on
+                                  this object's background thread
+        :type background_writer: :class:`.BackgroundWriter`
+
+        :param bool aggregate_stats: whether to send summaries of sampler statistics
+                                     instead of the statistics of every sampling step
+        '''
+
+        self.names = list(names)
+        n_chains = len(self.names)
+        self.pdf = pdf
+        self.betas = numpy.asarray(betas, dtype=float)
+        self.stepsizes = numpy.ones(n_chains) * stepsizes
+        self.output_folder = output_folder
+        self.variable_name = variable_name
+        self._comm = comm
+        self._indices = {name: i for i, name in enumerate(self.names)}
+
+        if sample_writers is None:
+            sample_writers = [PickleSampleWriter(output_folder + 'samples/', name)
+                              for name in self.names]
+        self._sample_writers = sample_writers
+        self._background_writer = background_writer
+        self.aggregate_stats = aggregate_stats
+
+        ## rows of _states; _rows[i] is the row with the state of the i-th replica
+        self._states = numpy.array(states, dtype=float)
+        self._rows = numpy.arange(n_chains)
+        ## untempered energies of the states in each row
+        self._energies = self._calculate_energies(self._states)
+
+        self._n_pending_steps = numpy.zeros(n_chains, dtype=int)
+        self._proposal_rows = numpy.zeros(n_chains, dtype=int)
+        self._n_samples_drawn = numpy.zeros(n_chains, dtype=int)
+        self._n_since_dump = numpy.zeros(n_chains, dtype=int)
+        self._n_moves = numpy.zeros(n_chains, dtype=int)
+        self._dump_step = 1
+        self._current_master = None
+
+        state_shape = self._states.shape[1:]
+        self._samples = ColumnLog(n_chains, state_shape)
+        self._energy_trace = ColumnLog(n_chains)
+        self._stats_steps = ColumnLog(n_chains, dtype=int)
+        self._stats_accepted = ColumnLog(n_chains, dtype=bool)
+        self._stats_moves = ColumnLog(n_chains, dtype=int)
+
+        self.members = {name: EnsembleMember(self, i) for i, name in enumerate(self.names)}
+
+        self._request_processing_table = {}
+        self._setup_request_processing_table()
+
+    def _setup_request_processing_table(self):
+        '''
+        Sets up a dictionary containing the class names of possible incoming
+        request objects as keys and the bound methods processing the requests
+        for a single replica as values
+        '''
+
+        self._request_processing_table = dict(
+            SampleRequest=self._sample,
+            SampleNRequest=self._sample_n,
+            SendStatsRequest=self._send_stats,
+            ProposeRequest=self._propose,
+            AcceptBufferedProposalRequest=self._accept_buffered_proposal,
+            AcceptDirectSwapRequest=self._accept_direct_swap,
+            SendGetStateAndEnergyRequest=self._send_get_state_and_energy_request,
+            ExchangeStatesProposeRequest=self._propose,
+            DumpSamplesRequest=self._dump_samples,
+            SetupSampleStoreRequest=self._setup_sample_store,
+            DoNothingRequest=self._do_nothing,
+            DieRequest=self._die)
+
+    @property
+    def states(self):
+        '''
+        Returns the current states of all replicas
+
+        :return: the states, one row for each replica
+        :rtype: numpy.ndarray
+        '''
+        self._sample_pending()
+
+        return self._states[self._rows]
+
+    @property
+    def energies(self):
+        '''
+        Returns the current energies of all replicas, that is, the untempered
+        energies of their states multiplied by their inverse temperatures
+
+        :return: the energies of all replicas
+        :rtype: numpy.ndarray
+        '''
+        self._sample_pending()
+
+        return self.betas * self._energies[self._rows]
+
+    def _calculate_energies(self, states):
+        '''
+        Calculates the untempered energies (negative log-probabilities) of many states
+
+        :param states: states stacked along the first axis
+        :type states: numpy.ndarray
+
+        :return: one energy for each state
+        :rtype: numpy.ndarray
+        '''
+
+        if hasattr(self.pdf, 'log_prob_batch'):
+            return -self.pdf.log_prob_batch(states)
+
+        ## PDFs evaluating states element-wise yield several values per state
+        return -numpy.array([numpy.sum(self.pdf.log_prob(x)) for x in states])
+
+    def process_request(self, index, request):
+        '''
+        Processes a request sent to a single replica of this ensemble
+
+        :param int index: the index of the replica the request was sent to
+
+        :param request: a request object
+        :type request: :class:`collections.namedtuple`
+        '''
+
+        name = request.__class__.__name__
+        if not name in self._request_processing_table:
+            raise ValueError("Replica ensembles can't process {} objects".format(name))
+
+        return self._request_processing_table[name](index, request)
+
+    def _send_to_master(self, index, data):
+
+        self._comm.send(Parcel(self.names[index], self._current_master, data),
+                        self._current_master)
+
+    def _partner_index(self, partner):
+
+        if not partner in self._indices:
+            raise ValueError("Replica '{}' is not a member of this ensemble".format(partner))
+
+        return self._indices[partner]
+
+    def _record_step(self, chains, states, energies, accepted=None):
+        '''
+        Stores samples, energies and, for sampling steps, sampling statistics
+        of several chains after a step
+        '''
+
+        keep = self._n_since_dump[chains] % self._dump_step == 0
+        self._samples.append(chains[keep], states[keep])
+        self._energy_trace.append(chains, self.betas[chains] * energies)
+        if accepted is not None:
+            self._n_moves[chains] += 1
+            self._stats_steps.append(chains, self._n_samples_drawn[chains])
+            self._stats_accepted.append(chains, accepted)
+            self._stats_moves.append(chains, self._n_moves[chains])
+        self._n_since_dump[chains] += 1
+        self._n_samples_drawn[chains] += 1
+
+    def _sample_chains(self, chains, n_steps):
+        '''
+        Performs Metropolis-Hastings steps for several chains at once
+
+        :param chains: the indices of the chains
+        :type chains: numpy.ndarray
+
+        :param int n_steps: the number of steps to perform
+        '''
+
+        rows = self._rows[chains]
+        states = self._states[rows]
+        energies = self._energies[rows]
+        betas = self.betas[chains]
+        stepsizes = self.stepsizes[chains].reshape((-1,) + (1,) * (states.ndim - 1))
+
+        for _ in xrange(n_steps):
+            proposals = states + stepsizes * numpy.random.uniform(-1.0, 1.0, states.shape)
+            proposal_energies = self._calculate_energies(proposals)
+            log_uniforms = numpy.log(numpy.random.random(len(chains)))
+            accepted = log_uniforms < -betas * (proposal_energies - energies)
+            states[accepted] = proposals[accepted]
+            energies[accepted] = proposal_energies[accepted]
+            self._record_step(chains, states, energies, accepted)
+
+        self._states[rows] = states
+        self._energies[rows] = energies
+
+    def _sample_pending(self):
+        '''
+        Performs all sampling steps requested so far
+        '''
+
+        while self._n_pending_steps.any():
+            chains = numpy.nonzero(self._n_pending_steps)[0]
+            n_steps = self._n_pending_steps[chains].min()
+            self._sample_chains(chains, n_steps)
+            self._n_pending_steps[chains] -= n_steps
+
+    def _request_steps(self, index, n_steps):
+        '''
+        Requests sampling steps for a replica. They are performed as soon as all
+        replicas have pending sampling steps or the replicas' states are needed
+
+        :param int index: the index of the replica
+
+        :param int n_steps: the number of sampling steps
+        '''
+
+        self._n_pending_steps[index] += n_steps
+        n_steps = self._n_pending_steps.min()
+        if n_steps > 0:
+            self._sample_chains(numpy.arange(len(self.names)), n_steps)
+            self._n_pending_steps -= n_steps
+
+    def _sample(self, index, request):
+        '''
+        Requests a single sampling step for a replica
+
+        :param int index: the index of the replica
+
+        :param request: a request object
+        :type request: :class:`.SampleRequest`
+        '''
+
+        self._request_steps(index, 1)
+
+    def _sample_n(self, index, request):
+        '''
+        Requests several sampling steps for a replica
+
+        :param int index: the index of the replica
+
+        :param request: a request object containing the number of sampling steps
+        :type request: :class:`.SampleNRequest`
+        '''
+
+        self._request_steps(index, request.n_steps)
+
+    def _send_get_state_and_energy_request(self, index, request):
+        '''
+        As the partner's state and energy are available to this ensemble, only
+        syncs with the master object
+
+        :param int index: the index of the replica
+
+        :param request: a request object containing the partner's name
+        :type request: :class:`.SendGetStateAndEnergyRequest`
+        '''
+
+        self._partner_index(request.partner)
+        self._current_master = request.sender
+        self._send_to_master(index, DoNothingRequest(self.names[index]))
+
+    def _propose(self, index, request):
+        '''
+        Calculates the work of an RE swap proposing the partner's state to a
+        replica and sends it (and a zero heat) to the master object
+
+        :param int index: the index of the replica
+
+        :param request: a request object containing the name of the partner
+        :type request: :class:`.ProposeRequest` or :class:`.ExchangeStatesProposeRequest`
+        '''
+
+        self._sample_pending()
+        self._current_master = request.sender
+        partner = self._partner_index(request.partner)
+        partner_row = self._rows[partner]
+        ## the proposal is remembered by the row the partner's state is in
+        self._proposal_rows[index] = partner_row
+        work = (self.betas[index] - self.betas[partner]) * self._energies[partner_row]
+        self._send_to_master(index, (float(work), 0.0))
+
+    def _accept_buffered_proposal(self, index, request):
+        '''
+        Accepts or rejects a proposal, stores the resulting state as a sample
+        and syncs with the master object
+
+        :param int index: the index of the replica
+
+        :param request: a request containing information whether the proposal
+                        should be accepted or not
+        :type request: :class:`.AcceptBufferedProposalRequest`
+        '''
+
+        self._finish_swap(index, request.accept)
+        self._send_to_master(index, DoNothingRequest(self.names[index]))
+
+    def _accept_direct_swap(self, index, request):
+        '''
+        Accepts or rejects a proposal like :meth:`_accept_buffered_proposal`,
+        but doesn't sync with the master object
+
+        :param int index: the index of the replica
+
+        :param request: a request containing information whether the proposal
+                        should be accepted or not
+        :type request: :class:`.AcceptDirectSwapRequest`
+        '''
+
+        self._finish_swap(index, request.accept)
+
+    def _finish_swap(self, index, accept):
+        '''
+        Sets the state of a replica to its proposal if accept is True and
+        stores the resulting state as a sample
+
+        :param int index: the index of the replica
+
+        :param bool accept: whether the proposal is accepted
+        '''
+
+        self._sample_pending()
+        if accept:
+            self._rows[index] = self._proposal_rows[index]
+        row = self._rows[index]
+        self._record_step(numpy.array([index]), self._states[row:row + 1],
+                          self._energies[row:row + 1])
+
+    def _send_stats(self, index, request):
+        '''
+        Sends the sampling statistics of a replica to the master object in the
+        format of :class:`.Replica` objects using :class:`.RWMCSampler` objects
+
+        :param int index: the index of the replica
+
+        :param request: a request object
+        :type request: :class:`.SendStatsRequest`
+        '''
+
+        self._sample_pending()
+        stepsize = self.stepsizes[index]
+        stats = [[step, {self.variable_name: RWMCSampleStats(accepted, n_moves, stepsize)}]
+                 for step, accepted, n_moves in zip(self._stats_steps.get(index),
+                                                    self._stats_accepted.get(index),
+                                                    self._stats_moves.get(index))]
+        for log in (self._stats_steps, self._stats_accepted, self._stats_moves):
+            log.clear(index)
+        if self.aggregate_stats:
+            summary = SamplerStatsSummary()
+            for step, step_stats in stats:
+                summary.add(step, step_stats)
+            stats = [summary]
+        self._comm.send(Parcel(self.names[index], request.sender, stats), request.sender)
+
+    def _setup_sample_store(self, index, request):
+        '''
+        Makes the ensemble keep only the samples which will be written to files
+
+        :param int index: the index of the replica
+
+        :param request: a request object containing the intervals with which
+                        samples will be written
+        :type request: :class:`.SetupSampleStoreRequest`
+        '''
+
+        self._sample_pending()
+        self._dump_step = request.dump_step
+
+    def _write(self, function, *args):
+        '''
+        Calls a function writing data, either right away or on the background
+        writer's thread, like :meth:`.Replica._write`
+        '''
+
+        if self._background_writer is None:
+            function(*args)
+        else:
+            ## logged values are overwritten once the logs are cleared
+            args = [arg.copy() if isinstance(arg, numpy.ndarray) else arg for arg in args]
+            self._background_writer.submit(function, *args)
+
+    def _dump_samples(self, index, request):
+        '''
+        Writes samples and energies of a replica to files and empties the
+        corresponding logs
+
+        :param int index: the index of the replica
+
+        :param request: a request object containing information which samples to write
+        :type request: :class:`.DumpSamplesRequest`
+        '''
+
+        self._sample_pending()
+        n_samples = self._n_since_dump[index]
+        samples = self._samples.get(index)
+        indices = numpy.arange(0, n_samples, self._dump_step)
+        if self._dump_step != request.dump_step:
+            samples = samples[::request.dump_step]
+            indices = indices[::request.dump_step]
+        steps = self._n_samples_drawn[index] - n_samples + indices + request.offset
+        energies_filename = '{}energies/{}.npy'.format(self.output_folder, self.names[index])
+        self._write(self._sample_writers[index].write, samples, steps,
+                    request.s_min + request.offset, request.s_max + request.offset)
+        self._write(append_to_npy, energies_filename, self._energy_trace.get(index))
+
+        self._samples.clear(index)
+        self._energy_trace.clear(index)
+        self._n_since_dump[index] = 0
+
+    def _do_nothing(self, index, request):
+        '''
+        Does nothing, like :meth:`.Replica._do_nothing`
+        '''
+        pass
+
+    def _die(self, index, request):
+        '''
+        Performs outstanding sampling steps and makes the listening loop quit
+        for a replica
+
+        :return: -1, which signals the end of the listening loop
+        :rtype: int
+        '''
+
+        self._sample_pending()
+        if self._background_writer is not None:
+            self._background_writer.flush(fsync=True)
+
+        return -1
@@ -8,3 +8,4 @@ from collections import namedtuple
 GetStateAndEnergyRequest = namedtuple('GetStateAndEnergyRequest', 'sender')
 StoreStateEnergyRequest = namedtuple('StoreStateEnergyRequest', 'sender state energy')
 DoNothingRequest = namedtuple('DoNothingRequest', 'sender')
+PartnerStateEnergyRequest = namedtuple('PartnerStateEnergyRequest', 'sender state energy')
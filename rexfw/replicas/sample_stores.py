@@ -0,0 +1,167 @@
+'''
+Containers storing the samples a replica draws between two sample dumps
+'''
+
+import numpy
+from copy import deepcopy
+
+
+class SampleStore(object):
+
+    def __init__(self, stride, capacity, copy=True):
+        '''
+        Stores every stride-th sample appended to it. numpy array samples are
+        copied into a block of memory which is allocated once, when the first
+        sample arrives, and holds capacity samples. Samples of other types are
+        kept in a list. If more than capacity samples are kept, the oldest ones
+        are overwritten.
+
+        :param int stride: only every stride-th sample is kept, starting with
+                           the first one after construction or after :meth:`clear`
+
+        :param int capacity: the maximum number of kept samples
+
+        :param bool copy: whether to copy samples which are not numpy arrays
+        '''
+
+        self.stride = stride
+        self.capacity = capacity
+        self.copy = copy
+        self._buffer = None
+        self._start = 0
+        self._n_kept = 0
+        self._n_appended = 0
+
+    @classmethod
+    def for_dumps(cls, dump_interval, dump_step, copy=True):
+        '''
+        Creates a sample store keeping exactly the samples written by
+        :meth:`.Replica._dump_samples`
+
+        :param int dump_interval: the interval with which samples are dumped
+
+        :param int dump_step: only every dump_step-th sample is written
+
+        :param bool copy: whether to copy samples which are not numpy arrays
+
+        :return: a sample store with stride dump_step and sufficient capacity
+        :rtype: :class:`.SampleStore`
+        '''
+
+        ## the first dump interval includes both the initial and the last sample
+        return cls(dump_step, dump_interval // dump_step + 1, copy)
+
+    def _allocate(self, sample):
+
+        if isinstance(sample, numpy.ndarray) and not sample.dtype.hasobject:
+            self._buffer = numpy.empty((self.capacity,) + sample.shape, dtype=sample.dtype)
+        else:
+            self._buffer = [None] * self.capacity
+
+    def append(self, sample):
+        '''
+        Appends a sample, which is stored only if it is a stride-th sample
+
+        :param sample: a sample
+        :type sample: depends on your application
+        '''
+
+        keep = self._n_appended % self.stride == 0
+        self._n_appended += 1
+        if not keep:
+            return
+
+        if self._buffer is None:
+            self._allocate(sample)
+        i = (self._start + self._n_kept) % self.capacity
+        if isinstance(self._buffer, numpy.ndarray):
+            self._buffer[i] = sample
+        else:
+            self._buffer[i] = deepcopy(sample) if self.copy else sample
+        if self._n_kept < self.capacity:
+            self._n_kept += 1
+        else:
+            self._start = (self._start + 1) % self.capacity
+
+    def __len__(self):
+
+        return self._n_kept
+
+    def __getitem__(self, i):
+
+        if i < 0:
+            i += self._n_kept
+        if not 0 <= i < self._n_kept:
+            raise IndexError('sample store index out of range')
+
+        return self._buffer[(self._start + i) % self.capacity]
+
+    def __iter__(self):
+
+        for i in xrange(self._n_kept):
+            yield self[i]
+
+    @property
+    def n_appended(self):
+        '''
+        Returns the number of samples appended since construction or the
+        last call to :meth:`clear`, whether stored or not
+        '''
+        return self._n_appended
+
+    @property
+    def stores_arrays(self):
+        '''
+        Returns whether samples are stored in a numpy array
+        '''
+        return isinstance(self._buffer, numpy.ndarray)
+
+    def sample_indices(self):
+        '''
+        Returns the indices of the stored samples among all appended samples
+
+        :return: indices of stored samples, oldest first
+        :rtype: numpy.ndarray
+        '''
+
+        return numpy.arange(0, self._n_appended, self.stride)[-self._n_kept:] \
+               if self._n_kept > 0 else numpy.arange(0)
+
+    def to_array(self):
+        '''
+        Returns the stored samples, oldest first, as a single array. If
+        no samples have been overwritten, this is a view of the memory the
+        samples are stored in
+
+        :return: stored samples
+        :rtype: numpy.ndarray
+        '''
+
+        if not self.stores_arrays:
+            return numpy.array(self.to_list())
+        if self._start == 0:
+            return self._buffer[:self._n_kept]
+
+        return numpy.concatenate((self._buffer[self._start:], self._buffer[:self._start]))
+
+    def to_list(self):
+        '''
+        Returns the stored samples, oldest first
+
+        :return: stored samples
+        :rtype: list
+        '''
+
+        return list(self)
+
+    def clear(self):
+        '''
+        Removes all stored samples and restarts counting samples for
+        thinning, but keeps the allocated memory
+        '''
+
+        self._start = 0
+        self._n_kept = 0
+        self._n_appended = 0
+        if isinstance(self._buffer, list):
+            self._buffer = [None] * self.capacity
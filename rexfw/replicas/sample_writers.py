@@ -0,0 +1,376 @@
+'''
+Sample writer classes which write the samples of a replica to files,
+a function appending energies to .npy files and a thread performing
+such writes in the background
+'''
+
+import os
+import sys
+import json
+import struct
+import numpy
+
+from abc import abstractmethod
+
+
+class AbstractSampleWriter(object):
+
+    def __init__(self, folder, replica_name):
+        '''
+        Base class for classes writing the samples drawn by a replica
+
+        :param str folder: the folder to write samples to
+
+        :param str replica_name: the name of the replica whose samples are written
+        '''
+        self.folder = folder
+        self.replica_name = replica_name
+
+    @abstractmethod
+    def write(self, samples, steps, s_min, s_max):
+        '''
+        Writes samples
+
+        :param samples: the samples to write
+        :type samples: list or numpy.ndarray
+
+        :param steps: the sampling step of each sample
+        :type steps: numpy.ndarray
+
+        :param int s_min: the first step of the interval during which the
+                          samples were drawn
+
+        :param int s_max: the last step of the interval during which the
+                          samples were drawn
+
+        :return: the names of the files written to
+        :rtype: list of str
+        '''
+        pass
+
+    def close(self):
+        '''
+        Finishes writing samples
+        '''
+        pass
+
+
+class PickleSampleWriter(AbstractSampleWriter):
+
+    def write(self, samples, steps, s_min, s_max):
+        '''
+        Writes a list of samples to a new pickle file per call
+        '''
+
+        filename = '{}samples_{}_{}-{}.pickle'.format(self.folder, self.replica_name,
+                                                      s_min, s_max)
+        with open(filename, 'w') as opf:
+            from cPickle import dump
+            dump(list(samples), opf, 2)
+
+        return [filename]
+
+
+class StreamingSampleWriter(AbstractSampleWriter):
+
+    def __init__(self, folder, replica_name):
+        '''
+        Appends samples, which have to be numpy arrays of fixed shape and data type,
+        to a single binary file per replica. The file contains the raw sample data
+        and can be memory-mapped using :func:`load_samples`. Two more files are
+        written: a header with shape and data type of the samples and an index
+        file with the sampling step of each sample.
+        '''
+
+        super(StreamingSampleWriter, self).__init__(folder, replica_name)
+
+        filenames = samples_filenames(folder, replica_name)
+        self.data_filename, self.steps_filename, self.header_filename = filenames
+        self._checked_header = False
+
+    def _check_header(self, samples):
+        '''
+        Writes the header or, when continuing a simulation, makes sure the
+        samples are compatible with the already written ones
+        '''
+
+        header = dict(dtype=samples.dtype.str, shape=list(samples.shape[1:]))
+        if os.path.exists(self.header_filename):
+            with open(self.header_filename) as ipf:
+                if json.load(ipf) != header:
+                    raise ValueError("Samples incompatible with samples in '{}'".format(
+                        self.data_filename))
+        else:
+            with open(self.header_filename, 'w') as opf:
+                json.dump(header, opf)
+        self._checked_header = True
+
+    def write(self, samples, steps, s_min, s_max):
+        '''
+        Appends samples and their sampling steps to the sample and index files
+        '''
+
+        if len(samples) == 0:
+            return []
+        samples = numpy.ascontiguousarray(samples)
+        if not self._checked_header:
+            self._check_header(samples)
+
+        with open(self.data_filename, 'ab') as opf:
+            samples.tofile(opf)
+        with open(self.steps_filename, 'ab') as opf:
+            numpy.asarray(steps, dtype=numpy.int64).tofile(opf)
+
+        return [self.data_filename, self.steps_filename, self.header_filename]
+
+
+def samples_filenames(folder, replica_name):
+    '''
+    Returns the names of the files written by a :class:`.StreamingSampleWriter`
+
+    :param str folder: the folder samples were written to
+
+    :param str replica_name: the name of the replica
+
+    :return: names of the sample data, index and header files
+    :rtype: tuple of str
+    '''
+
+    prefix = '{}samples_{}'.format(folder, replica_name)
+
+    return prefix + '.dat', prefix + '.steps', prefix + '.json'
+
+
+def load_samples(folder, replica_name, step_min=None, step_max=None):
+    '''
+    Memory-maps samples written by a :class:`.StreamingSampleWriter` and selects
+    the samples drawn within a range of sampling steps without reading the
+    other samples
+
+    :param str folder: the folder samples were written to
+
+    :param str replica_name: the name of the replica
+
+    :param int step_min: the first sampling step to load
+
+    :param int step_max: the last sampling step to load
+
+    :return: the samples (a read-only memory-mapped array) and their sampling steps
+    :rtype: tuple of numpy.ndarray
+    '''
+
+    data_filename, steps_filename, header_filename = samples_filenames(folder, replica_name)
+    with open(header_filename) as ipf:
+        header = json.load(ipf)
+    steps = numpy.fromfile(steps_filename, dtype=numpy.int64)
+    samples = numpy.memmap(data_filename, dtype=numpy.dtype(header['dtype']), mode='r',
+                           shape=(len(steps),) + tuple(header['shape']))
+
+    i_min = 0 if step_min is None else numpy.searchsorted(steps, step_min)
+    i_max = len(steps) if step_max is None else numpy.searchsorted(steps, step_max, 'right')
+
+    return samples[i_min:i_max], steps[i_min:i_max]
+
+
+## minimal total size of .npy headers written by append_to_npy; headers of
+## arrays with long data type descriptions or many dimensions are padded to
+## the next multiple of 64 bytes, like numpy does
+NPY_HEADER_SIZE = 128
+
+
+def _npy_header(dtype, shape):
+
+    from numpy.lib.format import dtype_to_descr
+
+    return "{{'descr': {!r}, 'fortran_order': False, 'shape': {!r}, }}".format(
+        dtype_to_descr(dtype), tuple(int(x) for x in shape))
+
+
+def _npy_header_size(dtype, shape):
+    '''
+    Returns the total size of the headers _write_npy_header writes for arrays
+    of the given data type and shape. It only depends on the shape of the
+    array elements, as the header leaves room for any number of rows
+    '''
+
+    from numpy.lib.format import magic
+
+    n_bytes = len(magic(1, 0)) + 2 + len(_npy_header(dtype, (2 ** 63 - 1,) + tuple(shape[1:]))) + 1
+
+    return max(NPY_HEADER_SIZE, 64 * ((n_bytes + 63) // 64))
+
+
+def _write_npy_header(opf, dtype, shape):
+    '''
+    Writes a .npy (version 1.0) header padded to the size returned by
+    _npy_header_size
+    '''
+
+    from numpy.lib.format import magic
+
+    header = _npy_header(dtype, shape)
+    prefix = magic(1, 0)
+    header_length = _npy_header_size(dtype, shape) - len(prefix) - 2
+    if len(header) >= header_length or header_length > 65535:
+        raise ValueError('header of .npy file too long: {}'.format(header))
+    header = header.ljust(header_length - 1) + '\n'
+    opf.write(prefix + struct.pack('<H', header_length) + header)
+
+
+def append_to_npy(filename, data):
+    '''
+    Appends an array along its first axis to a .npy file, or creates the file.
+    Only the new data and the header are written, so the cost does not grow with
+    the size of the file. Files not created by this function are rewritten once.
+
+    :param str filename: the name of the .npy file
+
+    :param data: the array to append; all but its first dimension and its data type
+                 have to match the array stored in the file
+    :type data: numpy.ndarray
+
+    :return: a list containing filename
+    :rtype: list of str
+    '''
+
+    from numpy.lib.format import read_magic, read_array_header_1_0, read_array_header_2_0
+
+    data = numpy.ascontiguousarray(data)
+    if not os.path.exists(filename):
+        with open(filename, 'wb') as opf:
+            _write_npy_header(opf, data.dtype, data.shape)
+            data.tofile(opf)
+        return [filename]
+
+    with open(filename, 'r+b') as opf:
+        version = read_magic(opf)
+        read_header = read_array_header_1_0 if version == (1, 0) else read_array_header_2_0
+        shape, fortran_order, dtype = read_header(opf)
+        if opf.tell() == _npy_header_size(dtype, shape) and not fortran_order \
+           and dtype == data.dtype and shape[1:] == data.shape[1:]:
+            opf.seek(0, 2)
+            data.tofile(opf)
+            ## the header is updated last, so a file is always readable
+            opf.seek(0)
+            _write_npy_header(opf, dtype, (shape[0] + data.shape[0],) + data.shape[1:])
+            return [filename]
+
+    old_data = numpy.load(filename)
+    os.remove(filename)
+    return append_to_npy(filename, numpy.concatenate((old_data, data.astype(old_data.dtype))))
+
+
+def fsync_files(filenames):
+    '''
+    Makes the operating system write files and the entries of the folders
+    containing them to disk, so that they survive a crash of the machine.
+    Requires a POSIX system.
+
+    :param filenames: the names of the files
+    :type filenames: iterable of str
+    '''
+
+    filenames = set(filenames)
+    folders = set(os.path.dirname(os.path.abspath(f)) for f in filenames)
+    for name in sorted(filenames) + sorted(folders):
+        fd = os.open(name, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+class BackgroundWriter(object):
+
+    def __init__(self, max_queued=4):
+        '''
+        Performs writes, such as :meth:`.AbstractSampleWriter.write` or
+        :func:`append_to_npy` calls, on a background thread in the order in
+        which they are submitted, so that a replica can continue sampling
+        while its output is written. Several replicas living in the same
+        process can share a background writer.
+
+        Submitted data must not be modified afterwards. An exception raised
+        by a write is raised again by the next call to :meth:`submit` or
+        :meth:`flush`; writes submitted in the meantime are skipped.
+
+        Functions returning a list of the files they wrote to, like
+        :meth:`.AbstractSampleWriter.write` and :func:`append_to_npy`, have
+        these files written to disk by :meth:`flush` with fsync=True and by
+        :meth:`close`.
+
+        :param int max_queued: the maximum number of writes waiting to be
+                               performed; :meth:`submit` blocks while that
+                               many writes are waiting, which bounds the
+                               memory used by data not yet written
+        '''
+
+        from Queue import Queue
+        from threading import Thread
+
+        self._queue = Queue(max_queued)
+        self._exc_info = None
+        ## files written to since the last fsync
+        self._written = set()
+        self._thread = Thread(target=self._work)
+        ## the thread must not keep the process alive if the writer isn't closed
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _work(self):
+
+        while True:
+            task = self._queue.get()
+            try:
+                if task is None:
+                    return
+                if self._exc_info is None:
+                    function, args = task
+                    written = function(*args)
+                    if written is not None:
+                        self._written.update(written)
+            except Exception:
+                self._exc_info = sys.exc_info()
+            finally:
+                self._queue.task_done()
+
+    def _raise_exception(self):
+
+        if self._exc_info is not None:
+            exc_info, self._exc_info = self._exc_info, None
+            raise exc_info[0], exc_info[1], exc_info[2]
+
+    def submit(self, function, *args):
+        '''
+        Schedules a call of function with the given arguments
+
+        :param function: a function writing data
+        :type function: callable
+        '''
+
+        self._raise_exception()
+        self._queue.put((function, args))
+
+    def flush(self, fsync=False):
+        '''
+        Waits until all submitted writes are done
+
+        :param bool fsync: whether to also wait until the written files are
+                           on disk, see :func:`fsync_files`
+        '''
+
+        self._queue.join()
+        self._raise_exception()
+        if fsync:
+            fsync_files(self._written)
+            self._written.clear()
+
+    def close(self):
+        '''
+        Waits until all submitted writes are done and the written files are
+        on disk and stops the background thread
+        '''
+
+        self.flush(fsync=True)
+        self._queue.put(None)
+        self._thread.join()
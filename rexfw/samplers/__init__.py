@@ -34,6 +34,22 @@ class AbstractSampler(object):
         '''
         pass
 
+    @property
+    def last_energy(self):
+        '''
+        Returns the energy (negative log-probability) of the state returned
+        by the last call to sample() if the sampler computed it anyway, or
+        None. Replicas use it to avoid evaluating the PDF once more
+        '''
+        return None
+
+    def pdf_changed(self):
+        '''
+        Is called when parameters of the PDF changed, so that samplers
+        can discard quantities calculated from the PDF
+        '''
+        pass
+
 
 ## this is the object occuring in the dictionary return by
 ## AbstractSampler.last_draw_stats. statsA,B,C (or similar) are fields
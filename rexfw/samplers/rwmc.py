@@ -19,6 +19,7 @@ class RWMCSampler(AbstractSampler):
         
         self.stepsize = stepsize
         self._last_move_accepted = False
+        self._last_energy = None
         self._n_moves = 0
 
     @property
@@ -27,6 +28,11 @@ class RWMCSampler(AbstractSampler):
         return {self.variable_name: RWMCSampleStats(self._last_move_accepted, 
                                                     self._n_moves, self.stepsize)}
 
+    @property
+    def last_energy(self):
+
+        return self._last_energy
+
     def sample(self):
 
         E_old = -self.pdf.log_prob(self.state)
@@ -38,9 +44,110 @@ class RWMCSampler(AbstractSampler):
         if accepted:
             self.state = proposal
             self._last_move_accepted = True
+            self._last_energy = E_new
         else:
             self._last_move_accepted = False
+            self._last_energy = E_old
 
         self._n_moves += 1
 
         return self.state
+
+
+class VectorizedRWMCSampler(RWMCSampler):
+
+    def __init__(self, pdf, state, stepsize, variable_name='x', n_steps=1):
+        '''
+        Metropolis-Hastings sampler which perturbs each dimension of the state
+        independently and caches the energy of the current state, so that each
+        step requires only a single evaluation of the PDF. The random numbers
+        for all steps of a call to :meth:`sample` are drawn at once.
+
+        The state must not be modified in place; setting it (also via its
+        private attribute _state, as :class:`.Replica` does after a swap)
+        makes the sampler recompute the energy.
+
+        :param pdf: the PDF to sample from
+        :type pdf: :class:`.AbstractPDF`
+
+        :param state: the initial state
+        :type state: numpy.ndarray
+
+        :param float stepsize: the maximum perturbation of each dimension
+
+        :param str variable_name: the name of the sampled variable
+
+        :param int n_steps: the number of Metropolis-Hastings steps performed
+                            in each call to :meth:`sample`
+        '''
+
+        super(VectorizedRWMCSampler, self).__init__(pdf, state, stepsize, variable_name)
+
+        self.n_steps = n_steps
+        ## the state the cached energy belongs to
+        self._energy_state = None
+
+    @property
+    def state(self):
+
+        return self._state
+    @state.setter
+    def state(self, value):
+
+        self._state = value
+
+    @property
+    def energy(self):
+        '''
+        Returns the energy of the current state, evaluating the PDF only
+        if the state changed since the energy was last computed
+        '''
+
+        if self._energy_state is not self._state:
+            self._last_energy = -self.pdf.log_prob(self._state)
+            self._energy_state = self._state
+
+        return self._last_energy
+
+    @property
+    def last_energy(self):
+
+        return self.energy
+
+    def pdf_changed(self):
+
+        self._energy_state = None
+
+    def sample(self):
+        '''
+        Performs n_steps Metropolis-Hastings steps. The accepted field of the
+        sampling statistics holds the fraction of accepted moves
+
+        :return: the state after the last step
+        :rtype: numpy.ndarray
+        '''
+
+        state = self.state
+        E_old = self.energy
+        log_prob = self.pdf.log_prob
+
+        perturbations = np.random.uniform(low=-self.stepsize, high=self.stepsize,
+                                          size=(self.n_steps,) + np.shape(state))
+        log_uniforms = np.log(np.random.random(self.n_steps))
+
+        n_accepted = 0
+        for i in xrange(self.n_steps):
+            proposal = state + perturbations[i]
+            E_new = -log_prob(proposal)
+            if log_uniforms[i] < E_old - E_new:
+                state = proposal
+                E_old = E_new
+                n_accepted += 1
+
+        self._state = state
+        self._energy_state = state
+        self._last_energy = E_old
+        self._last_move_accepted = n_accepted / float(self.n_steps)
+        self._n_moves += self.n_steps
+
+        return state
@@ -23,14 +23,17 @@ class Slave(object):
     def _listen(self):
         '''
         Runs an infinite loop, polling for messages and passing them on to their
-        destination, which currently is only a single replica
+        destination replicas. The loop ends once all replicas were told to quit
         '''
+        finished = set()
         while True:
             parcel = self._receive_parcel()
             if parcel.receiver in self.replicas.iterkeys():
                 result = self.replicas[parcel.receiver].process_request(parcel.data)                
                 if result == -1:
-                    break
+                    finished.add(parcel.receiver)
+                    if len(finished) == len(self.replicas):
+                        break
             else:
                 raise ValueError("Replica '{}' not found.".format(parcel.receiver))
 
@@ -8,22 +8,83 @@ from rexfw import Parcel
 from rexfw.statistics.writers import ConsoleStatisticsWriter
 
 
+def _hashable(value):
+    '''
+    Turns lists, such as the origins of quantities, into tuples, so that
+    they can serve as dictionary keys
+    '''
+    return tuple(value) if isinstance(value, list) else value
+
+
 class FilterableQuantityList(list):
+    '''
+    A list which allows the user to select only elements whose attributes
+    have certain values. For each attribute elements are selected by, an index
+    mapping attribute values to the positions of the elements is built on first
+    use, so that later selections cost about a dictionary lookup. Indexes are
+    discarded when the list changes, but not when attributes of its elements
+    change
+    '''
+
+    def _index(self, attribute):
+        '''
+        Returns a dictionary mapping the values of an attribute to the positions
+        of the elements having these values
+
+        :param str attribute: the attribute name
+        :rtype: dict
+        '''
+
+        indexes = self.__dict__.setdefault('_indexes', {})
+        if not attribute in indexes:
+            index = {}
+            for i, x in enumerate(self):
+                if hasattr(x, attribute):
+                    index.setdefault(_hashable(getattr(x, attribute)), []).append(i)
+            indexes[attribute] = index
+
+        return indexes[attribute]
 
     def select(self, **kwargs):
         '''
-        A list which allows the user to select only elements whose attributes
-        have certain values
+        Selects elements whose attributes have certain values
 
         :params dict kwargs: keyword arguments of the form attribute=value
         :return: a list containing the subset of elements with matching attribute values
         :rtype: list
         '''
 
-        criterion = lambda x: sum([x.__getattribute__(k) == v 
-                                   for k, v in kwargs.iteritems() if hasattr(x, k)]) == len(kwargs)
-        
-        return self.__class__(filter(criterion, self))
+        positions = None
+        for k, v in kwargs.iteritems():
+            matching = self._index(k).get(_hashable(v), [])
+            if positions is None:
+                positions = matching
+            else:
+                matching = set(matching)
+                positions = [i for i in positions if i in matching]
+        if positions is None:
+            return self.__class__(self)
+
+        return self.__class__(self[i] for i in positions)
+
+
+def _discarding_indexes(method):
+    '''
+    Wraps a list method changing the list such that it discards the
+    indexes of a :class:`.FilterableQuantityList`
+    '''
+
+    def wrapper(self, *args, **kwargs):
+        self.__dict__.pop('_indexes', None)
+        return method(self, *args, **kwargs)
+    wrapper.__name__ = method.__name__
+
+    return wrapper
+
+for _name in ('append', 'extend', 'insert', 'remove', 'pop', 'sort', 'reverse',
+              '__setitem__', '__delitem__', '__setslice__', '__delslice__',
+              '__iadd__', '__imul__'):
+    setattr(FilterableQuantityList, _name, _discarding_indexes(getattr(list, _name)))
 
         
 class Statistics(object):
@@ -51,11 +112,20 @@ class Statistics(object):
         :type origins: list of str
 
         :param sampler_stats_list: a list of sampler statistics (c.f. the samplers submodule)
-                                   to update quantities from
-        :type sampler_stats_list: list of sampler statistic objects
-        '''
-        for step, sampling_stats in sampler_stats_list:
-            self.update_single_step(origins, step, sampling_stats)
+                                   to update quantities from, each accompanied by its
+                                   sampling step, or of summaries of such statistics
+        :type sampler_stats_list: list of sampler statistic objects or
+                                  :class:`.SamplerStatsSummary` objects
+        '''
+        from rexfw.statistics.summaries import SamplerStatsSummary
+
+        for item in sampler_stats_list:
+            if isinstance(item, SamplerStatsSummary):
+                for quantity in self.elements.select(origins=origins):
+                    quantity.update_from_summary(item)
+            else:
+                step, sampling_stats = item
+                self.update_single_step(origins, step, sampling_stats)
         
     def update_single_step(self, origins, step, sampling_stats):
         '''
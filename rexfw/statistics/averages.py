@@ -36,6 +36,23 @@ class AbstractAverage(LoggedQuantity):
             new += new_value / float(self._n_contributions)
             self._values.update(**{str(step): new})
 
+    def update_from_summary(self, summary):
+        '''
+        Updates the average with the sum of the averaged field over
+        all summarized steps
+
+        :param summary: summarized sampling statistics
+        :type summary: :class:`.SamplerStatsSummary`
+        '''
+        if summary.n_steps == 0:
+            return
+        total = summary.sum(self.variable_name, self.stats_fields[0])
+        if not self._untouched:
+            total += self.current_value * self._n_contributions
+        self._n_contributions += summary.n_steps
+        self._untouched = False
+        self._values.update(**{str(summary.last_step): total / self._n_contributions})
+
 
 class MCMCAcceptanceRateAverage(AbstractAverage):
 
@@ -82,6 +82,17 @@ class LoggedQuantity(object):
         '''
         self._values.update(**{str(step): self._get_value(stats)})
 
+    def update_from_summary(self, summary):
+        '''
+        Stores sampling statistics summarized over several steps. By default,
+        the statistics of the last summarized step are stored
+
+        :param summary: summarized sampling statistics
+        :type summary: :class:`.SamplerStatsSummary`
+        '''
+        if summary.n_steps > 0:
+            self.update(summary.last_step, summary.last_stats)
+
 
 class SamplerStepsize(LoggedQuantity):
 
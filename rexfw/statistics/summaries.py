@@ -0,0 +1,63 @@
+'''
+Summaries of sampler statistics which replicas can send instead of the
+statistics of every single sampling step
+'''
+
+import numpy
+
+from numbers import Number
+
+
+class SamplerStatsSummary(object):
+
+    def __init__(self, param_index=None):
+        '''
+        Sums up the numeric fields of sampler statistics objects (c.f. the samplers
+        submodule) over many sampling steps and keeps the statistics of the last
+        step. :class:`.AbstractAverage` quantities can be updated with a summary
+        instead of with the statistics of each step, with the same result.
+
+        :param int param_index: the index of the PDF parameter set (c.f.
+                                :class:`.ParameterExchangeMaster`) the summarized
+                                statistics belong to
+        '''
+
+        self.param_index = param_index
+        self.n_steps = 0
+        self.last_step = None
+        self.last_stats = None
+        self.sums = {}
+
+    def add(self, step, stats):
+        '''
+        Adds the sampler statistics of a sampling step
+
+        :param int step: the sampling step during which the statistics in stats
+                         were created
+
+        :param stats: dict of the form {variable_name: SamplingStats}
+        :type stats: dict
+        '''
+
+        for variable_name, variable_stats in stats.iteritems():
+            sums = self.sums.setdefault(variable_name, {})
+            for field, value in zip(variable_stats._fields, variable_stats):
+                if isinstance(value, (Number, numpy.bool_)):
+                    sums[field] = sums.get(field, 0.0) + value
+        self.n_steps += 1
+        self.last_step = step
+        self.last_stats = stats
+
+    def sum(self, variable_name, field):
+        '''
+        Returns the sum of a field of the sampler statistics of a variable
+        over all summarized steps
+
+        :param str variable_name: the name of the sampled variable
+
+        :param str field: the name of the sampler statistics field
+
+        :rtype: float
+        '''
+
+        return float(self.sums[variable_name][field])
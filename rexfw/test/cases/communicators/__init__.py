@@ -6,7 +6,7 @@ from collections import deque
 
 from rexfw import Parcel
 from rexfw.communicators import AbstractCommunicator
-from rexfw.communicators.mpi import MPICommunicator
+from rexfw.communicators.mpi import MPICommunicator, BufferMPICommunicator
 
 
 class MockCommunicator(AbstractCommunicator):
@@ -79,6 +79,179 @@ class testMPICommnicator(unittest.TestCase):
         for dest, rank in pairs:
             self.assertEqual(self._comm._dest_to_rank(dest), rank)
 
+    def testPlacement(self):
+
+        comm = MPICommunicator({'replica1': 1, 'replica2': 1, 'replica3': 2})
+        pairs = (('replica1', 1), ('replica2', 1), ('replica3', 2), ('master0', 0))
+
+        for dest, rank in pairs:
+            self.assertEqual(comm._dest_to_rank(dest), rank)
+
+
+class testBufferMPICommunicator(unittest.TestCase):
+
+    def setUp(self):
+
+        self._comm = BufferMPICommunicator(min_buffer_size=10)
+
+    def _roundTrip(self, parcel):
+
+        header, arrays = self._comm._split_arrays(parcel)
+        sent = deque(arrays)
+
+        def recv_array(array):
+            array[...] = sent.popleft()
+
+        return header, self._comm._fill_arrays(header, recv_array)
+
+    def testStateRequest(self):
+
+        import numpy as np
+        from rexfw.communicators.mpi import ArrayHeader
+        from rexfw.replicas.requests import StoreStateEnergyRequest
+
+        state = np.arange(20, dtype=float).reshape(4, 5)
+        parcel = Parcel('replica1', 'replica2',
+                        StoreStateEnergyRequest('replica1', state, 4.2))
+        header, received = self._roundTrip(parcel)
+
+        self.assertTrue(isinstance(header.data.state, ArrayHeader))
+        self.assertEqual(header.data.state.shape, (4, 5))
+        self.assertEqual(received.data.energy, 4.2)
+        self.assertEqual(received.data.state.dtype, state.dtype)
+        self.assertTrue(np.all(received.data.state == state))
+
+    def testArrayData(self):
+
+        import numpy as np
+        from rexfw.communicators.mpi import ArrayHeader
+
+        parcel = Parcel('replica1', 'master0', np.arange(10, dtype=np.int32))
+        header, received = self._roundTrip(parcel)
+
+        self.assertTrue(isinstance(header.data, ArrayHeader))
+        self.assertEqual(received.data.dtype, np.int32)
+        self.assertTrue(np.all(received.data == parcel.data))
+
+    def testSmallArraysPickled(self):
+
+        import numpy as np
+
+        parcel = Parcel('replica1', 'master0', np.arange(3))
+        header, arrays = self._comm._split_arrays(parcel)
+
+        self.assertTrue(header is parcel)
+        self.assertEqual(len(arrays), 0)
+
+
+class testMultiprocessingCommunicator(unittest.TestCase):
+
+    def setUp(self):
+
+        from rexfw.communicators.multiproc import create_multiprocessing_communicators
+
+        self._comms = create_multiprocessing_communicators(3)
+
+    def testDestToRank(self):
+
+        pairs = (('replica6', 6), ('replica13', 13), ('master0', 0), ('all', None))
+
+        for dest, rank in pairs:
+            self.assertEqual(self._comms[0]._dest_to_rank(dest), rank)
+
+    def testSendRecv(self):
+
+        master, replica1, replica2 = self._comms
+
+        replica2.send(Parcel('replica2', 'master0', 2), 'master0')
+        replica1.send(Parcel('replica1', 'master0', 1), 'master0')
+
+        ## objects from other sources are held back...
+        parcel = master.recv('replica1')
+        self.assertEqual(parcel.sender, 'replica1')
+        self.assertEqual(parcel.data, 1)
+        ## ... until they are asked for
+        parcel = master.recv('all')
+        self.assertEqual(parcel.sender, 'replica2')
+        self.assertEqual(parcel.data, 2)
+
+    def testSendCopies(self):
+
+        master, replica1, _ = self._comms
+
+        data = [1, 2]
+        master.send(Parcel('master0', 'replica1', data), 'replica1')
+        data.reverse()
+        self.assertEqual(replica1.recv('master0').data, [1, 2])
+
+
+class QueueMockCommunicator(MockCommunicator):
+
+    def recv(self, source):
+
+        obj = self.received.popleft()
+        self.sent.append(['recv', source])
+
+        return obj
+
+    def sendrecv(self, obj, dest):
+
+        self.send(obj, dest)
+
+        return self.recv(dest)
+
+
+class testMultiplexingCommunicator(unittest.TestCase):
+
+    def setUp(self):
+
+        from rexfw.communicators.multiplexing import MultiplexingCommunicator
+
+        self._inner = QueueMockCommunicator()
+        self._comm = MultiplexingCommunicator(self._inner, ['replica1', 'replica2'])
+
+    def testIsLocal(self):
+
+        self.assertTrue(self._comm.is_local('replica2'))
+        self.assertFalse(self._comm.is_local('replica3'))
+        self.assertFalse(self._comm.is_local('master0'))
+
+    def testLocalDelivery(self):
+
+        parcel = Parcel('replica1', 'replica2', [1, 2])
+        self._comm.send(parcel, 'replica2')
+
+        self.assertEqual(len(self._inner.sent), 0)
+        self.assertTrue(self._comm.recv('all') is parcel)
+
+    def testRecvMatchesSender(self):
+
+        self._inner.received.extend([Parcel('replica4', 'master0', 4),
+                                     Parcel('replica3', 'master0', 3)])
+
+        self.assertEqual(self._comm.recv('replica3').data, 3)
+        ## the parcel from replica4 was kept, so it is not received again
+        self.assertEqual(self._comm.recv('replica4').data, 4)
+        self.assertEqual(len(self._inner.sent), 2)
+
+    def testLocalSourcesDontBlock(self):
+
+        self._comm.send(Parcel('replica2', 'replica1', None), 'replica1')
+        self.assertEqual(self._comm.recv('replica2').sender, 'replica2')
+        self.assertRaises(RuntimeError, self._comm.recv, 'replica2')
+        self.assertRaises(RuntimeError, self._comm.sendrecv,
+                          Parcel('replica1', 'replica2', None), 'replica2')
+
+    def testSendRecv(self):
+
+        self._inner.received.extend([Parcel('replica4', 'replica1', 4),
+                                     Parcel('replica3', 'replica1', 3)])
+        parcel = self._comm.sendrecv(Parcel('replica1', 'replica3', 1), 'replica3')
+
+        self.assertEqual(parcel.data, 3)
+        self.assertEqual(self._inner.sent[0][1], 'replica3')
+        self.assertEqual(self._comm.recv('all').data, 4)
+
 
 if __name__ == '__main__':
 
@@ -0,0 +1,47 @@
+'''
+'''
+
+import unittest
+import numpy as np
+
+from rexfw.pdfs import AbstractPDF
+from rexfw.pdfs.normal import Normal
+
+
+class SumPDF(AbstractPDF):
+
+    def log_prob(self, x):
+
+        return np.sum(x)
+
+
+class testAbstractPDF(unittest.TestCase):
+
+    def testLogProbBatch(self):
+
+        X = np.arange(6.0).reshape(3, 2)
+        log_probs = SumPDF().log_prob_batch(X)
+
+        self.assertEqual(log_probs.shape, (3,))
+        self.assertTrue(np.all(log_probs == [1.0, 5.0, 9.0]))
+
+
+class testNormal(unittest.TestCase):
+
+    def testLogProbBatch(self):
+
+        pdf = Normal(mu=1.0, sigma=2.0)
+        X = np.random.normal(size=(10, 3))
+        log_probs = pdf.log_prob_batch(X)
+
+        ## one value per state, although log_prob works element-wise
+        self.assertEqual(log_probs.shape, (10,))
+        self.assertTrue(np.allclose(log_probs, [np.sum(pdf.log_prob(x)) for x in X]))
+        self.assertTrue(np.allclose(pdf.log_prob_batch(list(X)), log_probs))
+        self.assertTrue(np.allclose(pdf.log_prob_batch(X[:, 0]), pdf.log_prob(X[:, 0])))
+        self.assertTrue(np.allclose(log_probs, AbstractPDF.log_prob_batch(pdf, X)))
+
+
+if __name__ == '__main__':
+
+    unittest.main()
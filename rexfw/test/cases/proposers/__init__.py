@@ -6,6 +6,7 @@ from collections import deque
 
 from rexfw.proposers import AbstractProposer, GeneralTrajectory
 from rexfw.proposers.re import REProposer
+from rexfw.pdfs import AbstractPDF
 from rexfw.test.cases.communicators import MockCommunicator
 
 
@@ -40,6 +41,569 @@ class testREProposer(unittest.TestCase):
         self.assertEqual(result.work, 42 - 8.9)
 
 
+class ParamCountingPDF(AbstractPDF):
+
+    def __init__(self):
+
+        self.a = 1.0
+        self.b = 0.0
+        self.n_set = 0
+
+    def __setitem__(self, name, value):
+
+        self.n_set += 1
+        super(ParamCountingPDF, self).__setitem__(name, value)
+
+    def log_prob(self, x):
+
+        return -self.a * x - self.b
+
+    def gradient(self, x):
+
+        return self.a * x
+
+
+class GaussianPDF(ParamCountingPDF):
+
+    def log_prob(self, x):
+
+        return -0.5 * self.a * np.sum(x ** 2) - self.b
+
+
+class testTabulatedParamInterpolationPDF(unittest.TestCase):
+
+    def setUp(self):
+
+        self._pdf_params = {'a': [1.0, 3.0], 'b': [0.0, 2.0]}
+
+    def testLogProbGradient(self):
+
+        from rexfw.proposers.rens import ParamInterpolationPDF
+        from rexfw.proposers.rens import TabulatedParamInterpolationPDF
+
+        pdf = ParamInterpolationPDF(ParamCountingPDF(), self._pdf_params, 4)
+        tab_pdf = TabulatedParamInterpolationPDF(ParamCountingPDF(), self._pdf_params, 4)
+        for i in range(5):
+            self.assertEqual(tab_pdf.log_prob(2.0, i), pdf.log_prob(2.0, i))
+            self.assertEqual(tab_pdf.gradient(2.0, i), pdf.gradient(2.0, i))
+        tab_pdf.restore()
+        self.assertEqual((tab_pdf.pdf.a, tab_pdf.pdf.b), (1.0, 0.0))
+
+    def testNonIntegralSteps(self):
+
+        from rexfw.proposers.rens import ParamInterpolationPDF
+        from rexfw.proposers.rens import TabulatedParamInterpolationPDF
+
+        pdf = ParamInterpolationPDF(ParamCountingPDF(), self._pdf_params, 4)
+        tab_pdf = TabulatedParamInterpolationPDF(ParamCountingPDF(), self._pdf_params, 4)
+        for t in (0.25, 1.0, 2.5):
+            self.assertEqual(tab_pdf.log_prob(2.0, t), pdf.log_prob(2.0, t))
+        tab_pdf.restore()
+
+    def testMDProposer(self):
+
+        from csb.statistics.samplers import State
+        from rexfw.proposers.params import AMDRENSProposerParams
+        from rexfw.proposers.rens import MicrocanonicalMDRENSProposer, MDParamInterpolationPDF
+        from rexfw.proposers.rens import TabulatedMDParamInterpolationPDF
+        from rexfw.test.cases.replicas import CalculateProposalMockReplica
+
+        replica = CalculateProposalMockReplica(MockCommunicator())
+        replica.pdf = GaussianPDF()
+        params = AMDRENSProposerParams(self._pdf_params, 20, 0.05)
+        trajs = []
+        for interpolating_pdf in (MDParamInterpolationPDF, TabulatedMDParamInterpolationPDF):
+            np.random.seed(42)
+            proposer = MicrocanonicalMDRENSProposer('rens', interpolating_pdf)
+            trajs.append(proposer.propose(replica, State(np.array([0.5, -0.2])), 0.145, params))
+            ## the original parameters are restored
+            self.assertEqual((replica.pdf.a, replica.pdf.b), (1.0, 0.0))
+
+        self.assertTrue(np.all(trajs[0].final.position == trajs[1].final.position))
+        self.assertEqual(trajs[0].work, trajs[1].work)
+
+    def testStepProposer(self):
+
+        from rexfw.proposers.params import HMCStepRENSProposerParams
+        from rexfw.proposers.rens import HMCStepRENSProposer, ParamInterpolationPDF
+        from rexfw.proposers.rens import TabulatedParamInterpolationPDF
+        from rexfw.test.cases.replicas import CalculateProposalMockReplica
+        from csb.statistics.samplers import State
+
+        replica = CalculateProposalMockReplica(MockCommunicator())
+        replica.pdf = GaussianPDF()
+        params = HMCStepRENSProposerParams(self._pdf_params, 10, 0.1, 5, 2)
+        trajs = []
+        for interpolating_pdf in (ParamInterpolationPDF, TabulatedParamInterpolationPDF):
+            np.random.seed(42)
+            proposer = HMCStepRENSProposer('rens', interpolating_pdf)
+            trajs.append(proposer.propose(replica, State(np.array([0.5, -0.2])), 0.145, params))
+            self.assertEqual((replica.pdf.a, replica.pdf.b), (1.0, 0.0))
+
+        self.assertTrue(np.all(trajs[0].final.position == trajs[1].final.position))
+        self.assertEqual(trajs[0].work, trajs[1].work)
+
+    def testParamsSetOnStepChange(self):
+
+        from rexfw.proposers.rens import TabulatedParamInterpolationPDF
+
+        pdf = TabulatedParamInterpolationPDF(ParamCountingPDF(), self._pdf_params, 4)
+        for _ in range(3):
+            pdf.log_prob(2.0, 1)
+            pdf.gradient(2.0, 1)
+        self.assertEqual(pdf.pdf.n_set, 2)
+        self.assertEqual((pdf.pdf.a, pdf.pdf.b), (1.5, 0.5))
+
+        pdf.gradient(2.0, 2)
+        self.assertEqual(pdf.pdf.n_set, 4)
+        pdf.restore()
+        self.assertEqual(pdf.pdf.n_set, 6)
+        self.assertEqual((pdf.pdf.a, pdf.pdf.b), (1.0, 0.0))
+
+
+class testHMCStepRENSProposer(unittest.TestCase):
+
+    def _makeProposer(self, max_cached_protocols):
+
+        from rexfw.proposers.rens import HMCStepRENSProposer
+
+        class SetupCountingProposer(HMCStepRENSProposer):
+
+            n_setups = 0
+
+            def _setup_protocol(self, pdf, params):
+
+                self.n_setups += 1
+
+                return object(), (pdf, params.pdf_params)
+
+        return SetupCountingProposer('rens', max_cached_protocols=max_cached_protocols)
+
+    def _makeParams(self, beta):
+
+        from rexfw.proposers.params import HMCStepRENSProposerParams
+
+        return HMCStepRENSProposerParams({'beta': [1.0, beta]}, 10, 0.1, 5, 1)
+
+    def testProtocolCache(self):
+
+        from copy import deepcopy
+
+        proposer = self._makeProposer(2)
+        pdf = ParamCountingPDF()
+        params = self._makeParams(0.5)
+        protocol, _ = proposer._get_protocol(pdf, params)
+        ## parameters arrive as copies
+        self.assertTrue(proposer._get_protocol(pdf, deepcopy(params))[0] is protocol)
+        self.assertEqual(proposer.n_setups, 1)
+
+        ## the reverse direction needs a protocol of its own
+        params.reverse()
+        reverse_protocol, interp_pdf = proposer._get_protocol(pdf, params)
+        self.assertFalse(reverse_protocol is protocol)
+        self.assertEqual(interp_pdf[1], {'beta': [0.5, 1.0]})
+        params.reverse()
+        cached_protocol, interp_pdf = proposer._get_protocol(pdf, params)
+        self.assertTrue(cached_protocol is protocol)
+        self.assertEqual(interp_pdf[1], {'beta': [1.0, 0.5]})
+
+        ## the least recently used protocol is discarded
+        proposer._get_protocol(pdf, self._makeParams(0.25))
+        self.assertEqual(len(proposer._protocols), 2)
+        self.assertTrue(proposer._get_protocol(pdf, params)[0] is protocol)
+        params.reverse()
+        self.assertFalse(proposer._get_protocol(pdf, params)[0] is reverse_protocol)
+        self.assertEqual(proposer.n_setups, 4)
+        self.assertTrue(proposer._get_protocol(ParamCountingPDF(), params)[0] is not protocol)
+
+    def testArrayParameters(self):
+
+        from rexfw.proposers.params import HMCStepRENSProposerParams
+
+        proposer = self._makeProposer(2)
+        pdf = ParamCountingPDF()
+        params = HMCStepRENSProposerParams({'mu': [np.zeros(3), np.ones(3)]}, 10, 0.1, 5, 1)
+        protocol, _ = proposer._get_protocol(pdf, params)
+        same_params = HMCStepRENSProposerParams({'mu': [np.zeros(3), np.ones(3)]},
+                                                10, 0.1, 5, 1)
+        self.assertTrue(proposer._get_protocol(pdf, same_params)[0] is protocol)
+
+        ## values which only differ in shape need protocols of their own
+        params = HMCStepRENSProposerParams({'mu': [np.zeros((3, 1)), np.ones((3, 1))]},
+                                           10, 0.1, 5, 1)
+        self.assertFalse(proposer._get_protocol(pdf, params)[0] is protocol)
+        self.assertEqual(proposer.n_setups, 2)
+
+
+class MockMCRENSTrajectory(object):
+
+    def __init__(self, initial, heat):
+
+        self.initial = initial
+        self.final = initial
+        self.heat = heat
+
+
+class MockPropagator(object):
+
+    def __init__(self, pdf):
+
+        self.pdf = pdf
+
+    def generate(self, state, n_steps, return_trajectory=False):
+
+        self.pdf.log_prob(state.position, 1)
+
+        return MockMCRENSTrajectory(state, np.random.normal())
+
+
+class RecordingPool(object):
+
+    def __init__(self):
+
+        self.n_tasks = []
+
+    def map(self, function, iterable):
+
+        tasks = list(iterable)
+        self.n_tasks.append(len(tasks))
+
+        return map(function, tasks)
+
+
+class testMultipleTryRENSProposer(unittest.TestCase):
+
+    def _makeProposer(self, n_trials, pool=None):
+
+        from rexfw.proposers.rens import AbstractMCRENSProposer, ParamInterpolationPDF
+
+        class MockMCRENSProposer(AbstractMCRENSProposer):
+
+            def _propagator_factory(self, pdf, params):
+
+                return MockPropagator(pdf)
+
+        interpolating_pdf = lambda pdf, params: ParamInterpolationPDF(pdf, params.pdf_params,
+                                                                      params.n_steps)
+
+        return MockMCRENSProposer('rens', interpolating_pdf, n_trials, pool)
+
+    def _makeParams(self):
+
+        from rexfw.proposers.params import AMDRENSProposerParams
+
+        return AMDRENSProposerParams({'a': [2.0, 1.0]}, 3, 0.1)
+
+    def setUp(self):
+
+        from rexfw.test.cases.replicas import CalculateProposalMockReplica
+
+        self._replica = CalculateProposalMockReplica(MockCommunicator())
+        self._replica.pdf = ParamCountingPDF()
+
+    def _propose(self, proposer):
+
+        from csb.statistics.samplers import State
+
+        return proposer.propose(self._replica, State(np.array([2.0])), 4.0,
+                                self._makeParams())
+
+    def testPropose(self):
+
+        np.random.seed(42)
+        pool = RecordingPool()
+        traj = self._propose(self._makeProposer(5, pool))
+
+        self.assertEqual(pool.n_tasks, [5])
+        self.assertEqual(len(traj.trial_works), 5)
+        self.assertTrue(traj.work in traj.trial_works)
+        ## work of the mock trajectories: E_local - E_remote - heat
+        self.assertAlmostEqual(traj.work, 2.0 - 4.0 - traj.heat)
+        self.assertEqual(traj.final.position[0], 2.0)
+        ## parallel trials use copies of the PDF
+        self.assertEqual(self._replica.pdf.n_set, 0)
+
+    def testBatchedEnergies(self):
+
+        batches = []
+        def log_prob_batch(X):
+            batches.append(len(X))
+            return ParamCountingPDF.log_prob_batch(self._replica.pdf, X)
+        self._replica.pdf.log_prob_batch = log_prob_batch
+
+        traj = self._propose(self._makeProposer(4))
+
+        ## the final states of all trials are evaluated at once
+        self.assertEqual(batches, [4])
+        self.assertAlmostEqual(traj.work, 2.0 - 4.0 - traj.heat)
+
+    def testProposeSingleTrial(self):
+
+        traj = self._propose(self._makeProposer(1))
+
+        self.assertEqual(list(traj.trial_works), [traj.work])
+        self.assertEqual(self._replica.pdf.n_set, 2)
+        self.assertEqual(self._replica.pdf.a, 1.0)
+
+    def testSelection(self):
+
+        np.random.seed(42)
+        proposer = self._makeProposer(2)
+        counts = np.zeros(2)
+        for _ in range(2000):
+            traj = self._propose(proposer)
+            i = list(traj.trial_works).index(traj.work)
+            counts[int(traj.trial_works[i] < traj.trial_works[1 - i])] += 1
+
+        ## trials are selected with probability proportional to exp(-work / 2)
+        self.assertTrue(counts[1] > 1.5 * counts[0])
+
+    def testProposeReferences(self):
+
+        from csb.statistics.samplers import State
+
+        proposer = self._makeProposer(3)
+        works = proposer.propose_references(self._replica, State(np.array([2.0])), 4.0,
+                                            self._makeParams())
+
+        self.assertEqual(len(works), 2)
+
+    def testMultipleTryWork(self):
+
+        from rexfw.proposers.rens import multiple_try_work
+
+        ## with a single trial, the usual RENS criterion results
+        w1 = multiple_try_work(np.array([1.5]), np.array([]), -0.5)
+        w2 = multiple_try_work(np.array([-0.5]), np.array([]), 1.5)
+        self.assertAlmostEqual(w1 + w2, 1.0)
+
+        w = multiple_try_work(np.array([1.0, 3.0]), np.array([2.0]), 0.5)
+        expected = np.log(np.exp(0.25) + np.exp(-1.0)) - np.log(np.exp(-0.5) + np.exp(-1.5))
+        self.assertAlmostEqual(w, expected)
+
+    def testGetState(self):
+
+        state = self._makeProposer(2, RecordingPool()).__getstate__()
+
+        ## pools are not sent to worker processes
+        self.assertEqual(state['pool'], None)
+        self.assertEqual(state['n_trials'], 2)
+
+
+class testStreamingMDPropagator(unittest.TestCase):
+
+    def setUp(self):
+
+        from csb.statistics.samplers import State
+
+        np.random.seed(42)
+        self._gradient = lambda x, t: x * (1.0 + 0.1 * t) + 0.1 * x ** 3
+        self._state = State(np.random.normal(size=5), np.random.normal(size=5))
+
+    def testGenerate(self):
+
+        from csb.statistics.samplers.mc.propagators import MDPropagator
+        from rexfw.proposers.propagators import StreamingMDPropagator
+
+        traj = StreamingMDPropagator(self._gradient, 0.05).generate(self._state, 100)
+        expected = MDPropagator(self._gradient, 0.05).generate(self._state, 100)
+
+        self.assertTrue(isinstance(traj, GeneralTrajectory))
+        self.assertEqual(len(traj), 2)
+        self.assertTrue(traj.initial is self._state)
+        self.assertTrue(np.allclose(traj.final.position, expected.final.position))
+        self.assertTrue(np.allclose(traj.final.momentum, expected.final.momentum))
+        self.assertEqual(traj.snapshots, [])
+
+    def testSnapshots(self):
+
+        from rexfw.proposers.propagators import StreamingMDPropagator
+
+        position = self._state.position
+        propagator = StreamingMDPropagator(self._gradient, 0.05, snapshot_interval=30)
+        traj = propagator.generate(self._state, 90)
+        ## snapshots are the states of a trajectory of corresponding length
+        short_traj = propagator.generate(self._state, 60)
+
+        self.assertEqual(traj.snapshot_steps, [30, 60])
+        self.assertTrue(np.allclose(traj.snapshots[1].position, short_traj.final.position))
+        self.assertTrue(np.allclose(traj.snapshots[1].momentum, short_traj.final.momentum))
+        self.assertFalse(traj.snapshots[0] is traj.snapshots[1])
+        ## the initial state is not modified
+        self.assertTrue(np.all(self._state.position == position))
+        ## full trajectories are not stored
+        self.assertRaises(ValueError, propagator.generate, self._state, 90, True)
+
+    def testMicrocanonicalMDRENSProposer(self):
+
+        from csb.statistics.samplers import State
+        from rexfw.proposers.params import AMDRENSProposerParams
+        from rexfw.proposers.rens import MicrocanonicalMDRENSProposer
+        from rexfw.test.cases.replicas import CalculateProposalMockReplica
+
+        ## MDParamInterpolationPDF is the default interpolating PDF
+        proposer = MicrocanonicalMDRENSProposer('rens', snapshot_interval=10)
+        replica = CalculateProposalMockReplica(MockCommunicator())
+        replica.pdf = GaussianPDF()
+        ## without a change of parameters, the work is the energy error of the integrator
+        traj = proposer.propose(replica, State(np.array([0.5, -0.2])), 0.145,
+                                AMDRENSProposerParams({'a': [1.0, 1.0]}, 50, 0.01))
+
+        self.assertEqual(len(traj.snapshots), 4)
+        self.assertTrue(abs(traj.work) < 1e-3)
+
+
+class testThermostattedPropagators(unittest.TestCase):
+
+    def setUp(self):
+
+        from csb.statistics.samplers import State
+
+        np.random.seed(42)
+        self._gradient = lambda x, t: x * (1.0 + 0.1 * t) + 0.1 * x ** 3
+        self._state = State(np.random.normal(size=5), np.random.normal(size=5))
+
+    def _generateMD(self, length):
+
+        from rexfw.proposers.propagators import StreamingMDPropagator
+
+        return StreamingMDPropagator(self._gradient, 0.05).generate(self._state, length)
+
+    def testLangevinPropagator(self):
+
+        from rexfw.proposers.propagators import LangevinPropagator
+
+        ## without friction, Langevin dynamics is Hamiltonian
+        traj = LangevinPropagator(self._gradient, 0.05, 0.0).generate(self._state, 100)
+        expected = self._generateMD(100)
+        self.assertTrue(np.allclose(traj.final.position, expected.final.position))
+        self.assertTrue(np.allclose(traj.final.momentum, expected.final.momentum))
+        self.assertEqual(traj.heat, 0.0)
+
+        ## with very strong friction, the momenta are redrawn in each step
+        traj = LangevinPropagator(self._gradient, 0.05, 1e6).generate(self._state, 100)
+        self.assertNotEqual(traj.heat, 0.0)
+        self.assertTrue(np.all(traj.final.momentum != expected.final.momentum))
+
+    def testAndersenPropagator(self):
+
+        from rexfw.proposers.propagators import AndersenPropagator
+
+        traj = AndersenPropagator(self._gradient, 0.05, 0.0).generate(self._state, 100)
+        expected = self._generateMD(100)
+        self.assertTrue(np.allclose(traj.final.position, expected.final.position))
+        self.assertTrue(np.allclose(traj.final.momentum, expected.final.momentum))
+        self.assertEqual(traj.heat, 0.0)
+
+        ## the first step is followed by an update redrawing all momenta
+        traj = AndersenPropagator(self._gradient, 0.05, 1.0, 3).generate(self._state, 1)
+        expected = self._generateMD(1)
+        self.assertTrue(np.allclose(traj.final.position, expected.final.position))
+        self.assertAlmostEqual(traj.heat,
+                               0.5 * np.sum(traj.final.momentum ** 2)
+                               - 0.5 * np.sum(expected.final.momentum ** 2))
+
+    def testLMDRENSProposer(self):
+
+        from csb.statistics.samplers import State
+        from rexfw.proposers.params import LMDRENSProposerParams
+        from rexfw.proposers.rens import LMDRENSProposer, MDParamInterpolationPDF
+        from rexfw.test.cases.replicas import CalculateProposalMockReplica
+
+        proposer = LMDRENSProposer('rens', MDParamInterpolationPDF)
+        replica = CalculateProposalMockReplica(MockCommunicator())
+        replica.pdf = GaussianPDF()
+        ## the partner samples with a = 2.0, the replica's PDF has a = 1.0
+        position = np.array([0.5, -0.2])
+        traj = proposer.propose(replica, State(position), np.sum(position ** 2),
+                                LMDRENSProposerParams({'a': [2.0, 1.0]}, 50, 0.01, 1.0))
+
+        H_initial = np.sum(traj.initial.position ** 2) + 0.5 * np.sum(traj.initial.momentum ** 2)
+        H_final = (0.5 * np.sum(traj.final.position ** 2)
+                   + 0.5 * np.sum(traj.final.momentum ** 2))
+        self.assertEqual(len(traj), 2)
+        self.assertNotEqual(traj.heat, 0.0)
+        self.assertAlmostEqual(traj.work, H_final - H_initial - traj.heat)
+        self.assertEqual(replica.pdf.a, 1.0)
+
+
+    def testAMDRENSProposer(self):
+
+        from csb.statistics.samplers import State
+        from rexfw.proposers.params import AMDRENSProposerParams
+        from rexfw.proposers.rens import AMDRENSProposer
+        from rexfw.test.cases.replicas import CalculateProposalMockReplica
+
+        proposer = AMDRENSProposer('rens')
+        replica = CalculateProposalMockReplica(MockCommunicator())
+        replica.pdf = GaussianPDF()
+        position = np.array([0.5, -0.2])
+        traj = proposer.propose(replica, State(position), np.sum(position ** 2),
+                                AMDRENSProposerParams({'a': [2.0, 1.0]}, 50, 0.01, 0.5))
+
+        H_initial = np.sum(traj.initial.position ** 2) + 0.5 * np.sum(traj.initial.momentum ** 2)
+        H_final = (0.5 * np.sum(traj.final.position ** 2)
+                   + 0.5 * np.sum(traj.final.momentum ** 2))
+        self.assertNotEqual(traj.heat, 0.0)
+        self.assertAlmostEqual(traj.work, H_final - H_initial - traj.heat)
+        self.assertEqual(replica.pdf.a, 1.0)
+
+
+class testHMCStepPropagator(unittest.TestCase):
+
+    def setUp(self):
+
+        from csb.statistics.samplers import State
+
+        np.random.seed(42)
+        self._log_prob = lambda x, i: -0.5 * (1.0 + 0.1 * i) * np.sum(x ** 2)
+        self._gradient = lambda x, i: (1.0 + 0.1 * i) * x
+        self._state = State(np.random.normal(size=5))
+
+    def testGenerate(self):
+
+        from rexfw.proposers.propagators import HMCStepPropagator
+
+        ## without HMC iterations, the work is the total energy difference
+        propagator = HMCStepPropagator(self._log_prob, self._gradient, 0.1, 5, 0)
+        traj = propagator.generate(self._state, 10)
+        self.assertTrue(np.all(traj.final.position == self._state.position))
+        self.assertAlmostEqual(traj.work, self._log_prob(self._state.position, 0)
+                                          - self._log_prob(self._state.position, 10))
+        self.assertEqual(traj.heat, 0.0)
+
+        propagator = HMCStepPropagator(self._log_prob, self._gradient, 0.1, 5, 3)
+        traj = propagator.generate(self._state, 10)
+        self.assertFalse(np.all(traj.final.position == self._state.position))
+        self.assertTrue(traj.final.momentum is None)
+        self.assertAlmostEqual(traj.work, self._log_prob(self._state.position, 0)
+                                          - self._log_prob(traj.final.position, 10)
+                                          - traj.heat)
+
+    def testHMCStepRENSProposer(self):
+
+        from rexfw.proposers.params import HMCStepRENSProposerParams
+        from rexfw.proposers.rens import HMCStepRENSProposer
+        from rexfw.test.cases.replicas import CalculateProposalMockReplica
+
+        proposer = HMCStepRENSProposer('rens', snapshot_interval=5)
+        replica = CalculateProposalMockReplica(MockCommunicator())
+        replica.pdf = GaussianPDF()
+        params = HMCStepRENSProposerParams({'a': [2.0, 1.0]}, 10, 0.1, 5, 2)
+        E_remote = np.sum(self._state.position ** 2)
+        traj = proposer.propose(replica, self._state, E_remote, params)
+
+        E_local = 0.5 * np.sum(traj.final.position ** 2)
+        self.assertEqual(len(traj), 2)
+        self.assertNotEqual(traj.heat, 0.0)
+        self.assertAlmostEqual(traj.work, E_local - E_remote - traj.heat)
+        self.assertEqual(len(traj.snapshots), 1)
+        ## the interpolating PDF restores the original parameters
+        self.assertEqual(replica.pdf.a, 1.0)
+        self.assertTrue(proposer._propagator_factory(replica.pdf, params) is
+                        proposer._propagator_factory(replica.pdf, params))
+
+
 if __name__ == '__main__':
 
     unittest.main()
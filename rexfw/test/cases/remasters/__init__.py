@@ -6,7 +6,9 @@ import numpy as np
 from collections import deque
 
 from rexfw import Parcel
-from rexfw.remasters import ExchangeMaster
+from rexfw.remasters import ExchangeMaster, AsyncExchangeMaster, DirectExchangeMaster
+from rexfw.remasters import ParameterExchangeMaster, EnergyExchangeMaster
+from rexfw.remasters import MultipleTryExchangeMaster
 from rexfw.slgenerators import ExchangeParams
 from rexfw.proposers.params import REProposerParams
 from rexfw.test.cases.communicators import MockCommunicator
@@ -393,6 +395,40 @@ class testExchangeMaster(unittest.TestCase):
             self._checkParcel(obj, r, self._remaster.name)
             self._checkSendSampleRequest(obj.data, self._remaster.name)
 
+    def testSendSampleNRequests(self):
+
+        from rexfw.remasters.requests import SampleNRequest
+
+        self._setUpExchangeMaster(MockCommunicator())
+
+        self._remaster._send_sample_n_requests(self._replica_names, 7)
+
+        sent_objs = self._remaster._comm.sent
+        for r in self._replica_names:
+            obj, _ = sent_objs.popleft()
+            self._checkParcel(obj, r, self._remaster.name)
+            self.assertTrue(isinstance(obj.data, SampleNRequest))
+            self.assertEqual(obj.data.sender, self._remaster.name)
+            self.assertEqual(obj.data.n_steps, 7)
+
+    def testCountSamplingSteps(self):
+
+        self._setUpExchangeMaster(MockCommunicator())
+        count = lambda step, n_iterations=1000: self._remaster._count_sampling_steps(
+            step, n_iterations, swap_interval=5, intervals=(20, 12))
+
+        ## up to the step before the next swap
+        self.assertEqual(count(0), 5)
+        self.assertEqual(count(1), 4)
+        self.assertEqual(count(6), 4)
+        ## up to the next step with an event
+        self.assertEqual(count(11), 2)
+        self.assertEqual(count(16), 4)
+        self.assertEqual(count(12), 1)
+        ## up to the last step
+        self.assertEqual(count(997), 3)
+        self.assertEqual(count(1, n_iterations=3), 2)
+
     def _checkSendDumpSamplesRequest(self, obj, sender, folder, smin, smax,
                                      offset, dump_step):
 
@@ -423,6 +459,22 @@ class testExchangeMaster(unittest.TestCase):
                                               folder, smin, smax, offset,
                                               dump_step)
 
+    def testSendSetupSampleStoreRequests(self):
+
+        from rexfw.remasters.requests import SetupSampleStoreRequest
+
+        self._setUpExchangeMaster(MockCommunicator())
+
+        self._remaster._send_setup_sample_store_requests(200, 3)
+
+        sent_objs = self._remaster._comm.sent
+        for r in self._replica_names:
+            obj, _ = sent_objs.popleft()
+            self._checkParcel(obj, r, self._remaster.name)
+            self.assertTrue(isinstance(obj.data, SetupSampleStoreRequest))
+            self.assertEqual(obj.data.dump_interval, 200)
+            self.assertEqual(obj.data.dump_step, 3)
+
     def _checkDieRequest(self, obj, sender):
 
         from rexfw.remasters.requests import DieRequest
@@ -443,6 +495,345 @@ class testExchangeMaster(unittest.TestCase):
             self._checkParcel(obj, r, self._remaster.name)
             self._checkDieRequest(obj.data, self._remaster.name)
 
+class ScriptedMockCommunicator(MockCommunicator):
+
+    def __init__(self, parcels):
+
+        super(ScriptedMockCommunicator, self).__init__()
+
+        self.to_receive = deque(parcels)
+
+    def recv(self, source):
+
+        obj = self.to_receive.popleft()
+        self.received.append([obj, source])
+
+        return obj
+
+
+class MockAsyncExchangeMaster(AsyncExchangeMaster):
+
+    def __init__(self, comm):
+
+        replica_names = ['replica1', 'replica2', 'replica3', 'replica4']
+
+        super(MockAsyncExchangeMaster, self).__init__('remaster0',
+                                                      replica_names,
+                                                      [],
+                                                      MockStatistics(),
+                                                      MockREStatistics(),
+                                                      comm,
+                                                      MockSwapListGenerator())
+
+
+class testAsyncExchangeMaster(unittest.TestCase):
+
+    def _makeSwapList(self):
+
+        from rexfw.test.cases.proposers.params import MockProposerParams
+        
+        return [['replica1', 'replica2', ExchangeParams([], MockProposerParams())],
+                ['replica3', 'replica4', ExchangeParams([], MockProposerParams())]]
+
+    def testTriggerProposalCalculation(self):
+
+        from rexfw.replicas.requests import DoNothingRequest
+        from rexfw.remasters.requests import SendGetStateAndEnergyRequest, ProposeRequest
+
+        syncs = [Parcel(r, 'remaster0', DoNothingRequest(r))
+                 for r in ('replica4', 'replica2', 'replica1', 'replica3')]
+        comm = ScriptedMockCommunicator(syncs)
+        remaster = MockAsyncExchangeMaster(comm)
+        swap_list = self._makeSwapList()
+        remaster._trigger_proposal_calculation(swap_list)
+
+        self.assertEqual(len(comm.to_receive), 0)
+        sent = [(obj.data, dest) for obj, dest in comm.sent]
+        self.assertEqual(len(sent), 8)
+        ## all state requests of one direction are sent before any
+        ## synchronization message is received
+        for (request, dest), (expected_dest, partner) in zip(sent[:4],
+                                                              (('replica2', 'replica1'),
+                                                               ('replica4', 'replica3'),
+                                                               ('replica1', 'replica2'),
+                                                               ('replica3', 'replica4'))):
+            self.assertTrue(isinstance(request, SendGetStateAndEnergyRequest))
+            self.assertEqual(dest, expected_dest)
+            self.assertEqual(request.partner, partner)
+        for request, dest in sent[4:]:
+            self.assertTrue(isinstance(request, ProposeRequest))
+        for _, _, params in swap_list:
+            self.assertEqual(params.proposer_params.reverse_events, 2)
+
+    def testReceiveWorksAndTriggerExchanges(self):
+
+        from rexfw.replicas.requests import DoNothingRequest
+        from rexfw.remasters.requests import AcceptBufferedProposalRequest
+
+        ## the second pair finishes first and gets its (accepting) answer
+        ## before the first pair, which is rejected
+        parcels = [Parcel('replica4', 'remaster0', (-50.0, 1.0)),
+                   Parcel('replica3', 'remaster0', (-60.0, 2.0)),
+                   Parcel('replica2', 'remaster0', (50.0, 3.0)),
+                   Parcel('replica4', 'remaster0', DoNothingRequest('replica4')),
+                   Parcel('replica1', 'remaster0', (60.0, 4.0)),
+                   Parcel('replica1', 'remaster0', DoNothingRequest('replica1')),
+                   Parcel('replica3', 'remaster0', DoNothingRequest('replica3')),
+                   Parcel('replica2', 'remaster0', DoNothingRequest('replica2'))]
+        comm = ScriptedMockCommunicator(parcels)
+        remaster = MockAsyncExchangeMaster(comm)
+        acc, works, heats = remaster._receive_works_and_trigger_exchanges(self._makeSwapList())
+
+        self.assertEqual(len(comm.to_receive), 0)
+        self.assertEqual(list(acc), [False, True])
+        self.assertTrue(np.all(works == [[60.0, 50.0], [-60.0, -50.0]]))
+        self.assertTrue(np.all(heats == [[4.0, 3.0], [2.0, 1.0]]))
+        sent = [(obj.data, dest) for obj, dest in comm.sent]
+        self.assertEqual([dest for _, dest in sent],
+                         ['replica3', 'replica4', 'replica1', 'replica2'])
+        for request, _ in sent:
+            self.assertTrue(isinstance(request, AcceptBufferedProposalRequest))
+        self.assertEqual([request.accept for request, _ in sent],
+                         [True, True, False, False])
+
+
+class testDirectExchangeMaster(unittest.TestCase):
+
+    def testTriggerProposalCalculation(self):
+
+        from rexfw.remasters.requests import ExchangeStatesProposeRequest
+
+        comm = MockCommunicator()
+        remaster = DirectExchangeMaster('remaster0', ['replica1', 'replica2', 'replica3'],
+                                        [], MockStatistics(), MockREStatistics(),
+                                        comm, MockSwapListGenerator())
+        swap_list = remaster._calculate_swap_list(0)
+        remaster._trigger_proposal_calculation(swap_list)
+
+        ## one request per replica and nothing to receive
+        self.assertEqual(len(comm.received), 0)
+        self.assertEqual(len(comm.sent), 2)
+        for (obj, dest), partner in zip(comm.sent, ('replica2', 'replica1')):
+            self.assertEqual(obj.receiver, dest)
+            self.assertTrue(isinstance(obj.data, ExchangeStatesProposeRequest))
+            self.assertEqual(obj.data.sender, 'remaster0')
+            self.assertEqual(obj.data.partner, partner)
+        self.assertEqual(swap_list[0][2].proposer_params.reverse_events, 2)
+
+    def testReceiveWorksAndTriggerExchanges(self):
+
+        from rexfw.remasters.requests import AcceptDirectSwapRequest
+        from rexfw.test.cases.proposers.params import MockProposerParams
+
+        ## replicas don't acknowledge accept / reject requests, so only
+        ## works are received
+        parcels = [Parcel('replica2', 'remaster0', (-50.0, 1.0)),
+                   Parcel('replica1', 'remaster0', (-60.0, 2.0))]
+        comm = ScriptedMockCommunicator(parcels)
+        remaster = DirectExchangeMaster('remaster0', ['replica1', 'replica2', 'replica3'],
+                                        [], MockStatistics(), MockREStatistics(),
+                                        comm, MockSwapListGenerator())
+        swap_list = [['replica1', 'replica2', ExchangeParams([], MockProposerParams())]]
+        acc, works, heats = remaster._receive_works_and_trigger_exchanges(swap_list)
+
+        self.assertEqual(len(comm.to_receive), 0)
+        self.assertEqual(len(comm.received), 2)
+        self.assertEqual(list(acc), [True])
+        sent = [(obj.data, dest) for obj, dest in comm.sent]
+        self.assertEqual([dest for _, dest in sent], ['replica1', 'replica2'])
+        for request, _ in sent:
+            self.assertTrue(isinstance(request, AcceptDirectSwapRequest))
+            self.assertTrue(request.accept)
+
+
+class testParameterExchangeMaster(unittest.TestCase):
+
+    def setUp(self):
+
+        self._pdf_params = [{'sigma': float(i + 1)} for i in range(3)]
+
+    def _makeRemaster(self, comm):
+
+        return ParameterExchangeMaster('remaster0', ['replica1', 'replica2', 'replica3'],
+                                       [], MockStatistics(), MockREStatistics(),
+                                       comm, self._pdf_params, MockSwapListGenerator())
+
+    def _makeSwapList(self, label1, label2):
+
+        from rexfw.test.cases.proposers.params import MockProposerParams
+
+        return [[label1, label2, ExchangeParams([], MockProposerParams())]]
+
+    def testSendSetPDFParamsRequests(self):
+
+        from rexfw.remasters.requests import SetPDFParamsRequest
+
+        comm = MockCommunicator()
+        remaster = self._makeRemaster(comm)
+        remaster._send_set_pdf_params_requests()
+
+        self.assertEqual([dest for _, dest in comm.sent], remaster.replica_names)
+        for i, (obj, _) in enumerate(comm.sent):
+            self.assertTrue(isinstance(obj.data, SetPDFParamsRequest))
+            self.assertEqual(obj.data.params, self._pdf_params[i])
+            self.assertEqual(obj.data.param_index, i)
+
+    def testPerformExchanges(self):
+
+        from rexfw.replicas.requests import DoNothingRequest
+        from rexfw.remasters.requests import CalculatePDFParamsWorkRequest
+        from rexfw.remasters.requests import SwapPDFParamsRequest
+
+        parcels = [Parcel('replica3', 'remaster0', (-2.0, 0.0)),
+                   Parcel('replica2', 'remaster0', (1.0, 0.0)),
+                   Parcel('replica2', 'remaster0', DoNothingRequest('replica2')),
+                   Parcel('replica3', 'remaster0', DoNothingRequest('replica3'))]
+        comm = ScriptedMockCommunicator(parcels)
+        remaster = self._makeRemaster(comm)
+        remaster.step = 4
+        res = remaster._perform_exchanges(self._makeSwapList('replica2', 'replica3'))
+
+        self.assertEqual(len(comm.to_receive), 0)
+        self.assertEqual(len(res), 1)
+        self.assertTrue(res[0][0])
+        self.assertTrue(np.all(res[0][1] == [-2.0, 1.0]))
+        sent = [(obj.data, dest) for obj, dest in comm.sent]
+        ## only works and parameters, but no states are requested and sent
+        for (request, dest), (expected_dest, index) in zip(sent[:2], (('replica2', 2),
+                                                                      ('replica3', 1))):
+            self.assertTrue(isinstance(request, CalculatePDFParamsWorkRequest))
+            self.assertEqual(dest, expected_dest)
+            self.assertEqual(request.params, self._pdf_params[index])
+        for (request, dest), (expected_dest, index) in zip(sent[2:], (('replica2', 2),
+                                                                      ('replica3', 1))):
+            self.assertTrue(isinstance(request, SwapPDFParamsRequest))
+            self.assertEqual(dest, expected_dest)
+            self.assertTrue(request.accept)
+            self.assertEqual(request.param_index, index)
+
+        self.assertEqual(remaster._permutation, ['replica1', 'replica3', 'replica2'])
+        self.assertEqual(remaster._holder('replica3'), 'replica2')
+        self.assertEqual(remaster._get_no_ex_replicas(self._makeSwapList('replica1',
+                                                                         'replica2')),
+                         ['replica2'])
+        self.assertEqual(remaster._permutation_history[-1],
+                         (4, {'replica1': 0, 'replica3': 1, 'replica2': 2}))
+
+    def testReceiveAndUpdateStats(self):
+
+        class RecordingStatistics(MockStatistics):
+
+            def update_single_step(self, origins, step, sampling_stats):
+
+                self.update_stack.append((origins, step, sampling_stats))
+
+        from rexfw.statistics.summaries import SamplerStatsSummary
+
+        summary = SamplerStatsSummary(0)
+        parcels = [Parcel('replica3', 'remaster0', [(3, 'a'), (5, 'b'), summary])]
+        comm = ScriptedMockCommunicator(parcels)
+        remaster = self._makeRemaster(comm)
+        remaster.sampling_statistics = RecordingStatistics()
+        remaster._permutation = ['replica1', 'replica3', 'replica2']
+        remaster._permutation_history.append((4, remaster._replica_param_indices()))
+        remaster._receive_and_update_stats(['replica2'])
+
+        ## statistics of steps before the swap belong to the replica's former
+        ## parameter set
+        self.assertEqual(comm.received[0][1], 'replica3')
+        self.assertEqual(list(remaster.sampling_statistics.update_stack),
+                         [(['replica3'], 3, 'a'), (['replica2'], 5, 'b'),
+                          ([summary], ['replica1'])])
+        self.assertEqual(len(remaster._permutation_history), 2)
+
+
+class testEnergyExchangeMaster(unittest.TestCase):
+
+    def testTriggerExchanges(self):
+
+        from rexfw.replicas.requests import DoNothingRequest
+        from rexfw.remasters.requests import SendGetStateAndEnergyRequest
+        from rexfw.remasters.requests import AcceptPartnerStateRequest
+        from rexfw.test.cases.proposers.params import MockProposerParams
+
+        syncs = [Parcel(r, 'remaster0', DoNothingRequest(r))
+                 for r in ('replica2', 'replica1', 'replica1', 'replica2',
+                           'replica3', 'replica4')]
+        comm = ScriptedMockCommunicator(syncs)
+        remaster = EnergyExchangeMaster('remaster0', ['replica1', 'replica2', 'replica3',
+                                                      'replica4'],
+                                        [], MockStatistics(), MockREStatistics(), comm,
+                                        [{'sigma': float(i + 1)} for i in range(4)],
+                                        MockSwapListGenerator())
+        swap_list = [['replica1', 'replica2', ExchangeParams([], MockProposerParams())],
+                     ['replica3', 'replica4', ExchangeParams([], MockProposerParams())]]
+        remaster._trigger_exchanges(swap_list, [True, False])
+
+        self.assertEqual(len(comm.to_receive), 0)
+        sent = [(obj.data, dest) for obj, dest in comm.sent]
+        ## only the states of the accepted pair are exchanged
+        self.assertEqual([dest for _, dest in sent],
+                         ['replica2', 'replica1', 'replica1', 'replica2',
+                          'replica3', 'replica4'])
+        for request, _ in sent[:2]:
+            self.assertTrue(isinstance(request, SendGetStateAndEnergyRequest))
+        for request, _ in sent[2:]:
+            self.assertTrue(isinstance(request, AcceptPartnerStateRequest))
+        self.assertEqual([request.accept for request, _ in sent[2:]],
+                         [True, True, False, False])
+        ## replicas keep their parameters
+        self.assertEqual(remaster._permutation, remaster.replica_names)
+
+
+class testMultipleTryExchangeMaster(unittest.TestCase):
+
+    def testPerformExchanges(self):
+
+        from rexfw.replicas.requests import DoNothingRequest
+        from rexfw.remasters.requests import SendGetStateAndEnergyRequest, ProposeRequest
+        from rexfw.remasters.requests import SendProposalRequest, ProposeReferencesRequest
+        from rexfw.remasters.requests import AcceptBufferedProposalRequest
+        from rexfw.test.cases.proposers.params import MockProposerParams
+
+        sync = lambda r: Parcel(r, 'remaster0', DoNothingRequest(r))
+        parcels = [sync('replica2'), sync('replica1'),
+                   Parcel('replica1', 'remaster0', (3.0, 1.0)),
+                   Parcel('replica2', 'remaster0', (4.0, 2.0)),
+                   sync('replica2'), sync('replica1'),
+                   Parcel('replica1', 'remaster0', (-1.0, 0.0)),
+                   Parcel('replica2', 'remaster0', (-2.0, 0.0)),
+                   sync('replica1'), sync('replica2')]
+        comm = ScriptedMockCommunicator(parcels)
+        remaster = MultipleTryExchangeMaster('remaster0', ['replica1', 'replica2'], [],
+                                             MockStatistics(), MockREStatistics(),
+                                             comm, MockSwapListGenerator())
+        swap_list = [['replica1', 'replica2', ExchangeParams([], MockProposerParams())]]
+        res = remaster._perform_exchanges(swap_list)
+
+        self.assertEqual(len(comm.to_receive), 0)
+        ## effective works decide on the swap and are logged with the
+        ## heats of the selected trajectories
+        self.assertTrue(res[0][0])
+        self.assertTrue(np.all(res[0][1] == [-1.0, -2.0]))
+        self.assertTrue(np.all(res[0][2] == [1.0, 2.0]))
+        sent = [(obj.data, dest) for obj, dest in comm.sent]
+        self.assertEqual([(type(request), dest) for request, dest in sent],
+                         [(SendGetStateAndEnergyRequest, 'replica2'),
+                          (SendGetStateAndEnergyRequest, 'replica1'),
+                          (ProposeRequest, 'replica1'), (ProposeRequest, 'replica2'),
+                          (SendProposalRequest, 'replica1'),
+                          (SendProposalRequest, 'replica2'),
+                          (ProposeReferencesRequest, 'replica1'),
+                          (ProposeReferencesRequest, 'replica2'),
+                          (AcceptBufferedProposalRequest, 'replica1'),
+                          (AcceptBufferedProposalRequest, 'replica2')])
+        self.assertEqual([request.partner for request, _ in sent[4:8]],
+                         ['replica2', 'replica1', 'replica2', 'replica1'])
+        ## each replica gets the work of the trajectory its partner selected
+        self.assertEqual([request.partner_work for request, _ in sent[6:8]], [4.0, 3.0])
+        self.assertEqual(swap_list[0][2].proposer_params.reverse_events, 4)
+
+
 if __name__ == '__main__':
 
     unittest.main()
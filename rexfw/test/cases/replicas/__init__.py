@@ -43,7 +43,7 @@ class MockReplica(Replica):
                                           {'mock_proposer1': MockProposer()},
                                           makeTmpDirs(), comm)
 
-        self._request_processing_table.update(TestRequest='self._process_test_request({})')
+        self._request_processing_table.update(TestRequest=self._process_test_request)
         self.test_request_processed = 0
 
     def _process_test_request(self, request):
@@ -93,6 +93,18 @@ class CalculateProposalMockReplica(MockReplica):
         return 42
 
     
+class PartnerStateReceivingMockCommunicator(MockCommunicator):
+
+    def recv(self, source):
+
+        from rexfw.replicas.requests import PartnerStateEnergyRequest
+
+        obj = Parcel(source, 'replica1', PartnerStateEnergyRequest(source, 34, 66))
+        self.received.append([obj, source])
+
+        return obj
+
+
 class SetupSamplerMockReplica(Replica):
 
     def __init__(self):
@@ -220,6 +232,93 @@ class testReplica(unittest.TestCase):
         self.assertEqual(self._replica._n_samples_drawn, 1)
         self.assertEqual(self._replica.energy_trace[-1], -old_state ** 2)
 
+    def testEnergyCache(self):
+
+        calls = []
+        log_prob = self._replica.pdf.log_prob
+        self._replica.pdf.log_prob = lambda x: calls.append(x) or log_prob(x)
+
+        self.assertEqual(self._replica.energy, -self._replica.state)
+        self.assertEqual(self._replica.energy, -self._replica.state)
+        self.assertEqual(len(calls), 1)
+
+        self._replica.state = 7
+        self.assertEqual(self._replica.energy, -7)
+        self.assertEqual(len(calls), 2)
+
+    def testGetEnergies(self):
+
+        import numpy as np
+
+        energies = self._replica.get_energies([2, 3])
+        self.assertTrue(np.all(energies == [-2, -3]))
+
+        self._replica.pdf.log_prob_batch = lambda X: np.array(X) * 2
+        energies = self._replica.get_energies([2, 3])
+        self.assertTrue(np.all(energies == [-4, -6]))
+
+    def testSampleUsesSamplerEnergy(self):
+
+        old_state = self._replica.state
+        self._replica._sampler.last_energy = 42
+        self._replica._sample(None)
+
+        self.assertEqual(self._replica.state, old_state ** 2)
+        self.assertEqual(self._replica.energy, 42)
+        self.assertEqual(self._replica.energy_trace[-1], 42)
+
+    def testSampleN(self):
+
+        from rexfw.remasters.requests import SampleNRequest
+
+        self._replica._sample_n(SampleNRequest('remaster0', 3))
+
+        self.assertEqual(self._replica.samples, [16, 16, 16])
+        self.assertEqual([s[0] for s in self._replica.sampler_stats], [0, 1, 2])
+        self.assertEqual(self._replica._n_samples_drawn, 3)
+        self.assertEqual(len(self._replica.energy_trace), 3)
+
+
+    def testSampleAggregateStats(self):
+
+        from rexfw.statistics.summaries import SamplerStatsSummary
+        from rexfw.samplers.rwmc import RWMCSampleStats
+
+        class StatsMockSampler(MockSampler):
+
+            last_draw_stats = {'x': RWMCSampleStats(True, 1, 0.5)}
+
+        self._replica.aggregate_stats = True
+        self._replica._sampler = StatsMockSampler(self._replica.pdf, 2, 4)
+        for param_index in (None, None, 1):
+            self._replica.param_index = param_index
+            self._replica._sample(None)
+
+        summaries = self._replica.sampler_stats
+        self.assertEqual(len(summaries), 2)
+        self.assertTrue(all(isinstance(s, SamplerStatsSummary) for s in summaries))
+        self.assertEqual([s.param_index for s in summaries], [None, 1])
+        self.assertEqual([s.n_steps for s in summaries], [2, 1])
+        self.assertEqual(summaries[0].sum('x', 'accepted'), 2)
+        self.assertEqual(summaries[1].last_step, 2)
+
+    def testSampleImmutableStates(self):
+
+        import numpy as np
+
+        self._replica.immutable_states = True
+        self._replica.state = np.array([4.0])
+        self._replica._sampler.state = np.array([3.0])
+        self._replica._sample(None)
+
+        ## a single copy of the sampler result is both state and sample
+        self.assertTrue(self._replica.samples[-1] is self._replica.state)
+        self.assertFalse(self._replica.state is self._replica._sampler.last_sampled)
+        self.assertEqual(self._replica.samples[-1][0], 9.0)
+        ## which is protected against in-place changes by the sampler
+        self._replica._sampler.last_sampled[0] = 5.0
+        self.assertEqual(self._replica.samples[-1][0], 9.0)
+
     def testSendStats(self):
 
         from rexfw.remasters.requests import SendStatsRequest
@@ -256,6 +355,75 @@ class testReplica(unittest.TestCase):
         self.assertTrue(np.all(np.array(dumped_samples) == buffered_samples[::step]))
         self.assertEqual(len(self._replica.samples), 0)
 
+    def testDumpSamplesFromSampleStore(self):
+
+        import numpy as np
+        from cPickle import load
+        from rexfw.remasters.requests import DumpSamplesRequest, SetupSampleStoreRequest
+        from rexfw.replicas.sample_stores import SampleStore
+
+        self._replica._setup_sample_store(SetupSampleStoreRequest('remaster45', 10, 3))
+        self.assertTrue(isinstance(self._replica.samples, SampleStore))
+        buffered_samples = [np.array([float(i)]) for i in range(11)]
+        for s in buffered_samples:
+            self._replica._store_sample(s)
+        self.assertEqual(len(self._replica.samples), 4)
+
+        req = DumpSamplesRequest('remaster45', 0, 10, 0, 3)
+        self._replica._dump_samples(req)
+
+        fname = '{}samples/samples_{}_0-10.pickle'.format(self._replica.output_folder,
+                                                          self._replica.name)
+        with open(fname) as ipf:
+            dumped_samples = load(ipf)
+        self.assertTrue(np.all(np.array(dumped_samples) == np.array(buffered_samples[::3])))
+        self.assertTrue(isinstance(self._replica.samples, SampleStore))
+        self.assertEqual(len(self._replica.samples), 0)
+
+    def testDumpSamplesStreaming(self):
+
+        import numpy as np
+        from rexfw.remasters.requests import DumpSamplesRequest, SetupSampleStoreRequest
+        from rexfw.replicas.sample_writers import StreamingSampleWriter, load_samples
+
+        folder = self._replica.output_folder + 'samples/'
+        self._replica._sample_writer = StreamingSampleWriter(folder, self._replica.name)
+        self._replica._setup_sample_store(SetupSampleStoreRequest('remaster45', 10, 3))
+        for i in range(11):
+            self._replica._store_sample(np.array([float(i)]))
+            self._replica._increase_sample_counter()
+        self._replica._dump_samples(DumpSamplesRequest('remaster45', 0, 10, 100, 3))
+        for i in range(11, 21):
+            self._replica._store_sample(np.array([float(i)]))
+            self._replica._increase_sample_counter()
+        self._replica._dump_samples(DumpSamplesRequest('remaster45', 10, 20, 100, 3))
+
+        samples, steps = load_samples(folder, self._replica.name)
+        self.assertEqual(list(steps), [100, 103, 106, 109, 111, 114, 117, 120])
+        self.assertEqual(list(samples[:, 0]), [0, 3, 6, 9, 11, 14, 17, 20])
+
+    def testDumpSamplesStrideMismatch(self):
+
+        import numpy as np
+        from rexfw.remasters.requests import DumpSamplesRequest
+        from rexfw.replicas.sample_stores import SampleStore
+        from rexfw.replicas.sample_writers import StreamingSampleWriter, load_samples
+
+        folder = self._replica.output_folder + 'samples/'
+        self._replica._sample_writer = StreamingSampleWriter(folder, self._replica.name)
+        for store_samples in (np.array, list):
+            ## the store keeps every second sample, but every fourth one is written
+            self._replica.samples = SampleStore(2, 20)
+            for i in range(11):
+                self._replica._store_sample(store_samples([float(i)]))
+                self._replica._increase_sample_counter()
+            self._replica._dump_samples(DumpSamplesRequest('remaster45', 0, 10, 0, 4))
+
+        samples, steps = load_samples(folder, self._replica.name)
+        self.assertEqual(list(steps), [0, 4, 8, 11, 15, 19])
+        self.assertEqual(list(samples[:, 0]), [0, 4, 8, 0, 4, 8])
+        self.assertEqual(len(self._replica.samples), 0)
+
     def testDumpEnergies(self):
 
         import os
@@ -272,6 +440,42 @@ class testReplica(unittest.TestCase):
         self.assertEqual(energies[0], 3)
         self.assertEqual(len(self._replica.energy_trace), 0)
 
+        self._replica.energy_trace = [4, 5]
+        self._replica._dump_energies()
+        self.assertEqual(list(np.load(fname)), [3, 4, 5])
+
+
+    def testDumpInBackground(self):
+
+        import os
+        import numpy as np
+        from rexfw.remasters.requests import DumpSamplesRequest, SetupSampleStoreRequest
+        from rexfw.remasters.requests import DieRequest
+        from cPickle import load
+        from rexfw.replicas.sample_writers import BackgroundWriter
+
+        self._replica._background_writer = BackgroundWriter()
+        states = iter(np.arange(5.0)[:, None])
+        self._replica._sampler.sample = lambda: next(states)
+        self._replica.process_request(SetupSampleStoreRequest('remaster0', 2, 1))
+        for s_min in (0, 2):
+            for _ in range(2):
+                self._replica._sample(None)
+            self._replica.process_request(DumpSamplesRequest('remaster0', s_min, s_min + 2,
+                                                             0, 1))
+        ## the sample store's memory is reused right away
+        self._replica._sample(None)
+        self.assertEqual(self._replica.process_request(DieRequest('remaster0')), -1)
+
+        folder = self._replica.output_folder
+        energies = np.load('{}energies/{}.npy'.format(folder, self._replica.name))
+        self.assertEqual(len(energies), 4)
+        for s_min in (0, 2):
+            with open('{}samples/samples_replica1_{}-{}.pickle'.format(folder, s_min,
+                                                                      s_min + 2)) as ipf:
+                samples = load(ipf)
+            self.assertEqual([x[0] for x in samples], [s_min, s_min + 1])
+
     def testProcessRequest(self):
 
         from collections import namedtuple
@@ -281,6 +485,12 @@ class testReplica(unittest.TestCase):
 
         self.assertEqual(self._replica.test_request_processed, 1)
 
+    def testProcessDieRequest(self):
+
+        from rexfw.remasters.requests import DieRequest
+
+        self.assertEqual(self._replica.process_request(DieRequest('remaster0')), -1)
+
     def testPropose(self):
 
         from rexfw.remasters import ProposeRequest
@@ -297,6 +507,81 @@ class testReplica(unittest.TestCase):
         self.assertTrue(self._replica.works_heats_sent)
         self.assertEqual(self._replica._buffered_proposal, 4)
 
+    def testStorePartnerStateEnergy(self):
+
+        from rexfw.replicas.requests import PartnerStateEnergyRequest
+
+        req = PartnerStateEnergyRequest('replica234', 2.5, 99)
+        self._replica._store_partner_state_energy(req)
+
+        self.assertEqual(self._replica._buffered_partner_state, 2.5)
+        self.assertEqual(self._replica._buffered_partner_energy, 99)
+        self.assertEqual(self._replica._buffered_partner_name, 'replica234')
+        ## no sync message to the master object
+        self.assertEqual(len(self._replica._comm.sent), 0)
+
+    def _checkExchangeStatesAndPropose(self, partner_state_buffered):
+
+        from rexfw.remasters.requests import ExchangeStatesProposeRequest
+        from rexfw.replicas.requests import PartnerStateEnergyRequest
+        from rexfw.slgenerators import ExchangeParams
+        from rexfw.proposers.params import REProposerParams
+
+        self._replica = ProposeMockReplica(PartnerStateReceivingMockCommunicator())
+        if partner_state_buffered:
+            self._replica._store_partner_state_energy(PartnerStateEnergyRequest('replica2', 12, 13))
+        req = ExchangeStatesProposeRequest('remaster34', 'replica2',
+                                           ExchangeParams(['mock_proposer1'],
+                                                          REProposerParams()))
+        self._replica._exchange_states_and_propose(req)
+
+        last_sent, dest = self._replica._comm.sent.pop()
+        self.assertEqual(dest, 'replica2')
+        self._checkParcel(last_sent, 'replica2')
+        self.assertTrue(isinstance(last_sent.data, PartnerStateEnergyRequest))
+        self.assertEqual(last_sent.data.state, self._replica.state)
+        self.assertEqual(last_sent.data.energy, self._replica.energy)
+        received = self._replica._comm.received
+        self.assertEqual(len(received), 0 if partner_state_buffered else 1)
+        self.assertEqual(self._replica._buffered_partner_state,
+                         12 if partner_state_buffered else 34)
+        self.assertEqual(self._replica._buffered_partner_name, None)
+        self.assertEqual(self._replica._current_master, 'remaster34')
+        self.assertTrue(self._replica.works_heats_sent)
+
+    def testExchangeStatesAndPropose(self):
+
+        for partner_state_buffered in (True, False):
+            self._checkExchangeStatesAndPropose(partner_state_buffered)
+
+    def testExchangeStatesAndProposeLocalPartner(self):
+
+        from rexfw.remasters.requests import ExchangeStatesProposeRequest
+        from rexfw.replicas.requests import PartnerStateEnergyRequest
+        from rexfw.slgenerators import ExchangeParams
+        from rexfw.proposers.params import REProposerParams
+
+        comm = PartnerStateReceivingMockCommunicator()
+        comm.is_local = lambda name: name == 'replica2'
+        self._replica = ProposeMockReplica(comm)
+        req = ExchangeStatesProposeRequest('remaster34', 'replica2',
+                                           ExchangeParams(['mock_proposer1'],
+                                                          REProposerParams()))
+        self._replica._exchange_states_and_propose(req)
+
+        ## the partner can't answer before it processes its own request
+        last_sent, dest = comm.sent.pop()
+        self.assertEqual(dest, 'replica2')
+        self.assertTrue(isinstance(last_sent.data, PartnerStateEnergyRequest))
+        self.assertEqual(len(comm.received), 0)
+        self.assertFalse(self._replica.works_heats_sent)
+
+        self._replica._store_partner_state_energy(PartnerStateEnergyRequest('replica2', 12, 13))
+        self.assertTrue(self._replica.works_heats_sent)
+        self.assertEqual(self._replica._buffered_partner_state, 12)
+        self.assertEqual(self._replica._buffered_partner_name, None)
+        self.assertEqual(self._replica._pending_exchange_request, None)
+
     def testSendWorksHeats(self):
 
         from rexfw.proposers import GeneralTrajectory
@@ -363,6 +648,170 @@ class testReplica(unittest.TestCase):
             self._replica._accept_buffered_proposal(req)
             self._checkAcceptBufferedProposal(accepted)
 
+    def testAcceptDirectSwap(self):
+
+        from rexfw.remasters.requests import AcceptDirectSwapRequest
+
+        for accepted in (True, False):
+            self._replica = ProposeMockReplica(MockCommunicator())
+            req = AcceptDirectSwapRequest(self._replica._current_master, accepted)
+            self._replica.process_request(req)
+
+            expected = self._replica._buffered_proposal if accepted else 4
+            self.assertEqual(self._replica.state, expected)
+            self.assertEqual(self._replica.samples[-1], expected)
+            ## no synchronization message is sent
+            self.assertEqual(len(self._replica._comm.sent), 0)
+            self.assertEqual(self._replica.energy_trace[-1], self._replica.energy)
+            self.assertEqual(self._replica._n_samples_drawn, 1)
+
+
+    def _makeParamsReplica(self):
+
+        from rexfw.pdfs import AbstractPDF
+
+        class ScaledMockPDF(AbstractPDF):
+
+            scale = 1.0
+
+            def log_prob(self, x):
+
+                return self.scale * x
+
+        replica = ProposeMockReplica(MockCommunicator())
+        replica.pdf = ScaledMockPDF()
+        replica._sampler.pdf = replica.pdf
+
+        return replica
+
+    def testSetPDFParams(self):
+
+        from rexfw.remasters.requests import SetPDFParamsRequest
+
+        self._replica = self._makeParamsReplica()
+        self.assertEqual(self._replica.energy, -4)
+        self._replica.process_request(SetPDFParamsRequest('remaster0', {'scale': 2.0}, 1))
+
+        self.assertEqual(self._replica.pdf.scale, 2.0)
+        self.assertEqual(self._replica.param_index, 1)
+        self.assertEqual(self._replica.energy, -8)
+
+    def testCalculatePDFParamsWork(self):
+
+        from rexfw.remasters.requests import CalculatePDFParamsWorkRequest
+
+        self._replica = self._makeParamsReplica()
+        req = CalculatePDFParamsWorkRequest('remaster0', {'scale': 3.0})
+        self._replica.process_request(req)
+
+        last_sent, dest = self._replica._comm.sent.pop()
+        self.assertEqual(dest, 'remaster0')
+        self.assertEqual(last_sent.data, (-8.0, 0.0))
+        ## the replica's own parameters are restored
+        self.assertEqual(self._replica.pdf.scale, 1.0)
+        self.assertEqual(self._replica.energy, -4)
+
+    def testSwapPDFParams(self):
+
+        import numpy as np
+        from rexfw.remasters.requests import SwapPDFParamsRequest
+
+        for accepted in (True, False):
+            self._replica = self._makeParamsReplica()
+            self._replica.param_index = 0
+            req = SwapPDFParamsRequest('remaster0', accepted, {'scale': 2.0}, 1)
+            self._replica.process_request(req)
+
+            self.assertEqual(self._replica.state, 4)
+            self.assertEqual(self._replica.samples[-1], 4)
+            self.assertEqual(self._replica.param_index, 1 if accepted else 0)
+            self.assertEqual(self._replica.energy_trace[-1], -8 if accepted else -4)
+            self.assertEqual(self._replica.param_index_trace, [self._replica.param_index])
+            self.assertEqual(self._replica._comm.sent.pop()[1], 'remaster0')
+            self.assertEqual(self._replica._n_samples_drawn, 1)
+
+        self._replica._dump_energies()
+        fname = '{}energies/{}_param_indices.npy'.format(self._replica.output_folder,
+                                                          self._replica.name)
+        self.assertEqual(list(np.load(fname)), [0])
+        self.assertEqual(len(self._replica.param_index_trace), 0)
+
+
+    def testAcceptPartnerState(self):
+
+        from rexfw.remasters.requests import AcceptPartnerStateRequest
+
+        for accepted in (True, False):
+            self._replica = ProposeMockReplica(MockCommunicator())
+            self._replica._buffered_partner_state = 7
+            req = AcceptPartnerStateRequest('remaster0', accepted)
+            self._replica.process_request(req)
+
+            self.assertEqual(self._replica.state, 7 if accepted else 4)
+            self.assertEqual(self._replica.samples[-1], self._replica.state)
+            self.assertEqual(self._replica.energy_trace[-1], -self._replica.state)
+            self.assertEqual(self._replica._comm.sent.pop()[1], 'remaster0')
+            self.assertEqual(self._replica._n_samples_drawn, 1)
+
+    def testProposeStoresTrialWorks(self):
+
+        from rexfw.remasters import ProposeRequest
+        from rexfw.slgenerators import ExchangeParams
+        from rexfw.proposers.params import REProposerParams
+
+        self._replica = ProposeMockReplica(MockCommunicator())
+        req = ProposeRequest('remaster34', 'replica22',
+                             ExchangeParams(['mock_proposer1'], REProposerParams()))
+        self._replica._propose(req)
+
+        ## proposals without trials are a single trial
+        self.assertEqual(self._replica._buffered_trial_works, [23])
+
+    def testSendProposal(self):
+
+        from rexfw.remasters.requests import SendProposalRequest
+        from rexfw.replicas.requests import StoreStateEnergyRequest
+
+        self._replica = ProposeMockReplica(MockCommunicator())
+        self._replica.process_request(SendProposalRequest('remaster0', 'replica2'))
+
+        last_sent, dest = self._replica._comm.sent.pop()
+        self.assertEqual(dest, 'replica2')
+        self._checkParcel(last_sent, 'replica2', self._replica.name)
+        self.assertTrue(isinstance(last_sent.data, StoreStateEnergyRequest))
+        self.assertEqual(last_sent.data.state, 44)
+        self.assertEqual(last_sent.data.energy, -44)
+
+    def testProposeReferences(self):
+
+        from rexfw.remasters.requests import ProposeReferencesRequest
+        from rexfw.proposers.rens import multiple_try_work
+
+        class ReferencesMockProposer(MockProposer):
+
+            def propose_references(self, local_replica, partner_state, partner_energy,
+                                   params):
+
+                self.args = (partner_state, partner_energy, params)
+
+                return np.array([1.0, 2.0])
+
+        self._replica = ProposeMockReplica(MockCommunicator())
+        proposer = ReferencesMockProposer()
+        self._replica.proposers = {'mock_proposer1': proposer}
+        self._replica._buffered_trial_works = np.array([0.5, -1.0, 3.0])
+        params = ExchangeParams(['mock_proposer1'], REProposerParams())
+        req = ProposeReferencesRequest('remaster0', 'replica2', 1.5, params)
+        self._replica.process_request(req)
+
+        self.assertEqual(proposer.args, (34, 66, params.proposer_params))
+        self.assertEqual(proposer.partner_name, 'replica2')
+        last_sent, dest = self._replica._comm.sent.pop()
+        self.assertEqual(dest, 'remaster0')
+        work = multiple_try_work([0.5, -1.0, 3.0], [1.0, 2.0], 1.5)
+        self.assertAlmostEqual(last_sent.data[0], work)
+        self.assertEqual(last_sent.data[1], 0.0)
+
     def testEnergy(self):
 
         self._replica = CalculateProposalMockReplica(MockCommunicator())
@@ -0,0 +1,240 @@
+'''
+'''
+
+import unittest
+import numpy as np
+
+from rexfw.pdfs.normal import Normal
+from rexfw.remasters.requests import SampleRequest, SampleNRequest, ProposeRequest
+from rexfw.remasters.requests import AcceptBufferedProposalRequest, SendStatsRequest
+from rexfw.remasters.requests import AcceptDirectSwapRequest
+from rexfw.remasters.requests import DumpSamplesRequest, SetupSampleStoreRequest, DieRequest
+from rexfw.remasters.requests import SendGetStateAndEnergyRequest
+from rexfw.replicas.ensembles import ColumnLog, ReplicaEnsemble
+from rexfw.replicas.requests import DoNothingRequest
+from rexfw.test.cases.communicators import MockCommunicator
+from rexfw.test.cases.replicas import makeTmpDirs
+
+
+class CountingNormal(Normal):
+
+    def __init__(self):
+
+        super(CountingNormal, self).__init__()
+        self.n_batch_calls = 0
+
+    def log_prob_batch(self, X):
+
+        self.n_batch_calls += 1
+
+        return super(CountingNormal, self).log_prob_batch(X)
+
+
+class testColumnLog(unittest.TestCase):
+
+    def testAppend(self):
+
+        log = ColumnLog(3, (2,), capacity=2)
+        for i in range(5):
+            log.append(np.array([0, 2]), np.array([[i, i], [-i, -i]]))
+        log.append(np.array([1]), np.array([[7, 7]]))
+
+        self.assertEqual(list(log.lengths), [5, 1, 5])
+        self.assertTrue(np.all(log.get(0)[:, 0] == np.arange(5)))
+        self.assertTrue(np.all(log.get(2)[:, 1] == -np.arange(5)))
+        self.assertTrue(np.all(log.get(1) == [[7, 7]]))
+
+        log.clear(0)
+        self.assertEqual(len(log.get(0)), 0)
+        self.assertEqual(len(log.get(2)), 5)
+
+
+class testReplicaEnsemble(unittest.TestCase):
+
+    def setUp(self):
+
+        np.random.seed(42)
+        self._pdf = CountingNormal()
+        self._comm = MockCommunicator()
+        self._names = ['replica1', 'replica2', 'replica3']
+        self._ensemble = ReplicaEnsemble(self._names, np.random.normal(size=(3, 2)),
+                                         self._pdf, [1.0, 0.5, 0.25], 0.5,
+                                         makeTmpDirs(), self._comm)
+        self._members = self._ensemble.members
+
+    def testMembers(self):
+
+        self.assertEqual(sorted(self._members.keys()), self._names)
+        self.assertEqual(self._members['replica2'].index, 1)
+
+    def testSamplingIsBatched(self):
+
+        n_calls = self._pdf.n_batch_calls
+        for name in self._names[:-1]:
+            self._members[name].process_request(SampleNRequest('master0', 3))
+        ## the last replica has not been asked to sample yet
+        self.assertEqual(self._pdf.n_batch_calls, n_calls)
+
+        self._members['replica3'].process_request(SampleNRequest('master0', 4))
+        self.assertEqual(self._pdf.n_batch_calls, n_calls + 3)
+        self.assertEqual(list(self._ensemble._n_pending_steps), [0, 0, 1])
+
+        ## pending steps are performed when the states are needed
+        self._ensemble.states
+        self.assertEqual(self._pdf.n_batch_calls, n_calls + 4)
+        self.assertEqual(list(self._ensemble._n_samples_drawn), [3, 3, 4])
+
+    def testEnergies(self):
+
+        for name in self._names:
+            self._members[name].process_request(SampleRequest('master0'))
+
+        states = self._ensemble.states
+        energies = 0.5 * np.sum(states ** 2, 1) * self._ensemble.betas
+        self.assertTrue(np.allclose(self._ensemble.energies, energies))
+        self.assertTrue(np.allclose(self._ensemble._energy_trace._data[0], energies))
+
+    def _swap(self, accept):
+
+        for name1, name2 in (('replica1', 'replica2'), ('replica2', 'replica1')):
+            self._members[name1].process_request(
+                SendGetStateAndEnergyRequest('master0', name2))
+            self._members[name1].process_request(ProposeRequest('master0', name2, None))
+        for name in ('replica1', 'replica2'):
+            self._members[name].process_request(AcceptBufferedProposalRequest('master0',
+                                                                              accept))
+
+    def testSwap(self):
+
+        states = self._ensemble.states
+        energies = self._ensemble.energies
+        memory = self._ensemble._states.copy()
+        n_calls = self._pdf.n_batch_calls
+        self._swap(True)
+
+        sent = [obj.data for obj, dest in self._comm.sent]
+        self.assertTrue(all(isinstance(sent[i], DoNothingRequest) for i in (0, 2, 4, 5)))
+        E1 = 0.5 * np.sum(states[1] ** 2)
+        self.assertAlmostEqual(sent[1][0], (1.0 - 0.5) * E1)
+        self.assertEqual(sent[1][1], 0.0)
+
+        ## no state was evaluated or copied, only the rows were swapped
+        self.assertEqual(self._pdf.n_batch_calls, n_calls)
+        self.assertTrue(np.all(self._ensemble._states == memory))
+        self.assertEqual(list(self._ensemble._rows), [1, 0, 2])
+        self.assertTrue(np.all(self._ensemble.states == states[[1, 0, 2]]))
+        self.assertAlmostEqual(self._ensemble.energies[0], 2 * energies[1])
+        self.assertEqual(list(self._ensemble._n_samples_drawn), [1, 1, 0])
+
+    def testDirectSwap(self):
+
+        states = self._ensemble.states
+        for name1, name2 in (('replica1', 'replica2'), ('replica2', 'replica1')):
+            self._members[name1].process_request(
+                SendGetStateAndEnergyRequest('master0', name2))
+            self._members[name1].process_request(ProposeRequest('master0', name2, None))
+        n_sent = len(self._comm.sent)
+        for name in ('replica1', 'replica2'):
+            self._members[name].process_request(AcceptDirectSwapRequest('master0', True))
+
+        ## no synchronization messages are sent
+        self.assertEqual(len(self._comm.sent), n_sent)
+        self.assertTrue(np.all(self._ensemble.states == states[[1, 0, 2]]))
+        self.assertEqual(list(self._ensemble._n_samples_drawn), [1, 1, 0])
+
+    def testRejectedSwap(self):
+
+        states = self._ensemble.states
+        self._swap(False)
+
+        self.assertTrue(np.all(self._ensemble.states == states))
+        self.assertEqual(list(self._ensemble._n_samples_drawn), [1, 1, 0])
+
+    def testUnknownPartner(self):
+
+        self.assertRaises(ValueError, self._members['replica1'].process_request,
+                          ProposeRequest('master0', 'replica4', None))
+
+    def testSendStats(self):
+
+        for _ in range(2):
+            for name in self._names:
+                self._members[name].process_request(SampleRequest('master0'))
+        self._swap(True)
+        self._members['replica3'].process_request(SendStatsRequest('master0'))
+
+        parcel, dest = self._comm.sent.pop()
+        self.assertEqual(dest, 'master0')
+        self.assertEqual(parcel.sender, 'replica3')
+        self.assertEqual([step for step, _ in parcel.data], [0, 1])
+        stats = parcel.data[-1][1]['x']
+        self.assertEqual(stats.total, 2)
+        self.assertEqual(stats.stepsize, 0.5)
+
+        ## the replicas which swapped drew a sample without sampling
+        self._members['replica1'].process_request(SendStatsRequest('master0'))
+        self.assertEqual(len(self._comm.sent.pop()[0].data), 2)
+
+
+    def testSendAggregatedStats(self):
+
+        self._ensemble.aggregate_stats = True
+        for _ in range(3):
+            self._members['replica3'].process_request(SampleRequest('master0'))
+        self._members['replica3'].process_request(SendStatsRequest('master0'))
+
+        summaries = self._comm.sent.pop()[0].data
+        self.assertEqual(len(summaries), 1)
+        self.assertEqual(summaries[0].n_steps, 3)
+        self.assertEqual(summaries[0].last_step, 2)
+        self.assertEqual(summaries[0].sum('x', 'stepsize'), 1.5)
+
+    def testDumpSamples(self):
+
+        from cPickle import load
+
+        self._members['replica1'].process_request(SetupSampleStoreRequest('master0', 5, 2))
+        for name in self._names:
+            self._members[name].process_request(SampleNRequest('master0', 5))
+        self._members['replica2'].process_request(DumpSamplesRequest('master0', 0, 5, 0, 2))
+
+        folder = self._ensemble.output_folder
+        with open(folder + 'samples/samples_replica2_0-5.pickle') as ipf:
+            samples = load(ipf)
+        self.assertEqual(len(samples), 3)
+        self.assertTrue(np.all(samples[-1] == self._ensemble.states[1]))
+        energies = np.load(folder + 'energies/replica2.npy')
+        self.assertEqual(energies.shape, (5,))
+        self.assertEqual(self._ensemble._samples.lengths[1], 0)
+        self.assertEqual(self._ensemble._samples.lengths[0], 3)
+
+
+    def testDumpInBackground(self):
+
+        from rexfw.replicas.sample_writers import BackgroundWriter
+
+        self._ensemble._background_writer = BackgroundWriter()
+        for name in self._names:
+            self._members[name].process_request(SampleNRequest('master0', 5))
+        self._ensemble._sample_pending()
+        energies = self._ensemble._energy_trace.get(1).copy()
+        self._members['replica2'].process_request(DumpSamplesRequest('master0', 0, 5, 0, 1))
+        ## logs are overwritten before the data is written
+        self._members['replica2'].process_request(SampleNRequest('master0', 5))
+        self._members['replica2'].process_request(DieRequest('master0'))
+
+        folder = self._ensemble.output_folder
+        self.assertTrue(np.all(np.load(folder + 'energies/replica2.npy') == energies))
+
+    def testDie(self):
+
+        self._members['replica1'].process_request(SampleRequest('master0'))
+        result = self._members['replica1'].process_request(DieRequest('master0'))
+
+        self.assertEqual(result, -1)
+        self.assertEqual(list(self._ensemble._n_samples_drawn), [1, 0, 0])
+
+
+if __name__ == '__main__':
+
+    unittest.main()
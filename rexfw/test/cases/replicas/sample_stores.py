@@ -0,0 +1,71 @@
+'''
+'''
+
+import unittest
+import numpy as np
+
+from rexfw.replicas.sample_stores import SampleStore
+
+
+class testSampleStore(unittest.TestCase):
+
+    def testForDumps(self):
+
+        store = SampleStore.for_dumps(200, 3)
+
+        self.assertEqual(store.stride, 3)
+        self.assertEqual(store.capacity, 67)
+        self.assertEqual(len(range(201)[::3]), store.capacity)
+
+    def testAppendArrays(self):
+
+        store = SampleStore(3, 10)
+        samples = [np.array([float(i), -i]) for i in range(20)]
+        for s in samples:
+            store.append(s)
+
+        self.assertEqual(len(store), 7)
+        self.assertTrue(isinstance(store._buffer, np.ndarray))
+        self.assertEqual(store._buffer.shape, (10, 2))
+        self.assertTrue(np.all(np.array(store.to_list()) == np.array(samples[::3])))
+        self.assertTrue(np.all(store[-1] == samples[18]))
+        ## samples are copied
+        samples[0][0] = 42.0
+        self.assertEqual(store[0][0], 0.0)
+
+    def testOverwriteOldest(self):
+
+        store = SampleStore(2, 3)
+        for i in range(10):
+            store.append(np.array([i]))
+
+        self.assertEqual(len(store), 3)
+        self.assertEqual([s[0] for s in store], [4, 6, 8])
+        self.assertRaises(IndexError, lambda: store[3])
+
+    def testAppendObjects(self):
+
+        for copy in (True, False):
+            store = SampleStore(2, 5, copy=copy)
+            samples = [[i] for i in range(5)]
+            for s in samples:
+                store.append(s)
+
+            self.assertEqual(store.to_list(), [[0], [2], [4]])
+            self.assertEqual(store[0] is samples[0], not copy)
+
+    def testClear(self):
+
+        store = SampleStore(2, 5)
+        for i in range(3):
+            store.append(np.array([i]))
+        store.clear()
+        store.append(np.array([7]))
+        store.append(np.array([8]))
+
+        self.assertEqual([s[0] for s in store], [7])
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,187 @@
+'''
+'''
+
+import unittest
+import numpy as np
+
+from rexfw.replicas.sample_writers import PickleSampleWriter, StreamingSampleWriter
+from rexfw.replicas.sample_writers import load_samples, append_to_npy, BackgroundWriter
+
+
+class testPickleSampleWriter(unittest.TestCase):
+
+    def testWrite(self):
+
+        import os
+        from cPickle import load
+        from tempfile import mkdtemp
+
+        folder = mkdtemp() + '/'
+        writer = PickleSampleWriter(folder, 'replica3')
+        samples = np.arange(6.0).reshape(3, 2)
+        writer.write(samples, np.arange(3), 10, 20)
+
+        with open(folder + 'samples_replica3_10-20.pickle') as ipf:
+            dumped = load(ipf)
+        self.assertTrue(isinstance(dumped, list))
+        self.assertTrue(np.all(np.array(dumped) == samples))
+
+
+class testStreamingSampleWriter(unittest.TestCase):
+
+    def setUp(self):
+
+        from tempfile import mkdtemp
+
+        self._folder = mkdtemp() + '/'
+        self._writer = StreamingSampleWriter(self._folder, 'replica3')
+
+    def testWriteAndLoad(self):
+
+        samples1 = np.arange(8.0).reshape(4, 2)
+        samples2 = [np.array([-1.0, -2.0]), np.array([-3.0, -4.0])]
+        self._writer.write(samples1, np.array([0, 3, 6, 9]), 0, 10)
+        self._writer.write(samples2, np.array([12, 15]), 10, 15)
+
+        samples, steps = load_samples(self._folder, 'replica3')
+        self.assertTrue(isinstance(samples, np.memmap))
+        self.assertEqual(samples.shape, (6, 2))
+        self.assertTrue(np.all(samples[:4] == samples1))
+        self.assertTrue(np.all(samples[4:] == np.array(samples2)))
+        self.assertEqual(list(steps), [0, 3, 6, 9, 12, 15])
+
+        samples, steps = load_samples(self._folder, 'replica3', step_min=4, step_max=12)
+        self.assertEqual(list(steps), [6, 9, 12])
+        self.assertTrue(np.all(samples == [[4.0, 5.0], [6.0, 7.0], [-1.0, -2.0]]))
+
+    def testContinue(self):
+
+        self._writer.write(np.zeros((2, 2)), np.array([0, 1]), 0, 1)
+
+        writer = StreamingSampleWriter(self._folder, 'replica3')
+        writer.write(np.ones((1, 2)), np.array([2]), 1, 2)
+        self.assertEqual(len(load_samples(self._folder, 'replica3')[0]), 3)
+
+        writer = StreamingSampleWriter(self._folder, 'replica3')
+        self.assertRaises(ValueError, writer.write, np.ones((1, 3)), np.array([3]), 2, 3)
+
+
+class testAppendToNpy(unittest.TestCase):
+
+    def setUp(self):
+
+        from tempfile import mkdtemp
+
+        self._filename = mkdtemp() + '/energies.npy'
+
+    def testAppend(self):
+
+        import os
+
+        append_to_npy(self._filename, np.array([[1.0], [2.0]]))
+        size = os.path.getsize(self._filename)
+        append_to_npy(self._filename, np.array([[3.0]]))
+        self.assertEqual(os.path.getsize(self._filename), size + 8)
+
+        energies = np.load(self._filename)
+        self.assertEqual(energies.shape, (3, 1))
+        self.assertTrue(np.all(energies[:, 0] == [1.0, 2.0, 3.0]))
+        self.assertEqual(len(np.load(self._filename, mmap_mode='r')), 3)
+
+    def testLongHeader(self):
+
+        import os
+
+        ## the headers of these arrays don't fit into NPY_HEADER_SIZE bytes
+        data = np.arange(2.0).reshape((2,) + (1,) * 20)
+        append_to_npy(self._filename, data)
+        size = os.path.getsize(self._filename)
+        append_to_npy(self._filename, data)
+        self.assertEqual(os.path.getsize(self._filename), size + 16)
+        self.assertTrue(np.all(np.load(self._filename).ravel() == [0.0, 1.0, 0.0, 1.0]))
+
+        filename = self._filename.replace('energies', 'structured')
+        dtype = np.dtype([('energy_{}'.format(i), float) for i in range(8)])
+        append_to_npy(filename, np.zeros(2, dtype=dtype))
+        append_to_npy(filename, np.ones(1, dtype=dtype))
+        data = np.load(filename)
+        self.assertEqual(data.dtype, dtype)
+        self.assertTrue(np.all(data['energy_7'] == [0.0, 0.0, 1.0]))
+
+    def testAppendToNumpySaved(self):
+
+        np.save(self._filename, np.array([1.0, 2.0]))
+        append_to_npy(self._filename, np.array([3.0]))
+        append_to_npy(self._filename, np.array([4.0]))
+
+        self.assertTrue(np.all(np.load(self._filename) == [1.0, 2.0, 3.0, 4.0]))
+
+
+class testBackgroundWriter(unittest.TestCase):
+
+    def testOrderAndFlush(self):
+
+        import time
+
+        written = []
+        def write(x):
+            time.sleep(0.01)
+            written.append(x)
+
+        writer = BackgroundWriter(max_queued=2)
+        for i in range(5):
+            writer.submit(write, i)
+        writer.flush()
+        self.assertEqual(written, range(5))
+
+        writer.submit(write, 5)
+        writer.close()
+        self.assertEqual(written, range(6))
+        self.assertFalse(writer._thread.is_alive())
+
+    def testException(self):
+
+        written = []
+        def fail():
+            raise IOError('disk full')
+
+        writer = BackgroundWriter()
+        writer.submit(fail)
+        writer.submit(written.append, 1)
+        self.assertRaises(IOError, writer.flush)
+        ## writes after a failed one are skipped
+        self.assertEqual(written, [])
+
+        writer.submit(written.append, 2)
+        writer.flush()
+        self.assertEqual(written, [2])
+
+    def testFsync(self):
+
+        import os
+        from tempfile import mkdtemp
+
+        folder = mkdtemp() + '/'
+        filename = folder + 'energies.npy'
+        synced = []
+        fsync = os.fsync
+        os.fsync = lambda fd: synced.append(os.fstat(fd).st_ino)
+        try:
+            writer = BackgroundWriter()
+            writer.submit(append_to_npy, filename, np.arange(3.0))
+            writer.flush()
+            self.assertEqual(synced, [])
+
+            writer.submit(append_to_npy, filename, np.arange(2.0))
+            writer.close()
+        finally:
+            os.fsync = fsync
+        ## the file and its folder are synced once
+        self.assertEqual(sorted(synced), sorted([os.stat(filename).st_ino,
+                                                 os.stat(folder).st_ino]))
+        self.assertEqual(len(np.load(filename)), 5)
+
+
+if __name__ == '__main__':
+
+    unittest.main()
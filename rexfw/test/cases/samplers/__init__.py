@@ -0,0 +1,92 @@
+'''
+'''
+
+import unittest
+import numpy as np
+
+from rexfw.samplers.rwmc import RWMCSampler, VectorizedRWMCSampler
+
+
+class CountingNormal(object):
+
+    def __init__(self):
+
+        self.n_calls = 0
+
+    def log_prob(self, x):
+
+        self.n_calls += 1
+
+        return -0.5 * np.sum(x ** 2)
+
+
+class testRWMCSampler(unittest.TestCase):
+
+    def testLastEnergy(self):
+
+        pdf = CountingNormal()
+        sampler = RWMCSampler(pdf, np.array([0.5, -0.5]), 0.5)
+        state = sampler.sample()
+
+        self.assertEqual(sampler.last_energy, -pdf.log_prob(state))
+
+
+class testVectorizedRWMCSampler(unittest.TestCase):
+
+    def setUp(self):
+
+        np.random.seed(42)
+        self._pdf = CountingNormal()
+        self._sampler = VectorizedRWMCSampler(self._pdf, np.array([0.5, -0.5, 1.0]), 0.5)
+
+    def testOneEvaluationPerStep(self):
+
+        for _ in range(10):
+            self._sampler.sample()
+
+        ## one evaluation for the initial state, one for each proposal
+        self.assertEqual(self._pdf.n_calls, 11)
+        self.assertEqual(self._sampler._n_moves, 10)
+
+    def testPerDimensionPerturbation(self):
+
+        old_state = self._sampler.state
+        while self._sampler.state is old_state:
+            self._sampler.sample()
+
+        diff = np.abs(self._sampler.state - old_state)
+        self.assertEqual(len(np.unique(diff)), 3)
+        self.assertTrue(np.all(diff <= 0.5))
+
+    def testLastEnergy(self):
+
+        for _ in range(5):
+            state = self._sampler.sample()
+            self.assertEqual(self._sampler.last_energy, 0.5 * np.sum(state ** 2))
+
+    def testStateChangeInvalidatesEnergy(self):
+
+        self._sampler.sample()
+        n_calls = self._pdf.n_calls
+        ## this is how Replica sets the sampler state after a swap
+        self._sampler._state = np.array([2.0, 0.0, 0.0])
+
+        self.assertEqual(self._sampler.energy, 2.0)
+        self.assertEqual(self._pdf.n_calls, n_calls + 1)
+
+    def testNSteps(self):
+
+        sampler = VectorizedRWMCSampler(self._pdf, np.array([0.5, -0.5, 1.0]), 0.5,
+                                        n_steps=20)
+        sampler.sample()
+        stats = sampler.last_draw_stats['x']
+
+        self.assertEqual(self._pdf.n_calls, 21)
+        self.assertEqual(stats.total, 20)
+        self.assertTrue(0.0 <= stats.accepted <= 1.0)
+        self.assertEqual(stats.accepted * 20, int(round(stats.accepted * 20)))
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -1,9 +1,11 @@
 '''
 '''
 
+import unittest
 from collections import deque
 
-from rexfw.statistics import Statistics, REStatistics
+from rexfw.statistics import Statistics, REStatistics, FilterableQuantityList
+from rexfw.statistics.summaries import SamplerStatsSummary
 from rexfw.test.cases.statistics.writers import MockStatisticsWriter
 
 
@@ -39,3 +41,96 @@ class MockREStatistics(Statistics):
 
         self.write_stack.append(step)
         
+
+
+class testSamplerStatsSummary(unittest.TestCase):
+
+    def _makeStats(self, n_steps):
+
+        import numpy as np
+        from rexfw.samplers.rwmc import RWMCSampleStats
+
+        np.random.seed(42)
+
+        return [[step, {'x': RWMCSampleStats(np.random.random() < 0.3, step + 1, 0.5)}]
+                for step in range(n_steps)]
+
+    def _makeStatistics(self):
+
+        from rexfw.statistics.averages import MCMCAcceptanceRateAverage
+        from rexfw.statistics.logged_quantities import SamplerStepsize
+
+        return Statistics([MCMCAcceptanceRateAverage('replica1', 'x'),
+                           SamplerStepsize('replica1', 'x')],
+                          [MockStatisticsWriter()])
+
+    def testAdd(self):
+
+        stats = self._makeStats(5)
+        summary = SamplerStatsSummary(2)
+        for step, step_stats in stats:
+            summary.add(step, step_stats)
+
+        self.assertEqual(summary.param_index, 2)
+        self.assertEqual(summary.n_steps, 5)
+        self.assertEqual(summary.last_step, 4)
+        self.assertEqual(summary.sum('x', 'accepted'), sum(s['x'].accepted for _, s in stats))
+        self.assertEqual(summary.sum('x', 'total'), 15)
+        self.assertTrue(summary.last_stats is stats[-1][1])
+
+    def testUpdateStatistics(self):
+
+        stats = self._makeStats(250)
+        expected = self._makeStatistics()
+        expected.update(['replica1'], stats)
+
+        statistics = self._makeStatistics()
+        for i in range(0, len(stats), 100):
+            summary = SamplerStatsSummary()
+            for step, step_stats in stats[i:i+100]:
+                summary.add(step, step_stats)
+            statistics.update(['replica1'], [summary])
+
+        for quantity, expected_quantity in zip(statistics.elements, expected.elements):
+            self.assertAlmostEqual(quantity.current_value, expected_quantity.current_value,
+                                   places=12)
+            self.assertEqual(next(reversed(quantity.values)), '249')
+
+
+class testFilterableQuantityList(unittest.TestCase):
+
+    def setUp(self):
+
+        from rexfw.statistics.averages import MCMCAcceptanceRateAverage
+        from rexfw.statistics.averages import REAcceptanceRateAverage
+        from rexfw.statistics.logged_quantities import SamplerStepsize
+
+        self._quantities = FilterableQuantityList(
+            [MCMCAcceptanceRateAverage('replica1', 'x'), SamplerStepsize('replica1', 'x'),
+             MCMCAcceptanceRateAverage('replica2', 'y'),
+             REAcceptanceRateAverage('replica1', 'replica2')])
+
+    def testSelect(self):
+
+        q = self._quantities
+        self.assertEqual(q.select(origins=['replica1']), q[:2])
+        self.assertEqual(q.select(origins=['replica1'], name='stepsize'), [q[1]])
+        self.assertEqual(q.select(origins=['replica1', 'replica2']), [q[3]])
+        ## elements lacking an attribute are never selected
+        self.assertEqual(q.select(variable_name='y'), [q[2]])
+        self.assertEqual(q.select(name='acceptance rate', variable_name=None), [q[3]])
+        self.assertEqual(q.select(name='works'), [])
+        self.assertTrue(isinstance(q.select(name='stepsize'), FilterableQuantityList))
+
+    def testListChanges(self):
+
+        from rexfw.statistics.logged_quantities import SamplerStepsize
+
+        q = self._quantities
+        self.assertEqual(len(q.select(name='stepsize')), 1)
+        q.append(SamplerStepsize('replica2', 'y'))
+        self.assertEqual(q.select(name='stepsize'), [q[1], q[4]])
+        del q[1]
+        self.assertEqual(q.select(name='stepsize'), [q[3]])
+        q[3] = q[0]
+        self.assertEqual(q.select(name='stepsize'), [])
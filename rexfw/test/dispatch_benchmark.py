@@ -0,0 +1,69 @@
+'''
+Microbenchmark measuring how many requests per second a replica can process
+with the request processing table, compared to the eval-based dispatch
+used previously. Run with
+
+    $ python dispatch_benchmark.py
+'''
+import timeit
+import numpy as np
+
+from rexfw.communicators import AbstractCommunicator
+from rexfw.replicas import Replica
+from rexfw.remasters.requests import SampleRequest, SendStatsRequest
+from rexfw.samplers.rwmc import RWMCSampler
+from rexfw.pdfs.normal import Normal
+
+
+class NullCommunicator(AbstractCommunicator):
+
+    def send(self, obj, dest):
+        pass
+
+    def recv(self, source):
+        pass
+
+
+class EvalDispatchReplica(Replica):
+
+    def _setup_request_processing_table(self):
+
+        self._request_processing_table = dict(
+            SampleRequest='self._sample({})',
+            SendStatsRequest='self._send_stats({})')
+
+    def process_request(self, request):
+
+        return eval(self._request_processing_table[request.__class__.__name__].format('request'))
+
+
+def make_replica(replica_class):
+
+    return replica_class('replica1', np.array([0.0]), Normal(), RWMCSampler,
+                         dict(stepsize=1.0), {}, '/tmp/', NullCommunicator())
+
+
+def requests_per_second(replica_class, n_requests=20000):
+
+    replica = make_replica(replica_class)
+    sample = SampleRequest('master0')
+    send_stats = SendStatsRequest('master0')
+
+    def process():
+        for i in xrange(n_requests):
+            replica.process_request(sample)
+            if i % 100 == 0:
+                replica.process_request(send_stats)
+                replica.samples = []
+                replica.energy_trace = []
+
+    return n_requests / min(timeit.repeat(process, number=1, repeat=3))
+
+
+if __name__ == '__main__':
+
+    before = requests_per_second(EvalDispatchReplica)
+    after = requests_per_second(Replica)
+    print 'eval dispatch:          {:10.0f} requests / s'.format(before)
+    print 'request handler table:  {:10.0f} requests / s'.format(after)
+    print 'speedup:                {:10.2f}'.format(after / before)
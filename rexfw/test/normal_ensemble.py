@@ -0,0 +1,62 @@
+'''
+'''
+import numpy as np
+from multiprocessing import Process
+
+## all replicas live in a single child process and are run by a
+## ReplicaEnsemble, which samples all of them at once; run with
+## python normal_ensemble.py
+from rexfw.communicators.multiproc import create_multiprocessing_communicators
+from rexfw.communicators.multiplexing import MultiplexingCommunicator
+
+n_replicas = 50
+
+sim_name = 'normaltest_ensemble'
+
+## this is where all simulation output (samples, statistics files, etc.) are stored
+output_folder = '/tmp/{}_{}replicas/'.format(sim_name, n_replicas)
+
+replica_names = ['replica{}'.format(i) for i in range(1, n_replicas + 1)]
+## the master object lives in process 0, all replicas in process 1
+placement = dict({name: 1 for name in replica_names}, master0=0)
+
+
+def run_ensemble(comm):
+
+    from rexfw.replicas.ensembles import ReplicaEnsemble
+    from rexfw.slaves import Slave
+    from rexfw.pdfs.normal import Normal
+
+    ## Normal(sigma=i) is Normal(sigma=1) at inverse temperature 1 / i ** 2
+    sigmas = np.arange(1, n_replicas + 1, dtype=float)
+    np.random.seed(1)
+    init_states = np.random.normal(size=(n_replicas, 1))
+
+    ensemble = ReplicaEnsemble(replica_names, init_states, Normal(), 1.0 / sigmas ** 2,
+                               1.8, output_folder, comm)
+    ## the slave passes requests for each replica on to the ensemble
+    slave = Slave(ensemble.members, comm)
+    slave.listen()
+    slave._thread.join()
+
+
+if __name__ == '__main__':
+
+    from rexfw.convenience import setup_default_re_master, create_directories
+
+    comms = create_multiprocessing_communicators(2, placement)
+    process = Process(target=run_ensemble, args=(comms[1],))
+    process.start()
+
+    create_directories(output_folder)
+    ## the master object has to tell apart replicas living in the same process
+    master = setup_default_re_master(n_replicas, output_folder,
+                                     MultiplexingCommunicator(comms[0]))
+    master.run(10000,
+               swap_interval=5,
+               status_interval=50,
+               dump_interval=200,
+               dump_step=3)
+    master.terminate_replicas()
+
+    process.join()
@@ -0,0 +1,65 @@
+'''
+'''
+import numpy as np
+import os, sys
+from mpi4py import MPI
+
+from rexfw.communicators.mpi import MPICommunicator
+## this communicator lets several replicas share a process
+from rexfw.communicators.multiplexing import MultiplexingCommunicator
+from rexfw.convenience import create_default_placement
+
+mpicomm = MPI.COMM_WORLD
+rank = mpicomm.Get_rank()
+size = mpicomm.Get_size()
+
+## more replicas than processes: every process with rank > 0
+## runs several replicas
+n_replicas = 4 * (size - 1)
+
+sim_name = 'normaltest_multiplexed'
+
+## this is where all simulation output (samples, statistics files, etc.) are stored
+output_folder = '/tmp/{}_{}replicas/'.format(sim_name, n_replicas)
+
+## maps replica names to the ranks of the processes they live in
+placement = create_default_placement(n_replicas, size)
+local_names = sorted([name for name, r in placement.iteritems()
+                      if r == rank and name != 'master0'])
+comm = MultiplexingCommunicator(MPICommunicator(placement), local_names)
+
+if rank == 0:
+
+    from rexfw.convenience import setup_default_re_master, create_directories
+
+    create_directories(output_folder)
+    master = setup_default_re_master(n_replicas, output_folder, comm)    
+    master.run(10000,
+               swap_interval=5,
+               status_interval=50,
+               dump_interval=200,
+               dump_step=3)
+    master.terminate_replicas()
+
+else:
+
+    from rexfw.convenience import setup_default_replica
+    from rexfw.slaves import Slave
+    from rexfw.samplers.rwmc import RWMCSampler
+    from rexfw.pdfs.normal import Normal
+
+    replicas = {}
+    for name in local_names:
+        i = int(name[len('replica'):])
+        pdf = Normal(sigma=float(i))
+        np.random.seed(i)
+        init_state = np.array([np.random.normal()])
+        sampler_params = dict(stepsize=1.8, variable_name='x')
+        replica = setup_default_replica(init_state, pdf, RWMCSampler, sampler_params,
+                                        output_folder, comm, i)
+        replicas[replica.name] = replica
+
+    ## the slave passes on requests to all replicas of this process
+    ## and quits once all of them were told to quit
+    slave = Slave(replicas, comm)
+    slave.listen()
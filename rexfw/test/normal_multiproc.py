@@ -0,0 +1,66 @@
+'''
+'''
+import numpy as np
+from multiprocessing import Process
+
+## this communicator uses the Python multiprocessing module instead of MPI,
+## so this script has to be run without an MPI launcher:
+## python normal_multiproc.py
+from rexfw.communicators.multiproc import create_multiprocessing_communicators
+
+n_replicas = 5
+
+sim_name = 'normaltest_multiproc'
+
+## this is where all simulation output (samples, statistics files, etc.) are stored
+output_folder = '/tmp/{}_{}replicas/'.format(sim_name, n_replicas)
+
+
+def run_replica(rank, comm):
+
+    ## every child process runs a replica, which does single-chain
+    ## sampling and proposes exchange states
+
+    from rexfw.convenience import setup_default_replica
+    from rexfw.slaves import Slave
+    from rexfw.samplers.rwmc import RWMCSampler
+    from rexfw.pdfs.normal import Normal
+
+    pdf = Normal(sigma=float(rank))
+    np.random.seed(rank)
+    init_state = np.array([np.random.normal()])
+
+    sampler_params = dict(stepsize=1.8, variable_name='x')
+    replica = setup_default_replica(init_state, pdf, RWMCSampler, sampler_params,
+                                    output_folder, comm, rank)
+    slave = Slave({replica.name: replica}, comm)
+
+    ## the process must not exit before the slave's listening thread
+    slave.listen()
+    slave._thread.join()
+
+
+if __name__ == '__main__':
+
+    from rexfw.convenience import setup_default_re_master, create_directories
+
+    ## one communicator for the master (rank 0) and one for each replica
+    comms = create_multiprocessing_communicators(n_replicas + 1)
+
+    processes = [Process(target=run_replica, args=(rank, comms[rank]))
+                 for rank in range(1, n_replicas + 1)]
+    for p in processes:
+        p.start()
+
+    ## the parent process runs the ExchangeMaster
+    create_directories(output_folder)
+    master = setup_default_re_master(n_replicas, output_folder, comms[0])
+    master.run(10000,
+               swap_interval=5,
+               status_interval=50,
+               dump_interval=200,
+               dump_step=3)
+    master.terminate_replicas()
+
+    for p in processes:
+        p.join()